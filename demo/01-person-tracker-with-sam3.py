@@ -6,6 +6,7 @@ displaying track IDs, trails, statistics, and confidence-based transparency.
 """
 
 import argparse
+import contextlib
 import os
 import sys
 import time
@@ -32,10 +33,15 @@ if supervision_path.exists():
     sys.path.insert(0, str(supervision_path))
 
 import supervision as sv
-from supervision.annotators.utils import ColorLookup
 from supervision.draw.color import ColorPalette
 
 from ultralytics.models.sam.predict import SAM3VideoSemanticPredictor
+from ultralytics_sam3_install._sam3 import FeatureTap
+from ultralytics_sam3_install.analytics import MetricsWriter, ZoneAnalytics
+from ultralytics_sam3_install.motion import MotionGate
+from ultralytics_sam3_install.tracks import TrackMerger
+from ultralytics_sam3_install.trails import TrailRenderer
+from ultralytics_sam3_install.video_source import VideoSource, scale_boxes, scale_masks
 
 
 def draw_transparent_label(
@@ -266,6 +272,52 @@ def main():
         default=0.25,
         help="Confidence threshold (default: 0.25)",
     )
+    parser.add_argument(
+        "--imgsz",
+        type=int,
+        default=1008,
+        help="Long side of frames decoded for the model (default: 1008)",
+    )
+    parser.add_argument(
+        "--start",
+        type=float,
+        default=0.0,
+        help="Start time in seconds (default: 0)",
+    )
+    parser.add_argument(
+        "--end",
+        type=float,
+        default=None,
+        help="End time in seconds (default: end of video)",
+    )
+    parser.add_argument(
+        "--zones",
+        type=str,
+        default=None,
+        help="JSON file with zone polygons and counting lines in source pixels (default: none)",
+    )
+    parser.add_argument(
+        "--metrics",
+        type=str,
+        default=None,
+        help="Write per-frame zone/line metrics as JSON lines to this path, or '-' for stdout (default: none)",
+    )
+    parser.add_argument(
+        "--motion-gate",
+        action="store_true",
+        help="Skip inference on frames without motion and reuse the previous results (fixed cameras)",
+    )
+    parser.add_argument(
+        "--motion-threshold",
+        type=float,
+        default=0.002,
+        help="Fraction of changed pixels that counts as motion for --motion-gate (default: 0.002)",
+    )
+    parser.add_argument(
+        "--headless",
+        action="store_true",
+        help="Compute tracks and metrics only; no frames are decoded at full resolution, drawn or written",
+    )
     
     args = parser.parse_args()
     
@@ -300,6 +352,10 @@ def main():
     )
     print("Predictor initialized successfully")
     
+    # Re-link track IDs fragmented by occlusion (motion gating + mask-pooled encoder features)
+    track_merger = TrackMerger()
+    feature_tap = FeatureTap(predictor)
+    
     # Initialize tracking variables
     seen_track_ids = set()
     frame_inference_times = []
@@ -311,34 +367,69 @@ def main():
     color_palette = generate_color_palette()
     color_lookup = {}
     
-    # Initialize supervision annotators
-    trace_annotator = sv.TraceAnnotator(
+    # Initialize trail renderer (fixed-size per-track history) and supervision annotators
+    trail_renderer = TrailRenderer(
         trace_length=30,
-        color_lookup=ColorLookup.TRACK,
+        palette=color_palette,
     )
     mask_annotator = sv.MaskAnnotator(
         color=ColorPalette.DEFAULT,
     )
     
-    # Get video info
-    video_info = sv.VideoInfo.from_video_path(video_path=str(source_path))
+    # Open the video once: model-resolution frames for the predictor, full-resolution frames for rendering
+    source = VideoSource(source_path, imgsz=args.imgsz, render=not args.headless, start=args.start, end=args.end)
+    video_info = source.video_info()
     print(f"Video info: {video_info.width}x{video_info.height} @ {video_info.fps} fps, {video_info.total_frames} frames")
+    print(f"Model frames: {source.model_width}x{source.model_height} ({source.backend} decoder)")
+    
+    # Zone occupancy, dwell time and line crossings (in source pixel coordinates)
+    analytics = None
+    if args.zones or args.metrics:
+        config = args.zones or dict(camera=source_path.stem)
+        analytics = ZoneAnalytics.from_config(config, fps=source.fps)
+        print(f"Analytics: {len(analytics.zone_names)} zones, {len(analytics.line_names)} lines (camera {analytics.camera})")
+    metrics_writer = MetricsWriter(args.metrics) if args.metrics else None
     
     # Process video
     print("Processing video...")
-    results = predictor(source=str(source_path), text=["person"], stream=True)
+    motion_gate = MotionGate(area_threshold=args.motion_threshold) if args.motion_gate else None
+    if motion_gate is not None:
+        results = motion_gate.stream(predictor, source, text=["person"])
+    else:
+        results = source.stream(predictor, text=["person"])
     
     frame_count = 0
     
-    with sv.VideoSink(target_path=args.output, video_info=video_info) as sink:
+    sink_context = contextlib.nullcontext() if args.headless else sv.VideoSink(target_path=args.output, video_info=video_info)
+    with sink_context as sink:
         for result in results:
             frame_count += 1
             
             # Record inference start time
             frame_start = time.time()
             
-            # Convert Results to supervision Detections
+            # Convert Results to supervision Detections at source resolution
+            video_frame = source.history[-1]
             detections = sv.Detections.from_ultralytics(result)
+            detections.xyxy = scale_boxes(detections.xyxy, video_frame.scale)
+            if detections.mask is not None and not args.headless:
+                detections.mask = scale_masks(detections.mask, video_frame.full.shape[:2])
+            if detections.tracker_id is not None:
+                embeddings = feature_tap.pool(result.masks.data) if result.masks is not None else None
+                detections.tracker_id, detections.xyxy = track_merger.update(
+                    detections.tracker_id, detections.xyxy, embeddings
+                )
+            if analytics is not None:
+                record = analytics.update(
+                    detections.tracker_id,
+                    detections.xyxy,
+                    detections.mask,
+                    frame=video_frame.index,
+                    time=video_frame.time,
+                    mask_scale=video_frame.scale if args.headless else 1.0,
+                )
+                if metrics_writer is not None:
+                    metrics_writer.write(record)
             
             # Record inference end time
             frame_time = (time.time() - frame_start) * 1000  # Convert to ms
@@ -357,8 +448,13 @@ def main():
                     if tid not in color_lookup:
                         color_lookup[tid] = color_palette[tid % len(color_palette)]
             
-            # Get original frame
-            frame = result.orig_img.copy()
+            if args.headless:
+                if frame_count % 10 == 0:
+                    print(f"Processed {frame_count} frames... (Avg: {avg_time:.1f} ms/frame)")
+                continue
+            
+            # Get original full-resolution frame
+            frame = video_frame.full.copy()
             
             # Create labels (only track ID)
             if detections.tracker_id is not None:
@@ -367,10 +463,8 @@ def main():
                 labels = []
             
             # Annotate frame with trails
-            annotated_frame = trace_annotator.annotate(
-                scene=frame.copy(),
-                detections=detections,
-            )
+            trail_renderer.update(detections.tracker_id, detections.xyxy)
+            annotated_frame = trail_renderer.draw(frame)  # frame is already a copy
             
             # Annotate frame with masks
             annotated_frame = mask_annotator.annotate(
@@ -386,6 +480,10 @@ def main():
                 color_lookup=color_lookup,
             )
             
+            # Draw zones and counting lines
+            if analytics is not None:
+                annotated_frame = analytics.draw(annotated_frame, record)
+            
             # Draw statistics table
             annotated_frame = draw_statistics_table(
                 frame=annotated_frame,
@@ -402,6 +500,10 @@ def main():
             if frame_count % 10 == 0:
                 print(f"Processed {frame_count} frames... (Avg: {avg_time:.1f} ms/frame)")
     
+    source.release()
+    if metrics_writer is not None:
+        metrics_writer.close()
+    
     # Calculate average if frames were processed
     if frame_count > 0:
         avg_time = total_inference_time / frame_count
@@ -416,8 +518,22 @@ def main():
         print(f"Total inference time: {total_inference_time / 1000.0:.2f} s")
         print(f"Average inference time: {avg_time:.1f} ms/frame")
     print(f"Total processing time: {total_processing_time:.2f} s")
-    print(f"Total unique persons tracked: {len(seen_track_ids)}")
-    if frame_count > 0:
+    if motion_gate is not None:
+        gate_stats = motion_gate.stats()
+        print(
+            f"Motion gate: {gate_stats['inferred']} frames inferred, {gate_stats['skipped']} skipped "
+            f"({gate_stats['skip_rate']:.0%}), {gate_stats['gate_ms']:.2f} ms/frame in the gate"
+        )
+    print(f"Total unique persons tracked: {len(seen_track_ids)} ({track_merger.merges} fragmented IDs merged)")
+    if analytics is not None:
+        summary = analytics.summary()
+        for name, zone in summary["zones"].items():
+            print(f"Zone {name}: {zone['visits']} visits, mean dwell {zone['mean_dwell']:.1f} s")
+        for name, line in summary["lines"].items():
+            print(f"Line {name}: {line['in']} in, {line['out']} out")
+    if args.headless:
+        print("Headless mode: no output video written")
+    elif frame_count > 0:
         print(f"Output saved to: {args.output}")
     else:
         print(f"Warning: No output file created (no frames processed)")
@@ -22,6 +22,7 @@ project_root = Path(__file__).parent.parent.parent.parent
 sys.path.insert(0, str(project_root))
 
 from ultralytics.models.sam.predict import SAM3SemanticPredictor
+from ultralytics_sam3_install.mask_ops import nms_results
 
 
 def find_test_image():
@@ -317,6 +318,9 @@ def main():
     result_red_single = results_red[0] if len(results_red) > 0 else None
     result_blue_single = results_blue[0] if len(results_blue) > 0 else None
     
+    # A person matched by both phrases is kept once, under the higher-scoring phrase
+    result_red_single, result_blue_single = nms_results([result_red_single, result_blue_single], iou_threshold=0.5)
+    
     # Create combined visualization
     combined_img = visualize_red_blue_cloth_combined(
         result_red_single,
@@ -20,6 +20,7 @@ project_root = Path(__file__).parent.parent.parent.parent
 sys.path.insert(0, str(project_root))
 
 from ultralytics.models.sam.predict import SAM3VideoPredictor
+from ultralytics_sam3_install.memory_bank import MemoryBankPolicy
 
 
 def find_test_video():
@@ -167,8 +168,14 @@ def main():
         mode="predict",
         model=model_path,
         half=True,
+        memory_keep_last=16,
+        memory_keyframes=4,
+        memory_prune_every=10,
     )
+    # Memory-bank policy keys are not ultralytics settings: pop them before the predictor validates overrides
+    memory_policy = MemoryBankPolicy.pop_from(overrides)
     predictor = SAM3VideoPredictor(overrides=overrides)
+    memory_policy.attach(predictor)
     print("  ✓ Predictor initialized")
     
     # Define bounding box prompts (using example from README)
@@ -201,6 +208,13 @@ def main():
         frame_titles.append(f"Frame {idx + 1}")
         print(f"  ✓ Processed frame {idx + 1}")
     
+    summary = memory_policy.summary()
+    if summary:
+        print(
+            f"  ✓ Memory bank: {summary['last_entries']} entries, {summary['last_bank_mb']:.1f} MB "
+            f"(max {summary['max_entries']}, {summary['pruned']} pruned)"
+        )
+
     if len(frames) == 0:
         print("  ⚠ No frames were processed")
         return
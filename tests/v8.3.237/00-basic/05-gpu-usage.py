@@ -20,6 +20,7 @@ project_root = Path(__file__).parent.parent.parent.parent
 sys.path.insert(0, str(project_root))
 
 from ultralytics.models.sam.predict import SAM3SemanticPredictor
+from ultralytics_sam3_install.memory import MemoryProfiler
 
 
 def find_test_image():
@@ -91,7 +92,7 @@ def add_rulers_to_axis(ax, img_shape):
     ax.set_yticks(range(0, h, max(50, h // 10)))
 
 
-def visualize_side_by_side(original_img, result, gpu_info, output_path):
+def visualize_side_by_side(original_img, result, gpu_info, output_path, memory_summary=None):
     """Create side-by-side visualization of original image, results, and GPU info."""
     fig = plt.figure(figsize=(16, 8))
     
@@ -130,6 +131,8 @@ def visualize_side_by_side(original_img, result, gpu_info, output_path):
             info_text += f"  Memory Reserved: {memory_reserved:.2f} GB\n"
     else:
         info_text += "  Using CPU\n"
+    if memory_summary:
+        info_text += "\nMemory by stage (MB):\n" + memory_summary + "\n"
     
     ax3.text(0.1, 0.5, info_text, fontsize=12, family="monospace",
              verticalalignment="center", bbox=dict(boxstyle="round", facecolor="wheat", alpha=0.5))
@@ -175,16 +178,20 @@ def main():
     )
     print(f"  ✓ Predictor initialized with device: {device_id}")
     
-    # Set image
-    print("\n[4/6] Setting image...")
-    predictor.set_image(test_image)
-    original_img = np.array(Image.open(test_image))
-    print("  ✓ Image set")
-    
-    # Run inference
-    print("\n[5/6] Running inference on GPU...")
-    results = predictor(text=["person"], save=False)
-    print(f"  ✓ Inference completed")
+    # Set image and run inference with per-stage memory instrumentation
+    profiler = MemoryProfiler(python_heap=not gpu_available)
+    with profiler.attach(predictor):
+        print("\n[4/6] Setting image...")
+        predictor.set_image(test_image)
+        original_img = np.array(Image.open(test_image))
+        print("  ✓ Image set")
+        
+        # Run inference
+        print("\n[5/6] Running inference on GPU...")
+        results = predictor(text=["person"], save=False)
+        print(f"  ✓ Inference completed")
+    memory_summary = profiler.summary()
+    print(memory_summary)
     
     # Handle results - they might be single Results or list
     if isinstance(results, list):
@@ -205,7 +212,8 @@ def main():
         original_img,
         result,
         device_id,
-        output_dir / "05-gpu-usage.png"
+        output_dir / "05-gpu-usage.png",
+        memory_summary=memory_summary,
     )
     
     print("\n" + "=" * 80)
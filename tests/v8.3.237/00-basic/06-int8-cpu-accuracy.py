@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+Test 06: INT8 CPU Accuracy
+Tests SAM3SemanticPredictor with dynamic int8 image/text encoders on CPU.
+
+Runs the text prompts of test 01 through an FP32 CPU predictor and an int8
+quantized CPU predictor, compares the masks (matched IoU) and latency, and
+displays both results side-by-side. Needs no GPU.
+"""
+
+import os
+import sys
+import time
+from pathlib import Path
+import matplotlib.pyplot as plt
+import numpy as np
+from PIL import Image
+
+# Add project root to path
+project_root = Path(__file__).parent.parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from ultralytics_sam3_install.predictors import build_predictor
+from ultralytics_sam3_install.quantize import compare_results
+
+# Minimum mean matched IoU between int8 and FP32 masks
+MIN_MEAN_IOU = 0.80
+
+
+def find_test_images():
+    """Find the bundled test images used by tests 01-05."""
+    possible_paths = [
+        project_root / "submodules" / "inference" / "assets" / "bus.jpg",
+        project_root / "submodules" / "sam3" / "assets" / "images" / "test_image.jpg",
+        project_root / "submodules" / "sam3" / "assets" / "images" / "groceries.jpg",
+        project_root / "submodules" / "inference" / "assets" / "zidane.jpg",
+    ]
+    
+    images = [str(path) for path in possible_paths if path.exists()]
+    if not images:
+        raise FileNotFoundError(
+            f"Could not find test images. Checked: {[str(p) for p in possible_paths]}"
+        )
+    return images
+
+
+def check_requirements():
+    """Check if required files exist."""
+    model_path = project_root / "models" / "sam3.pt"
+    bpe_path = project_root / "models" / "bpe_simple_vocab_16e6.txt.gz"
+    
+    if not model_path.exists():
+        raise FileNotFoundError(
+            f"Model file not found: {model_path}\n"
+            "Please download sam3.pt to models/ directory"
+        )
+    
+    if not bpe_path.exists():
+        raise FileNotFoundError(
+            f"BPE vocabulary not found: {bpe_path}\n"
+            "Please ensure bpe_simple_vocab_16e6.txt.gz is in models/ directory"
+        )
+    
+    return str(model_path), str(bpe_path)
+
+
+def run_text_prompts(predictor, image_path, text):
+    """Run text prompts on one image and return (result, image encoder seconds, prompt decode seconds)."""
+    start_time = time.time()
+    predictor.set_image(image_path)
+    encode_time = time.time() - start_time
+    start_time = time.time()
+    results = predictor(text=text, save=False)
+    decode_time = time.time() - start_time
+    if isinstance(results, list):
+        results = results[0] if len(results) > 0 else None
+    return results, encode_time, decode_time
+
+
+def visualize_side_by_side(original_img, result_fp32, result_int8, metrics, output_path):
+    """Create side-by-side visualization of FP32 and int8 results."""
+    fig, axes = plt.subplots(1, 3, figsize=(18, 6))
+    
+    axes[0].imshow(original_img)
+    axes[0].set_title("Original Image", fontsize=14, fontweight="bold")
+    axes[0].axis("off")
+    
+    for ax, result, title in ((axes[1], result_fp32, "FP32"), (axes[2], result_int8, "INT8 (dynamic)")):
+        ax.imshow(result.plot() if result is not None else original_img)
+        ax.set_title(title, fontsize=14, fontweight="bold")
+        ax.axis("off")
+    
+    fig.suptitle(
+        f"Matched IoU mean {metrics['mean_iou']:.3f} / min {metrics['min_iou']:.3f}, "
+        f"masks {metrics['reference']} vs {metrics['candidate']}",
+        fontsize=14,
+    )
+    plt.tight_layout()
+    plt.savefig(output_path, dpi=150, bbox_inches="tight")
+    print(f"Saved visualization to: {output_path}")
+    plt.close()
+
+
+def main():
+    """Main test function."""
+    print("=" * 80)
+    print("Test 06: INT8 CPU Accuracy - SAM3SemanticPredictor")
+    print("=" * 80)
+    
+    # Check requirements
+    print("\n[1/5] Checking requirements...")
+    model_path, bpe_path = check_requirements()
+    test_images = find_test_images()
+    print(f"  ✓ Model: {model_path}")
+    print(f"  ✓ BPE vocabulary: {bpe_path}")
+    print(f"  ✓ Test images: {len(test_images)}")
+    
+    # Initialize FP32 and int8 predictors on CPU
+    print("\n[2/5] Initializing FP32 and int8 predictors on CPU...")
+    predictor_fp32 = build_predictor("semantic", model_path, bpe_path, device="cpu", half=False)
+    predictor_int8 = build_predictor("semantic", model_path, bpe_path, quantize=True)
+    print("  ✓ Predictors initialized")
+    
+    text = ["person", "bus", "glasses"]
+    output_dir = project_root / "tests" / "v8.3.237" / "00-basic" / "outputs"
+    output_dir.mkdir(parents=True, exist_ok=True)
+    
+    print(f"\n[3/5] Running text prompts {text} on each image...")
+    all_metrics = []
+    for idx, image_path in enumerate(test_images, 1):
+        result_fp32, encode_fp32, decode_fp32 = run_text_prompts(predictor_fp32, image_path, text)
+        result_int8, encode_int8, decode_int8 = run_text_prompts(predictor_int8, image_path, text)
+        metrics = compare_results(result_fp32, result_int8)
+        metrics.update(
+            image=Path(image_path).name,
+            fp32_encode_s=encode_fp32,
+            fp32_decode_s=decode_fp32,
+            int8_encode_s=encode_int8,
+            int8_decode_s=decode_int8,
+        )
+        all_metrics.append(metrics)
+        print(
+            f"  ✓ {metrics['image']}: masks {metrics['reference']} vs {metrics['candidate']}, "
+            f"mean IoU {metrics['mean_iou']:.3f}, "
+            f"FP32 {encode_fp32:.2f}s encode + {decode_fp32:.2f}s decode, "
+            f"INT8 {encode_int8:.2f}s encode + {decode_int8:.2f}s decode"
+        )
+        
+        # Create visualizations
+        visualize_side_by_side(
+            np.array(Image.open(image_path).convert("RGB")),
+            result_fp32,
+            result_int8,
+            metrics,
+            output_dir / f"06-int8-cpu-accuracy-{idx:02d}.png",
+        )
+    
+    print("\n[4/5] Summarizing...")
+    mean_iou = float(np.mean([m["mean_iou"] for m in all_metrics]))
+    print(f"  ✓ Mean matched IoU: {mean_iou:.3f} (threshold {MIN_MEAN_IOU})")
+    for stage in ("encode", "decode"):
+        fp32_s = sum(m[f"fp32_{stage}_s"] for m in all_metrics)
+        int8_s = sum(m[f"int8_{stage}_s"] for m in all_metrics)
+        print(f"  ✓ INT8 {stage} speedup over FP32: {fp32_s / max(int8_s, 1e-9):.2f}x")
+    fp32_s = sum(m["fp32_encode_s"] + m["fp32_decode_s"] for m in all_metrics)
+    int8_s = sum(m["int8_encode_s"] + m["int8_decode_s"] for m in all_metrics)
+    print(f"  ✓ INT8 end-to-end speedup over FP32: {fp32_s / max(int8_s, 1e-9):.2f}x")
+    
+    print("\n[5/5] Checking accuracy threshold...")
+    if mean_iou < MIN_MEAN_IOU:
+        print(f"  ✗ Mean IoU {mean_iou:.3f} below {MIN_MEAN_IOU}")
+        sys.exit(1)
+    print("  ✓ INT8 masks match FP32 masks")
+    
+    print("\n" + "=" * 80)
+    print("Test completed successfully!")
+    print("=" * 80)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Test 07: Tiled Inference
+Tests TiledPredictor with SAM3SemanticPredictor on a synthetic 4K wide-angle frame.
+
+Pastes several downscaled copies of a bundled test image onto a 3840x2160
+canvas (one straddling a tile seam), so people become small, and counts the
+people found by full-frame inference and by tiled inference. Tiled inference
+should recover the people of every copy without duplicating the one cut by
+the seam.
+"""
+
+import sys
+import time
+from pathlib import Path
+import cv2
+import matplotlib.pyplot as plt
+import numpy as np
+
+# Add project root to path
+project_root = Path(__file__).parent.parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from ultralytics_sam3_install.predictors import build_predictor
+from ultralytics_sam3_install.tiling import TiledPredictor
+
+CANVAS = (2160, 3840)  # height, width
+COPY_SCALE = 0.35
+# Minimum share of reference people found by tiled inference
+MIN_RECALL = 0.8
+
+
+def find_test_image():
+    """Find a bundled test image with people."""
+    possible_paths = [
+        project_root / "submodules" / "inference" / "assets" / "zidane.jpg",
+        project_root / "submodules" / "inference" / "assets" / "bus.jpg",
+    ]
+    
+    for path in possible_paths:
+        if path.exists():
+            return str(path)
+    
+    raise FileNotFoundError(
+        f"Could not find test image. Checked: {[str(p) for p in possible_paths]}"
+    )
+
+
+def check_requirements():
+    """Check if required files exist."""
+    model_path = project_root / "models" / "sam3.pt"
+    bpe_path = project_root / "models" / "bpe_simple_vocab_16e6.txt.gz"
+    
+    if not model_path.exists():
+        raise FileNotFoundError(
+            f"Model file not found: {model_path}\n"
+            "Please download sam3.pt to models/ directory"
+        )
+    
+    if not bpe_path.exists():
+        raise FileNotFoundError(
+            f"BPE vocabulary not found: {bpe_path}\n"
+            "Please ensure bpe_simple_vocab_16e6.txt.gz is in models/ directory"
+        )
+    
+    return str(model_path), str(bpe_path)
+
+
+def build_canvas(image, tiled):
+    """Paste downscaled copies of ``image`` onto a 4K canvas; returns (canvas, number of copies)."""
+    canvas = np.full((*CANVAS, 3), 114, dtype=np.uint8)
+    small = cv2.resize(image, None, fx=COPY_SCALE, fy=COPY_SCALE, interpolation=cv2.INTER_AREA)
+    h, w = small.shape[:2]
+    tiles, _ = tiled.tiles(CANVAS)
+    seam_x = int(tiles[0][2]) - w // 2  # centered on the right edge of the first tile
+    positions = [(100, 100), (seam_x, CANVAS[0] - h - 100), (CANVAS[1] - w - 100, 100)]
+    for x, y in positions:
+        canvas[y : y + h, x : x + w] = small
+    return canvas, len(positions)
+
+
+def count_people(result):
+    """Number of detections in a Results object."""
+    return 0 if result is None or result.boxes is None else len(result.boxes)
+
+
+def main():
+    """Main test function."""
+    print("=" * 80)
+    print("Test 07: Tiled Inference - SAM3SemanticPredictor")
+    print("=" * 80)
+    
+    # Check requirements
+    print("\n[1/5] Checking requirements...")
+    model_path, bpe_path = check_requirements()
+    image_path = find_test_image()
+    print(f"  ✓ Model: {model_path}")
+    print(f"  ✓ BPE vocabulary: {bpe_path}")
+    print(f"  ✓ Test image: {image_path}")
+    
+    print("\n[2/5] Initializing predictor...")
+    predictor = build_predictor("semantic", model_path, bpe_path)
+    tiled = TiledPredictor(predictor, overlap=0.25)
+    print(f"  ✓ Tile size {tiled.tile}, overlap {tiled.overlap}")
+    
+    text = ["person"]
+    image = cv2.imread(image_path)
+    predictor.set_image(image)
+    reference = count_people(predictor(text=text, save=False)[0])
+    canvas, copies = build_canvas(image, tiled)
+    expected = reference * copies
+    tiles, _ = tiled.tiles(canvas.shape[:2])
+    print(f"  ✓ Reference people in original image: {reference}")
+    print(f"  ✓ Canvas {CANVAS[1]}x{CANVAS[0]} with {copies} copies, {len(tiles)} tiles")
+    
+    print("\n[3/5] Running full-frame inference...")
+    predictor.set_image(canvas)
+    start_time = time.time()
+    result_full = predictor(text=text, save=False)[0]
+    time_full = time.time() - start_time
+    print(f"  ✓ Full frame: {count_people(result_full)} people in {time_full:.2f}s")
+    
+    print("\n[4/5] Running tiled inference...")
+    start_time = time.time()
+    result_tiled = tiled(canvas, text=text)
+    time_tiled = time.time() - start_time
+    found = count_people(result_tiled)
+    print(f"  ✓ Tiled: {found} people in {time_tiled:.2f}s ({time_tiled / len(tiles) * 1000:.0f} ms/tile)")
+    
+    output_dir = project_root / "tests" / "v8.3.237" / "00-basic" / "outputs"
+    output_dir.mkdir(parents=True, exist_ok=True)
+    fig, axes = plt.subplots(1, 2, figsize=(24, 7))
+    for ax, result, title in ((axes[0], result_full, "Full frame"), (axes[1], result_tiled, "Tiled")):
+        plotted = result.plot()
+        for x0, y0, x1, y1 in tiles.tolist():
+            cv2.rectangle(plotted, (x0, y0), (x1, y1), (0, 255, 255), 3)
+        ax.imshow(plotted[..., ::-1])
+        ax.set_title(f"{title}: {count_people(result)} people", fontsize=14, fontweight="bold")
+        ax.axis("off")
+    plt.tight_layout()
+    output_path = output_dir / "07-tiled-inference.png"
+    plt.savefig(output_path, dpi=100, bbox_inches="tight")
+    plt.close()
+    print(f"  ✓ Saved visualization to: {output_path}")
+    
+    print("\n[5/5] Checking recall and duplicates...")
+    if found < MIN_RECALL * expected:
+        print(f"  ✗ Tiled inference found {found} of {expected} expected people")
+        sys.exit(1)
+    if found > expected + copies:
+        print(f"  ✗ Tiled inference found {found} people for {expected} expected (seam duplicates)")
+        sys.exit(1)
+    print(f"  ✓ Tiled inference found {found} of {expected} expected people")
+    
+    print("\n" + "=" * 80)
+    print("Test completed successfully!")
+    print("=" * 80)
+
+
+if __name__ == "__main__":
+    main()
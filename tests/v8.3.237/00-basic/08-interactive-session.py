@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Test 08: Interactive Session
+Tests InteractiveSession with SAM3Predictor on CPU: a scripted annotator
+clicks on the bus image, and every click after the first refines the
+previous mask with the decoder only.
+
+Compares the per-click latency of the session with calling the predictor
+again with all clicks (the pattern of test 02), and checks that a click
+stays under the latency budget of an annotation UI.
+"""
+
+import sys
+import time
+from pathlib import Path
+import cv2
+import matplotlib.pyplot as plt
+import numpy as np
+
+# Add project root to path
+project_root = Path(__file__).parent.parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from ultralytics_sam3_install.interactive import InteractiveSession
+from ultralytics_sam3_install.predictors import build_predictor
+
+# (x, y, positive) clicks on bus.jpg: bus body, windows, then background corrections
+CLICKS = [(430, 730, True), (200, 520, True), (650, 500, True), (80, 880, False), (700, 900, False)]
+# Median click latency budget on CPU
+MAX_CLICK_MS = 50.0
+
+
+def find_test_image():
+    """Find bus.jpg image for the interactive test."""
+    possible_paths = [
+        project_root / "submodules" / "inference" / "assets" / "bus.jpg",
+        project_root / "submodules" / "inference" / "assets" / "zidane.jpg",
+    ]
+    
+    for path in possible_paths:
+        if path.exists():
+            return str(path)
+    
+    raise FileNotFoundError(
+        f"Could not find test image. Checked: {[str(p) for p in possible_paths]}"
+    )
+
+
+def check_requirements():
+    """Check if required files exist."""
+    model_path = project_root / "models" / "sam3.pt"
+    
+    if not model_path.exists():
+        raise FileNotFoundError(
+            f"Model file not found: {model_path}\n"
+            "Please download sam3.pt to models/ directory"
+        )
+    
+    return str(model_path)
+
+
+def main():
+    """Main test function."""
+    print("=" * 80)
+    print("Test 08: Interactive Session - SAM3Predictor (CPU)")
+    print("=" * 80)
+    
+    print("\n[1/5] Checking requirements...")
+    model_path = check_requirements()
+    image_path = find_test_image()
+    print(f"  ✓ Model: {model_path}")
+    print(f"  ✓ Test image: {image_path}")
+    
+    print("\n[2/5] Initializing predictor and session...")
+    predictor = build_predictor("visual", model_path, device="cpu", half=False)
+    session = InteractiveSession(predictor)
+    session.set_image(image_path)
+    print(f"  ✓ Image encoded in {session.encode_ms:.0f} ms")
+    
+    print("\n[3/5] Clicking with the session...")
+    masks = []
+    for x, y, positive in CLICKS:
+        masks.append(session.click(1, (x, y), positive=positive))
+        print(f"  ✓ {'+' if positive else '-'}({x},{y}): {session.stats()['last_click_ms']:.1f} ms, "
+              f"{int(masks[-1].sum())} px, score {session.objects[1].score:.2f}")
+    stats = session.stats()
+    
+    print("\n[4/5] Re-running the predictor with all clicks (baseline)...")
+    baseline_ms = []
+    for k in range(1, len(CLICKS) + 1):
+        points = [[x, y] for x, y, _ in CLICKS[:k]]
+        labels = [int(p) for _, _, p in CLICKS[:k]]
+        start_time = time.perf_counter()
+        predictor(points=points, point_labels=labels, save=False)
+        baseline_ms.append((time.perf_counter() - start_time) * 1000)
+    print(f"  ✓ Baseline: median {np.median(baseline_ms):.1f} ms per click")
+    print(f"  ✓ Session:  median {np.median(session.click_ms):.1f} ms per click")
+    
+    output_dir = project_root / "tests" / "v8.3.237" / "00-basic" / "outputs"
+    output_dir.mkdir(parents=True, exist_ok=True)
+    image = cv2.imread(image_path)[..., ::-1]
+    fig, axes = plt.subplots(1, len(masks), figsize=(4 * len(masks), 5))
+    for k, (ax, mask) in enumerate(zip(axes, masks)):
+        overlay = image.copy()
+        overlay[mask] = (0.5 * overlay[mask] + [0, 90, 127]).astype(np.uint8)
+        ax.imshow(overlay)
+        for x, y, positive in CLICKS[: k + 1]:
+            ax.plot(x, y, "o", color="lime" if positive else "red", markersize=10, markeredgecolor="white")
+        ax.set_title(f"Click {k + 1}: {session.click_ms[k]:.0f} ms", fontsize=12, fontweight="bold")
+        ax.axis("off")
+    plt.tight_layout()
+    output_path = output_dir / "08-interactive-session.png"
+    plt.savefig(output_path, dpi=100, bbox_inches="tight")
+    plt.close()
+    print(f"  ✓ Saved visualization to: {output_path}")
+    
+    print("\n[5/5] Checking click latency...")
+    median_ms = float(np.median(session.click_ms))
+    if median_ms > MAX_CLICK_MS:
+        print(f"  ✗ Median click latency {median_ms:.1f} ms exceeds {MAX_CLICK_MS:.0f} ms")
+        sys.exit(1)
+    print(f"  ✓ Median click latency {median_ms:.1f} ms (max {stats['max_click_ms']:.1f} ms)")
+    
+    print("\n" + "=" * 80)
+    print("Test completed successfully!")
+    print("=" * 80)
+
+
+if __name__ == "__main__":
+    main()
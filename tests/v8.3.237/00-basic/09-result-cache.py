@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Test 09: Result Cache
+Tests the ResultCache round trip for exact and near-duplicate lookups.
+
+Stores a result for a synthetic image whose 64-bit dHash has the high bit set
+(SQLite integers are signed, so the hash must be stored as a signed value),
+and one whose hash has it clear, then reads both back by the exact image and
+by a re-encoded JPEG copy. No model weights are needed.
+"""
+
+import sys
+import tempfile
+from pathlib import Path
+import cv2
+import numpy as np
+
+# Add project root to path
+project_root = Path(__file__).parent.parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from ultralytics_sam3_install.mask_ops import rle_encode
+from ultralytics_sam3_install.result_cache import CachedResult, ImageKey, ResultCache
+
+SIZE = (240, 320)  # height, width
+
+
+def gradient(ascending: bool) -> np.ndarray:
+    """Horizontal gradient: every dHash bit set when ascending, all clear otherwise."""
+    ramp = np.linspace(0, 255, SIZE[1], dtype=np.float32)
+    row = ramp if ascending else ramp[::-1]
+    gray = np.tile(row, (SIZE[0], 1)).astype(np.uint8)
+    return cv2.cvtColor(gray, cv2.COLOR_GRAY2BGR)
+
+
+def sample_result(label: str) -> CachedResult:
+    """A one-detection result with a rectangular mask."""
+    mask = np.zeros((1, *SIZE), np.uint8)
+    mask[0, 40:120, 60:200] = 1
+    return CachedResult(
+        SIZE,
+        np.array([[60, 40, 200, 120]], np.float32),
+        np.array([0.9], np.float32),
+        [label],
+        rle_encode(mask),
+    )
+
+
+def reencode(image: np.ndarray) -> np.ndarray:
+    """JPEG round trip: different bytes, same picture."""
+    ok, buf = cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, 90])
+    return cv2.imdecode(buf, cv2.IMREAD_COLOR)
+
+
+def main():
+    """Main test function."""
+    print("=" * 80)
+    print("Test 09: Result Cache - exact and near-duplicate round trip")
+    print("=" * 80)
+
+    images = {"high bit set": gradient(True), "high bit clear": gradient(False)}
+    with tempfile.TemporaryDirectory() as tmp, ResultCache(Path(tmp) / "results.sqlite", max_distance=2) as cache:
+        print("\n[1/3] Storing results...")
+        for name, image in images.items():
+            phash = ImageKey(image).phash
+            print(f"  ✓ {name}: dHash {phash:#018x}")
+            cache.put(image, sample_result(name), text=["person"])
+        if len(cache) != len(images):
+            print(f"  ✗ Expected {len(images)} entries, found {len(cache)}")
+            sys.exit(1)
+
+        print("\n[2/3] Exact lookups...")
+        for name, image in images.items():
+            hit = cache.get(image, text=["person"])
+            if hit is None or not hit.exact or hit.labels != [name]:
+                print(f"  ✗ {name}: exact lookup returned {hit}")
+                sys.exit(1)
+            if not np.array_equal(hit.masks, sample_result(name).masks.astype(bool)):
+                print(f"  ✗ {name}: mask changed in the round trip")
+                sys.exit(1)
+            print(f"  ✓ {name}: exact hit")
+
+        print("\n[3/3] Near-duplicate lookups (re-encoded JPEG)...")
+        for name, image in images.items():
+            hit = cache.get(reencode(image), text=["person"])
+            if hit is None or hit.exact or hit.labels != [name]:
+                print(f"  ✗ {name}: near lookup returned {hit}")
+                sys.exit(1)
+            print(f"  ✓ {name}: near hit")
+        print(f"  ✓ Stats: {cache.stats()}")
+
+    print("\n" + "=" * 80)
+    print("Test completed successfully!")
+    print("=" * 80)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,31 @@
+"""
+Command-line entry point: ``python -m ultralytics_sam3_install <command> [options]``.
+"""
+
+import importlib
+import sys
+
+# Command name -> module providing ``main(argv)``
+COMMANDS = {
+    "benchmark": "ultralytics_sam3_install.benchmark",
+    "export": "ultralytics_sam3_install.export",
+    "label": "ultralytics_sam3_install.label",
+    "perf": "ultralytics_sam3_install.regression",
+    "plan": "ultralytics_sam3_install.planner",
+    "workers": "ultralytics_sam3_install.workers",
+}
+
+
+def main(argv=None) -> int:
+    """Dispatch to a toolkit command."""
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv or argv[0] not in COMMANDS:
+        print("Usage: python -m ultralytics_sam3_install <command> [options]")
+        print(f"Commands: {', '.join(COMMANDS)}")
+        return 0 if argv[:1] in (["-h"], ["--help"]) else 2
+    result = importlib.import_module(COMMANDS[argv[0]]).main(argv[1:])
+    return result if isinstance(result, int) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,567 @@
+"""
+SAM3 internals adapter
+Single place where the toolkit reaches below the public predictor API
+(``set_image`` / ``__call__``) into the SAM3 model modules, so a submodule bump
+only needs fixing here.
+"""
+
+import copy
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Optional, Union
+
+import cv2
+import numpy as np
+import torch
+import torch.nn.functional as F
+
+
+def load_image(image: Union[str, Path, np.ndarray]) -> np.ndarray:
+    """
+    Load an image as a BGR uint8 array (the layout ultralytics predictors expect).
+
+    Args:
+        image: Path to an image file or an already decoded BGR array
+
+    Returns:
+        BGR image array
+    """
+    if isinstance(image, np.ndarray):
+        return image
+    im = cv2.imread(str(image))
+    if im is None:
+        raise FileNotFoundError(f"Could not read image: {image}")
+    return im
+
+
+def get_model(predictor: Any) -> torch.nn.Module:
+    """Return the predictor's model, building it on first use."""
+    if predictor.model is None:
+        predictor.setup_model()
+    return predictor.model
+
+
+def model_fingerprint(predictor: Any) -> str:
+    """Identify the loaded weights so cached embeddings are never mixed across checkpoints."""
+    weights = Path(str(predictor.args.model))
+    if weights.exists():
+        stat = weights.stat()
+        return f"{weights.name}:{stat.st_size}:{int(stat.st_mtime)}"
+    return weights.name
+
+
+def xyxy_to_normalized_cxcywh(bboxes: np.ndarray, src_shape: tuple[int, int]) -> np.ndarray:
+    """
+    Convert pixel xyxy boxes to the normalized cxcywh layout used by SAM3 geometry prompts.
+
+    Args:
+        bboxes: (N, 4) boxes in source-image pixels
+        src_shape: (height, width) of the source image
+
+    Returns:
+        (N, 4) float32 boxes in [0, 1]
+    """
+    h, w = src_shape
+    boxes = np.asarray(bboxes, dtype=np.float32).reshape(-1, 4)
+    out = np.empty_like(boxes)
+    out[:, 0] = (boxes[:, 0] + boxes[:, 2]) / 2 / w
+    out[:, 1] = (boxes[:, 1] + boxes[:, 3]) / 2 / h
+    out[:, 2] = (boxes[:, 2] - boxes[:, 0]) / w
+    out[:, 3] = (boxes[:, 3] - boxes[:, 1]) / h
+    return out.clip(0.0, 1.0)
+
+
+def _geometry_prompt_cls():
+    try:
+        from ultralytics.models.sam.sam3.geometry_encoders import Prompt
+    except ImportError:  # older layouts re-use the upstream sam3 package
+        from sam3.model.geometry_encoders import Prompt
+    return Prompt
+
+
+@torch.inference_mode()
+def encode_box_exemplars(predictor: Any, bboxes: np.ndarray, src_shape: tuple[int, int]) -> tuple[torch.Tensor, torch.Tensor]:
+    """
+    Encode exemplar boxes against the image currently set on a SAM3SemanticPredictor.
+
+    Runs only the geometry encoder (ROI pooling over the cached backbone
+    features), never the image backbone.
+
+    Args:
+        predictor: SAM3SemanticPredictor after ``set_image``
+        bboxes: (N, 4) exemplar boxes in source-image pixels
+        src_shape: (height, width) of the source image
+
+    Returns:
+        Tuple of (S, C) prompt embeddings and (S,) padding mask, on CPU
+    """
+    model = get_model(predictor)
+    device = next(model.parameters()).device
+    boxes = torch.from_numpy(xyxy_to_normalized_cxcywh(bboxes, src_shape)).to(device)
+    n = boxes.shape[0]
+    prompt = _geometry_prompt_cls()(
+        box_embeddings=boxes[:, None],  # (N, B=1, 4)
+        box_mask=torch.zeros(1, n, dtype=torch.bool, device=device),
+        box_labels=torch.ones(n, 1, dtype=torch.long, device=device),
+    )
+    _, vis_feats, vis_pos, vis_sizes = model._get_img_feats(
+        predictor.features, torch.zeros(1, dtype=torch.long, device=device)
+    )
+    geo_feats, geo_masks = model.geometry_encoder(
+        geo_prompt=prompt, img_feats=vis_feats, img_sizes=vis_sizes, img_pos_embeds=vis_pos
+    )
+    return geo_feats[:, 0].float().cpu(), geo_masks[0].cpu()
+
+
+@contextmanager
+def visual_prompt(predictor: Any, embeds: torch.Tensor, mask: torch.Tensor):
+    """
+    Inject precomputed visual prompt embeddings into the next predictor calls.
+
+    SAM3 concatenates text, geometry and visual prompt tokens before the
+    fusion encoder; this fills the visual slot so exemplars encoded on another
+    image can be applied without re-encoding that image.
+
+    Args:
+        predictor: SAM3SemanticPredictor
+        embeds: (S, C) prompt embeddings from ``encode_box_exemplars``
+        mask: (S,) padding mask
+    """
+    model = get_model(predictor)
+    param = next(model.parameters())
+    embeds = embeds.to(device=param.device, dtype=param.dtype)[:, None]  # (S, B=1, C)
+    mask = mask.to(param.device)[None]  # (B=1, S)
+    original = model._encode_prompt
+    patched_already = "_encode_prompt" in vars(model)
+
+    def _encode_prompt(*args, **kwargs):
+        kwargs["visual_prompt_embed"] = embeds
+        kwargs["visual_prompt_mask"] = mask
+        return original(*args, **kwargs)
+
+    model._encode_prompt = _encode_prompt
+    try:
+        yield
+    finally:
+        if patched_already:
+            model._encode_prompt = original
+        else:
+            del model._encode_prompt
+
+
+def input_size(predictor: Any) -> int:
+    """Return the square model input size (SAM3 enforces square inputs)."""
+    imgsz = predictor.args.imgsz
+    return int(imgsz[0] if isinstance(imgsz, (list, tuple)) else imgsz)
+
+
+@torch.inference_mode()
+def decode_prompts(
+    predictor: Any,
+    src_shape: tuple[int, int],
+    bboxes: Optional[np.ndarray] = None,
+    points: Optional[np.ndarray] = None,
+    labels: Optional[np.ndarray] = None,
+    masks: Optional[torch.Tensor] = None,
+    multimask_output: bool = False,
+) -> tuple[torch.Tensor, torch.Tensor]:
+    """
+    Run only the prompt encoder and mask decoder on the cached image features.
+
+    Prompts are batched along the first axis: ``points`` of shape (N, K, 2)
+    with ``labels`` (N, K) decode N independent prompt sets in one call. Points
+    labelled -1 are padding and ignored by the prompt encoder.
+
+    Args:
+        predictor: SAM3Predictor after ``set_image``
+        src_shape: (height, width) of the image passed to ``set_image``
+        bboxes: (N, 4) xyxy boxes in source pixels
+        points: (N, K, 2) point coordinates in source pixels
+        labels: (N, K) point labels (1 positive, 0 negative, -1 padding)
+        masks: (N, h, w) low-resolution mask logits from a previous decode
+        multimask_output: Return three candidate masks per prompt set
+
+    Returns:
+        Tuple of low-resolution mask logits (N, M, h, w) and scores (N, M)
+    """
+    imgsz = input_size(predictor)
+    bboxes, points, labels, masks = predictor._prepare_prompts((imgsz, imgsz), src_shape, bboxes, points, labels, masks)
+    pred_masks, pred_scores = predictor._inference_features(
+        predictor.features, bboxes, points, labels, masks, multimask_output
+    )
+    m = 3 if multimask_output else 1
+    n = pred_masks.shape[0] // m
+    return pred_masks.reshape(n, m, *pred_masks.shape[-2:]), pred_scores.reshape(n, m)
+
+
+def masks_to_source(mask_logits: torch.Tensor, src_shape: tuple[int, int], imgsz: int) -> torch.Tensor:
+    """
+    Resize mask logits from model space back to source-image pixels.
+
+    Ultralytics SAM predictors letterbox to the top-left corner without
+    centering, so the valid region is cropped before the final resize.
+
+    Args:
+        mask_logits: (N, M, h, w) logits at any model-space resolution
+        src_shape: (height, width) of the source image
+        imgsz: Square model input size
+
+    Returns:
+        (N, M, height, width) boolean masks
+    """
+    h, w = src_shape
+    r = min(imgsz / h, imgsz / w)
+    new_h, new_w = round(h * r), round(w * r)
+    logits = F.interpolate(mask_logits.float(), (imgsz, imgsz), mode="bilinear", align_corners=False)
+    logits = F.interpolate(logits[..., :new_h, :new_w], (h, w), mode="bilinear", align_corners=False)
+    return logits > 0
+
+
+# Candidate attribute paths for each profiling stage, first match wins.
+# SAM3 image/video models and the interactive tracker name their parts differently.
+STAGE_MODULES = {
+    "image_encode": ("backbone.vision_backbone", "image_encoder", "backbone"),
+    "text_encode": ("backbone.language_backbone", "text_encoder"),
+    "decoder": ("transformer", "sam_mask_decoder", "mask_decoder"),
+    "segmentation_head": ("segmentation_head",),
+    "memory_encode": ("memory_encoder", "maskmem_backbone"),
+}
+
+
+def stage_modules(model: torch.nn.Module) -> dict[str, torch.nn.Module]:
+    """
+    Locate the submodules that make up each inference stage.
+
+    Args:
+        model: SAM3 model
+
+    Returns:
+        Mapping of stage name to module, for stages present in this model
+    """
+    found = {}
+    for stage, paths in STAGE_MODULES.items():
+        for path in paths:
+            module = model
+            for attr in path.split("."):
+                module = getattr(module, attr, None)
+                if module is None:
+                    break
+            if isinstance(module, torch.nn.Module):
+                found[stage] = module
+                break
+    return found
+
+
+# SAM3SemanticPredictor.inference returns (mask logits (N, h, w), boxes (N, 6) as xyxy, score, class)
+SEMANTIC_OUTPUTS = dict(masks=0, boxes=1, score_column=4)
+
+
+def semantic_outputs(predictor: Any, output: Any) -> dict:
+    """
+    Locate masks and scores among the tensor leaves of a
+    ``SAM3SemanticPredictor.inference`` return value, from its known layout.
+
+    Returns:
+        Leaf indices of the masks and boxes, the score column of the boxes and
+        the model's mask threshold on the mask logits
+    """
+    from torch.utils import _pytree as pytree
+
+    try:
+        masks, boxes = output[SEMANTIC_OUTPUTS["masks"]], output[SEMANTIC_OUTPUTS["boxes"]]
+    except (TypeError, IndexError, KeyError):
+        raise RuntimeError(f"Unexpected SAM3 inference output {type(output).__name__}; see _sam3.SEMANTIC_OUTPUTS")
+    if not (masks.ndim == 3 and boxes.ndim == 2 and boxes.shape[1] == 6 and len(masks) == len(boxes)):
+        raise RuntimeError(
+            f"SAM3 inference returned masks {tuple(masks.shape)} and boxes {tuple(boxes.shape)}; "
+            "see _sam3.SEMANTIC_OUTPUTS"
+        )
+    leaves = [t for t in pytree.tree_leaves(output) if isinstance(t, torch.Tensor)]
+    return dict(
+        masks=next(i for i, t in enumerate(leaves) if t is masks),
+        scores=next(i for i, t in enumerate(leaves) if t is boxes),
+        score_column=SEMANTIC_OUTPUTS["score_column"],
+        mask_threshold=float(getattr(get_model(predictor), "mask_threshold", 0.0)),
+        score_logits=False,  # scores are already sigmoid(logit) * presence
+    )
+
+
+def tokenizer_owner(module: torch.nn.Module) -> torch.nn.Module:
+    """
+    Return the submodule of a text encoder that holds its ``tokenizer``.
+
+    SAM3 text encoders tokenize prompt strings inside ``forward``; graph export
+    swaps this attribute to feed token ids in directly.
+    """
+    for sub in module.modules():
+        if callable(getattr(sub, "tokenizer", None)):
+            return sub
+    raise AttributeError(f"No tokenizer found on text encoder {type(module).__name__}")
+
+
+def reset_features(predictor: Any) -> None:
+    """Drop cached image features so the next call runs the image encoder."""
+    if hasattr(predictor, "reset_image"):
+        predictor.reset_image()
+    predictor.features = None
+
+
+def clone_predictor(predictor: Any) -> Any:
+    """
+    Return a predictor that shares ``predictor``'s loaded model but keeps its own
+    source, callbacks and video tracking state (``inference_state``).
+
+    Used to run several independent video streams (e.g. tiles of one frame)
+    without loading the weights again.
+    """
+    get_model(predictor)
+    clone = copy.copy(predictor)
+    clone.callbacks = {event: list(fns) for event, fns in predictor.callbacks.items()}
+    clone.vid_writer = {}
+    if hasattr(predictor, "inference_state"):
+        clone.inference_state = {}
+    reset_features(clone)
+    return clone
+
+
+class FrameDataset:
+    """
+    Stand-in for the ultralytics video loader that yields already decoded frames.
+
+    Mirrors the attributes video predictors read: ``mode``, ``bs``,
+    ``frame`` (1-based count of frames yielded, continuing from ``start``),
+    ``frames`` and ``fps``.
+    """
+
+    mode = "video"
+    bs = 1
+
+    def __init__(self, frames: Any, path: str, fps: float, total: int, start: int = 0):
+        from ultralytics.data.loaders import SourceTypes
+
+        self.source = frames
+        self.files = [path]
+        self.fps = fps
+        self.frames = total
+        self.frame = start
+        self.source_type = SourceTypes(stream=False, screenshot=False, from_img=False, tensor=False)
+
+    def __iter__(self):
+        for frame in self.source:
+            self.frame += 1
+            yield [self.files[0]], [frame.model], [f"video 1/1 (frame {self.frame}/{self.frames}) {self.files[0]}: "]
+
+    def __len__(self) -> int:
+        return self.frames
+
+
+@contextmanager
+def frame_source(predictor: Any, frames: Any, path: str, fps: float, total: int, start: int = 0):
+    """
+    Make the next predictor call read frames from ``frames`` instead of opening ``path``.
+
+    ``frames`` yields objects with a ``model`` BGR array (see
+    ``video_source.VideoFrame``). ultralytics still sets up transforms from a
+    blank frame of the same size, so the video is never opened twice.
+    ``start`` continues the predictor's frame numbering, e.g. after
+    restoring a tracker snapshot taken at that frame.
+    """
+    original = predictor.setup_source
+    patched_already = "setup_source" in vars(predictor)
+    dataset = FrameDataset(frames, path, fps, total, start)
+
+    def setup_source(source=None, *args, **kwargs):
+        h, w = frames.model_height, frames.model_width
+        original(np.zeros((h, w, 3), dtype=np.uint8), *args, **kwargs)
+        predictor.dataset = dataset
+        predictor.source_type = dataset.source_type
+
+    predictor.setup_source = setup_source
+    try:
+        yield dataset
+    finally:
+        if patched_already:
+            predictor.setup_source = original
+        else:
+            del predictor.setup_source
+
+
+def normalization(predictor: Any) -> tuple[np.ndarray, np.ndarray]:
+    """Return the per-channel RGB (mean, std) the predictor's ``preprocess`` applies to 0-255 pixels."""
+    get_model(predictor)
+    return (
+        predictor.mean.flatten().float().cpu().numpy(),
+        predictor.std.flatten().float().cpu().numpy(),
+    )
+
+
+class BatchDataset:
+    """
+    Stand-in for the ultralytics image loader that yields batches prepared elsewhere.
+
+    Each batch from ``batches`` has ``paths``, ``images`` (decoded BGR arrays,
+    used as ``orig_img``) and ``to(device, dtype)`` returning the normalized
+    (B, 3, S, S) model input; ``current`` is the batch being processed.
+    """
+
+    mode = "image"
+
+    def __init__(self, batches: Any, bs: int):
+        from ultralytics.data.loaders import SourceTypes
+
+        self.source = batches
+        self.bs = bs
+        self.current = None
+        self.count = 0
+        self.source_type = SourceTypes(stream=False, screenshot=False, from_img=False, tensor=False)
+
+    def __iter__(self):
+        for batch in self.source:
+            self.current = batch
+            paths = [str(p) for p in batch.paths]
+            self.count += len(paths)
+            yield paths, list(batch.images), [f"image {self.count - len(paths) + i + 1} {p}: " for i, p in enumerate(paths)]
+
+    def __len__(self) -> int:
+        return len(self.source)
+
+
+@contextmanager
+def prepared_source(predictor: Any, batches: Any, bs: int = 1):
+    """
+    Make the next predictor call read pre-normalized batches from ``batches``
+    (e.g. ``loader.ImageLoader``) and skip its own letterbox and normalization.
+    """
+    originals = {name: getattr(predictor, name) for name in ("setup_source", "preprocess")}
+    patched_already = {name: name in vars(predictor) for name in originals}
+    dataset = BatchDataset(batches, bs)
+
+    def setup_source(source=None, *args, **kwargs):
+        imgsz = input_size(predictor)
+        originals["setup_source"](np.zeros((imgsz, imgsz, 3), dtype=np.uint8), *args, **kwargs)
+        predictor.dataset = dataset
+        predictor.source_type = dataset.source_type
+
+    def preprocess(im):
+        fp16 = getattr(get_model(predictor), "fp16", False)
+        return dataset.current.to(predictor.device, torch.float16 if fp16 else torch.float32)
+
+    predictor.setup_source, predictor.preprocess = setup_source, preprocess
+    try:
+        yield dataset
+    finally:
+        for name, original in originals.items():
+            if patched_already[name]:
+                setattr(predictor, name, original)
+            else:
+                delattr(predictor, name)
+
+
+class FeatureTap:
+    """
+    Keep the image encoder's latest feature map and pool it under object masks.
+
+    The hook stores the lowest-resolution (N=1, C, h, w) tensor the image
+    encoder returns for each frame, so appearance embeddings cost one masked
+    average per object and no extra encoder pass.
+
+    Args:
+        predictor: Any SAM3 predictor
+    """
+
+    def __init__(self, predictor: Any):
+        module = stage_modules(get_model(predictor))["image_encode"]
+        self.features: Optional[torch.Tensor] = None
+        self.handle = module.register_forward_hook(self._hook)
+
+    def _hook(self, module, args, output) -> None:
+        from torch.utils import _pytree as pytree
+
+        maps = [t for t in pytree.tree_leaves(output) if isinstance(t, torch.Tensor) and t.ndim == 4 and t.shape[0] == 1]
+        if maps:
+            self.features = min(maps, key=lambda t: t.shape[-2] * t.shape[-1]).detach()
+
+    @torch.inference_mode()
+    def pool(self, masks: Union[torch.Tensor, np.ndarray]) -> np.ndarray:
+        """
+        Return (N, C) L2-normalized embeddings of (N, H, W) masks from the latest frame.
+
+        Masks in source-image pixels are area-resampled into the top-left
+        region of the feature map that the letterboxed image occupies.
+        """
+        if self.features is None or not len(masks):
+            return np.zeros((len(masks), 0), dtype=np.float32)
+        feats = self.features[0].float()  # (C, h, w)
+        masks = torch.as_tensor(masks, device=feats.device).float()
+        (fh, fw), (h, w) = feats.shape[-2:], masks.shape[-2:]
+        vh, vw = max(1, round(fh * h / max(h, w))), max(1, round(fw * w / max(h, w)))
+        weights = torch.zeros(len(masks), fh, fw, device=feats.device)
+        weights[:, :vh, :vw] = F.adaptive_avg_pool2d(masks[:, None], (vh, vw))[:, 0]
+        emb = torch.einsum("nhw,chw->nc", weights, feats) / weights.sum((1, 2)).clamp_min(1e-6)[:, None]
+        return F.normalize(emb, dim=1).cpu().numpy()
+
+    def close(self) -> None:
+        """Remove the hook."""
+        self.handle.remove()
+
+
+def new_tracker_state(predictor: Any) -> dict:
+    """Give a video predictor a fresh, empty tracking state (``inference_state``) and return it."""
+    predictor.inference_state = {}
+    type(predictor).init_state(predictor)
+    return predictor.inference_state
+
+
+def tracked_masks(state: dict, frame: int) -> Optional[torch.Tensor]:
+    """
+    Low-resolution mask logits (N, h, w) of every object in a video tracking
+    state at ``frame``, in object-index order, or None if the frame was not
+    tracked in that state.
+    """
+    output_dict = state.get("output_dict", {})
+    for key in ("cond_frame_outputs", "non_cond_frame_outputs"):
+        out = output_dict.get(key, {}).get(frame)
+        if out is not None:
+            return out["pred_masks"].flatten(0, 1)
+    return None
+
+
+def _copy_containers(obj: Any) -> Any:
+    if isinstance(obj, dict):
+        return {k: _copy_containers(v) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return type(obj)(_copy_containers(v) for v in obj)
+    return obj
+
+
+@contextmanager
+def shared_image_features(predictor: Any):
+    """
+    Run the image backbone once per frame, however many tracking states query it.
+
+    Video predictors call ``model.forward_image`` for every prompt, memory
+    encoding and tracking step; inside this context the output for the most
+    recent input tensor is reused. Containers are copied on each reuse since
+    callers replace their entries (e.g. expanding features to the object batch).
+    """
+    model = get_model(predictor)
+    original = getattr(model, "forward_image", None)
+    if original is None:
+        yield
+        return
+    patched_already = "forward_image" in vars(model)
+    cache: dict = {}
+
+    def forward_image(img, *args, **kwargs):
+        if cache.get("img") is not img:
+            cache.update(img=img, out=original(img, *args, **kwargs))
+        return _copy_containers(cache["out"])
+
+    model.forward_image = forward_image
+    try:
+        yield
+    finally:
+        if patched_already:
+            model.forward_image = original
+        else:
+            del model.forward_image
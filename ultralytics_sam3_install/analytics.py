@@ -0,0 +1,365 @@
+"""
+Zone and Line Analytics
+Per-camera zone occupancy, dwell time and line-crossing counts computed from
+tracker output, without drawing or re-decoding frames.
+
+Zones are polygons and lines are directed segments, both in the coordinates
+of the boxes passed to ``update`` (source pixels in the person tracker).
+Each frame, every track's anchor point is tested against every zone edge in
+one broadcast (even-odd rule), and the movement since the track's previous
+position is intersected with every line in another. With ``mask_overlap``
+set, zone membership uses the share of each mask inside the zone instead,
+computed as one matrix product over subsampled masks. Per-track state lives
+in arrays that grow by doubling, as in ``tracks.TrackMerger``.
+
+``update`` returns a JSON-serializable record per frame; ``MetricsWriter``
+streams records as JSON lines, so the feed can be tailed or piped while the
+video is processed.
+
+Example:
+    analytics = ZoneAnalytics.from_config("zones.json", fps=25)
+    with MetricsWriter("metrics.jsonl") as feed:
+        for ids, boxes in tracks:
+            feed.write(analytics.update(ids, boxes))
+    print(analytics.summary())
+
+Config file:
+    {"camera": "entrance-1",
+     "zones": {"queue": [[100, 400], [600, 400], [600, 700], [100, 700]]},
+     "lines": {"door": [[800, 200], [800, 900]]}}
+"""
+
+import json
+import sys
+from pathlib import Path
+from typing import Any, Iterator, Optional, TextIO, Union
+
+import cv2
+import numpy as np
+
+from ultralytics_sam3_install.tracks import to_numpy
+
+
+class ZoneAnalytics:
+    """
+    Streaming zone occupancy, dwell time and line-crossing counter for one camera.
+
+    A line crossing is counted as "in" when a track moves to the left of the
+    line's start -> end direction (counter-clockwise side in image
+    coordinates, y pointing down: crossing a vertical line drawn top to
+    bottom from left to right), and "out" for the opposite direction.
+
+    Args:
+        zones: Zone name -> (K, 2) polygon vertices
+        lines: Line name -> ((x1, y1), (x2, y2)) endpoints
+        camera: Camera identifier included in every record
+        fps: Frame rate used to convert frame indices to seconds
+        anchor: Point of the box tested against zones and lines: "bottom_center" or "center"
+        mask_overlap: If set, a track is inside a zone when at least this share of
+            its mask is inside (masks must be passed to ``update``)
+        mask_stride: Subsampling step applied to masks for the overlap test
+        max_age: Frames a track may go unseen before it leaves its zones
+        capacity: Initial number of tracks (grows by doubling)
+
+    Attributes:
+        crossings: Line name -> {"in": count, "out": count}
+        visits: (Z,) completed zone visits
+        dwell_total: (Z,) seconds spent in each zone over completed visits
+    """
+
+    def __init__(
+        self,
+        zones: Optional[dict[str, Any]] = None,
+        lines: Optional[dict[str, Any]] = None,
+        camera: str = "camera",
+        fps: float = 30.0,
+        anchor: str = "bottom_center",
+        mask_overlap: Optional[float] = None,
+        mask_stride: int = 4,
+        max_age: int = 30,
+        capacity: int = 256,
+    ):
+        self.camera = camera
+        self.fps = fps
+        self.anchor = anchor
+        self.mask_overlap = mask_overlap
+        self.mask_stride = max(1, mask_stride)
+        self.max_age = max_age
+        self.zone_names = list(zones or {})
+        self.line_names = list(lines or {})
+        self.polygons = [np.asarray(p, dtype=np.float32).reshape(-1, 2) for p in (zones or {}).values()]
+        if any(len(p) < 3 for p in self.polygons):
+            raise ValueError("Zones need at least 3 vertices")
+        self.segments = np.asarray([np.reshape(s, 4) for s in (lines or {}).values()], np.float32).reshape(-1, 4)
+
+        # All zone edges padded to one (Z, K, 2) start/end array; padding edges are degenerate
+        k = max((len(p) for p in self.polygons), default=0)
+        self.edge_a = np.zeros((len(self.polygons), k, 2), np.float32)
+        self.edge_b = np.zeros((len(self.polygons), k, 2), np.float32)
+        self.edge_valid = np.zeros((len(self.polygons), k), bool)
+        for z, p in enumerate(self.polygons):
+            self.edge_a[z, : len(p)] = p
+            self.edge_b[z, : len(p)] = np.roll(p, -1, axis=0)
+            self.edge_valid[z, : len(p)] = True
+        self._rasters: dict[tuple, np.ndarray] = {}
+
+        Z = len(self.zone_names)
+        self.row_of: dict[int, int] = {}
+        self.track_id = np.zeros(capacity, np.int64)
+        self.last_seen = np.full(capacity, -(10**9), np.int64)
+        self.position = np.zeros((capacity, 2), np.float32)
+        self.inside = np.zeros((capacity, Z), bool)
+        self.entered = np.zeros((capacity, Z), np.float64)
+        self.rows = 0
+        self.visits = np.zeros(Z, np.int64)
+        self.dwell_total = np.zeros(Z, np.float64)
+        self.crossings = {name: {"in": 0, "out": 0} for name in self.line_names}
+        self.frame = -1
+
+    @classmethod
+    def from_config(cls, config: Union[str, Path, dict], **kwargs) -> "ZoneAnalytics":
+        """
+        Build from a JSON file or dict with ``camera``, ``zones`` and ``lines``.
+
+        Other keys (``anchor``, ``mask_overlap``, ...) are passed to the
+        constructor; keyword arguments take precedence.
+        """
+        if not isinstance(config, dict):
+            config = json.loads(Path(config).read_text())
+        return cls(**{**config, **kwargs})
+
+    def anchors(self, boxes: np.ndarray) -> np.ndarray:
+        """Return (N, 2) anchor points of xyxy boxes."""
+        x = (boxes[:, 0] + boxes[:, 2]) / 2
+        y = boxes[:, 3] if self.anchor == "bottom_center" else (boxes[:, 1] + boxes[:, 3]) / 2
+        return np.stack([x, y], 1)
+
+    def points_in_zones(self, points: np.ndarray) -> np.ndarray:
+        """Return (N, Z) membership of points in every zone (even-odd rule, all edges at once)."""
+        if not len(self.zone_names) or not len(points):
+            return np.zeros((len(points), len(self.zone_names)), bool)
+        px, py = points[:, 0, None, None], points[:, 1, None, None]
+        (ax, ay), (bx, by) = self.edge_a.transpose(2, 0, 1)[:, None], self.edge_b.transpose(2, 0, 1)[:, None]
+        straddles = (ay > py) != (by > py)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            x_cross = ax + (py - ay) * (bx - ax) / (by - ay)
+        hits = straddles & (px < x_cross) & self.edge_valid[None]
+        return hits.sum(axis=2) % 2 == 1
+
+    def _raster(self, shape: tuple[int, int], scale: float) -> np.ndarray:
+        """Return (Z, h*w) float32 zone masks for a subsampled mask grid (cached per shape)."""
+        key = (shape, scale)
+        if key not in self._rasters:
+            s = self.mask_stride
+            h, w = -(-shape[0] // s), -(-shape[1] // s)
+            rasters = np.zeros((len(self.polygons), h, w), np.uint8)
+            for z, p in enumerate(self.polygons):
+                cv2.fillPoly(rasters[z], [np.round(p * scale / s).astype(np.int32)], 1)
+            self._rasters[key] = rasters.reshape(len(self.polygons), -1).astype(np.float32)
+        return self._rasters[key]
+
+    def masks_in_zones(self, masks: np.ndarray, scale: float = 1.0) -> np.ndarray:
+        """
+        Return (N, Z) membership from the share of each mask inside every zone.
+
+        Args:
+            masks: (N, h, w) boolean masks
+            scale: Mask resolution divided by the zone coordinate resolution
+        """
+        s = self.mask_stride
+        sub = masks[:, ::s, ::s].reshape(len(masks), -1).astype(np.float32)
+        inside = sub @ self._raster(masks.shape[1:], scale).T
+        return inside >= self.mask_overlap * np.maximum(sub.sum(axis=1, keepdims=True), 1.0)
+
+    def _crossings(self, start: np.ndarray, end: np.ndarray) -> np.ndarray:
+        """Return (N, L) crossing direction of each movement over each line: +1 in, -1 out, 0 none."""
+        if not len(self.segments) or not len(start):
+            return np.zeros((len(start), len(self.segments)), np.int8)
+        a, b = self.segments[None, :, :2], self.segments[None, :, 2:]
+        p, q = start[:, None], end[:, None]
+
+        def cross(o, u, v):
+            return (u[..., 0] - o[..., 0]) * (v[..., 1] - o[..., 1]) - (u[..., 1] - o[..., 1]) * (v[..., 0] - o[..., 0])
+
+        # y points down, so a negative cross product is the left (counter-clockwise) side;
+        # points exactly on the line count as right, so jitter on the line is not double-counted
+        left_p, left_q = cross(a, b, p) < 0, cross(a, b, q) < 0
+        hit = (left_p != left_q) & (np.sign(cross(p, q, a)) != np.sign(cross(p, q, b)))
+        return np.where(hit, np.where(left_q, 1, -1), 0).astype(np.int8)
+
+    def _rows(self, ids: np.ndarray) -> np.ndarray:
+        """Look up (or allocate) the state row of each track ID."""
+        rows = np.empty(len(ids), np.int64)
+        for i, tid in enumerate(ids.tolist()):
+            row = self.row_of.get(tid)
+            if row is None:
+                row = self.row_of[tid] = self.rows
+                self.rows += 1
+                if self.rows > len(self.track_id):
+                    self._grow()
+                self.track_id[row] = tid
+            rows[i] = row
+        return rows
+
+    def _grow(self) -> None:
+        pad = len(self.track_id)
+        self.track_id = np.concatenate([self.track_id, np.zeros(pad, np.int64)])
+        self.last_seen = np.concatenate([self.last_seen, np.full(pad, -(10**9), np.int64)])
+        self.position = np.concatenate([self.position, np.zeros((pad, 2), np.float32)])
+        self.inside = np.concatenate([self.inside, np.zeros((pad, self.inside.shape[1]), bool)])
+        self.entered = np.concatenate([self.entered, np.zeros((pad, self.entered.shape[1]), np.float64)])
+
+    def _leave(self, rows: np.ndarray, zones: np.ndarray, times: np.ndarray, events: list) -> None:
+        """Close the visits of (rows[i], zones[i]) ending at ``times[i]``."""
+        dwell = np.maximum(times - self.entered[rows, zones], 0.0)
+        np.add.at(self.dwell_total, zones, dwell)
+        np.add.at(self.visits, zones, 1)
+        self.inside[rows, zones] = False
+        for r, z, d in zip(rows.tolist(), zones.tolist(), dwell.tolist()):
+            events.append(dict(type="exit", track=int(self.track_id[r]), zone=self.zone_names[z], dwell=round(d, 3)))
+
+    def update(
+        self,
+        tracker_ids: Optional[Any],
+        boxes: Any,
+        masks: Optional[Any] = None,
+        frame: Optional[int] = None,
+        time: Optional[float] = None,
+        mask_scale: float = 1.0,
+    ) -> dict:
+        """
+        Process one frame of tracks.
+
+        Args:
+            tracker_ids: (N,) stable track IDs (None when the frame has no tracks)
+            boxes: (N, 4) xyxy boxes in zone/line coordinates
+            masks: (N, h, w) boolean masks (used when ``mask_overlap`` is set)
+            frame: Frame index (defaults to the previous index + 1)
+            time: Timestamp in seconds (defaults to ``frame / fps``)
+            mask_scale: Mask resolution divided by the box resolution
+
+        Returns:
+            Metrics record for this frame: ``camera``, ``frame``, ``time``,
+            ``count``, per-zone ``occupancy``/``tracks``/``dwell``, cumulative
+            line counts and the frame's enter/exit/cross ``events``
+        """
+        self.frame = self.frame + 1 if frame is None else frame
+        now = self.frame / self.fps if time is None else time
+        events: list[dict] = []
+        ids = np.zeros(0, np.int64) if tracker_ids is None else to_numpy(tracker_ids).astype(np.int64).ravel()
+        boxes = to_numpy(boxes).astype(np.float32).reshape(-1, 4)[: len(ids)]
+        rows = self._rows(ids)
+        points = self.anchors(boxes)
+
+        # Line crossings from each track's previous position (if seen recently)
+        recent = (self.frame - self.last_seen[rows]) <= self.max_age
+        moves = self._crossings(self.position[rows[recent]], points[recent])
+        for i, l in zip(*np.nonzero(moves)):
+            direction = "in" if moves[i, l] > 0 else "out"
+            self.crossings[self.line_names[l]][direction] += 1
+            events.append(dict(type="cross", track=int(ids[recent][i]), line=self.line_names[l], direction=direction))
+        self.position[rows] = points
+        self.last_seen[rows] = self.frame
+
+        # Zone membership, entries and exits of tracks seen this frame
+        if self.mask_overlap is not None and masks is not None and len(ids):
+            inside = self.masks_in_zones(to_numpy(masks).astype(bool), mask_scale)
+        else:
+            inside = self.points_in_zones(points)
+        was = self.inside[rows]
+        r, z = np.nonzero(inside & ~was)
+        self.inside[rows[r], z] = True
+        self.entered[rows[r], z] = now
+        events += [dict(type="enter", track=int(ids[i]), zone=self.zone_names[j]) for i, j in zip(r.tolist(), z.tolist())]
+        r, z = np.nonzero(was & ~inside)
+        self._leave(rows[r], z, np.full(len(r), now), events)
+
+        # Tracks lost for longer than max_age leave their zones at their last sighting
+        lost = np.flatnonzero(self.frame - self.last_seen[: self.rows] > self.max_age)
+        r, z = np.nonzero(self.inside[lost])
+        self._leave(lost[r], z, self.last_seen[lost[r]] / self.fps, events)
+
+        zones = {}
+        for j, name in enumerate(self.zone_names):
+            members = np.flatnonzero(inside[:, j])
+            zones[name] = dict(
+                occupancy=len(members),
+                tracks=ids[members].tolist(),
+                dwell=np.round(now - self.entered[rows[members], j], 3).tolist(),
+            )
+        return dict(
+            camera=self.camera,
+            frame=int(self.frame),
+            time=round(float(now), 3),
+            count=len(ids),
+            zones=zones,
+            lines={name: dict(c) for name, c in self.crossings.items()},
+            events=events,
+        )
+
+    def feed(self, results: Iterator[Any]) -> Iterator[dict]:
+        """Yield a metrics record for each ultralytics ``Results`` of a tracking stream."""
+        for result in results:
+            boxes = result.boxes
+            ids = None if boxes is None or boxes.id is None else boxes.id
+            masks = result.masks.data if self.mask_overlap is not None and result.masks is not None else None
+            yield self.update(ids, boxes.xyxy if ids is not None else np.zeros((0, 4)), masks)
+
+    def summary(self) -> dict:
+        """Totals per zone (visits, total and mean dwell) and line, counting visits still open."""
+        open_rows, open_zones = np.nonzero(self.inside[: self.rows])
+        now = self.frame / self.fps
+        visits, dwell = self.visits.copy(), self.dwell_total.copy()
+        np.add.at(visits, open_zones, 1)
+        np.add.at(dwell, open_zones, now - self.entered[open_rows, open_zones])
+        zones = {
+            name: dict(visits=int(visits[j]), dwell=round(float(dwell[j]), 3), mean_dwell=round(float(dwell[j] / max(visits[j], 1)), 3))
+            for j, name in enumerate(self.zone_names)
+        }
+        return dict(camera=self.camera, frames=self.frame + 1, zones=zones, lines={k: dict(v) for k, v in self.crossings.items()})
+
+    def draw(self, frame: np.ndarray, record: Optional[dict] = None, color: tuple[int, int, int] = (0, 255, 255)) -> np.ndarray:
+        """Draw zones and lines with their current counts onto ``frame`` in place and return it."""
+        for j, (name, p) in enumerate(zip(self.zone_names, self.polygons)):
+            pts = np.round(p).astype(np.int32)
+            cv2.polylines(frame, [pts], True, color, 2, cv2.LINE_AA)
+            label = name if record is None else f"{name}: {record['zones'][name]['occupancy']}"
+            cv2.putText(frame, label, tuple(pts.min(axis=0).tolist()), cv2.FONT_HERSHEY_SIMPLEX, 0.6, color, 2, cv2.LINE_AA)
+        for name, s in zip(self.line_names, np.round(self.segments).astype(np.int32)):
+            cv2.line(frame, tuple(s[:2].tolist()), tuple(s[2:].tolist()), color, 2, cv2.LINE_AA)
+            c = self.crossings[name]
+            label = f"{name}: in {c['in']} / out {c['out']}"
+            cv2.putText(frame, label, tuple(s[:2].tolist()), cv2.FONT_HERSHEY_SIMPLEX, 0.6, color, 2, cv2.LINE_AA)
+        return frame
+
+
+class MetricsWriter:
+    """
+    Write metrics records as JSON lines, flushed per record so the feed can be followed live.
+
+    Args:
+        target: File path, "-" for stdout, or an open text stream
+    """
+
+    def __init__(self, target: Union[str, Path, TextIO]):
+        if target == "-":
+            self.stream, self.owned = sys.stdout, False
+        elif isinstance(target, (str, Path)):
+            self.stream, self.owned = open(target, "w"), True
+        else:
+            self.stream, self.owned = target, False
+
+    def write(self, record: dict) -> None:
+        """Append one record."""
+        self.stream.write(json.dumps(record, separators=(",", ":")) + "\n")
+        self.stream.flush()
+
+    def close(self) -> None:
+        if self.owned:
+            self.stream.close()
+
+    def __enter__(self) -> "MetricsWriter":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
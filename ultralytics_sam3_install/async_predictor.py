@@ -0,0 +1,197 @@
+"""
+Async Predictor Facade
+asyncio-native wrapper around SAM3Predictor, SAM3SemanticPredictor and
+SAM3VideoSemanticPredictor.
+
+Every predictor call runs on a dedicated single-thread executor (predictors are
+stateful and not thread-safe), so the event loop is never blocked. Calls are
+bounded by a semaphore for backpressure, support timeouts and cancellation, and
+video streams are exposed as async iterators fed through a bounded queue.
+"""
+
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from typing import Any, AsyncIterator, Optional
+
+from ultralytics_sam3_install.predictors import as_list
+
+_STREAM_END = object()
+
+
+class AsyncPredictor:
+    """
+    Run a SAM3 predictor from asyncio code.
+
+    Example:
+        predictor = SAM3SemanticPredictor(overrides=overrides, bpe_path=bpe_path)
+        async with AsyncPredictor(predictor, max_pending=4) as apred:
+            await apred.set_image("image.jpg")
+            results = await apred.predict(text=["person"], timeout=30)
+            async for result in apred.stream(source="video.mp4", text=["person"]):
+                ...
+    """
+
+    def __init__(
+        self,
+        predictor: Any,
+        max_pending: int = 4,
+        executor: Optional[ThreadPoolExecutor] = None,
+    ):
+        """
+        Args:
+            predictor: Any SAM3 predictor instance
+            max_pending: Maximum number of calls queued or running at once;
+                further callers wait (backpressure)
+            executor: Executor to run calls on. Defaults to a private
+                single-thread executor owned by this facade
+        """
+        if max_pending < 1:
+            raise ValueError(f"max_pending must be >= 1, got {max_pending}")
+        self.predictor = predictor
+        self._owns_executor = executor is None
+        self._executor = executor or ThreadPoolExecutor(max_workers=1, thread_name_prefix="sam3-predictor")
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._max_pending = max_pending
+
+    @property
+    def slots(self) -> asyncio.Semaphore:
+        """Semaphore bounding in-flight calls, created lazily on the running loop."""
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self._max_pending)
+        return self._slots
+
+    async def run(self, fn, *args, timeout: Optional[float] = None, **kwargs) -> Any:
+        """
+        Run ``fn(*args, **kwargs)`` on the predictor executor.
+
+        Args:
+            fn: Callable to execute (usually a bound predictor method)
+            timeout: Seconds to wait before raising asyncio.TimeoutError
+
+        Returns:
+            Return value of ``fn``
+
+        Note:
+            A call that has not started yet is dropped on cancellation or
+            timeout. A call that is already running on the executor cannot be
+            interrupted and finishes in the background.
+        """
+        async with self.slots:
+            loop = asyncio.get_running_loop()
+            future = loop.run_in_executor(self._executor, lambda: fn(*args, **kwargs))
+            try:
+                return await asyncio.wait_for(future, timeout)
+            except (asyncio.CancelledError, asyncio.TimeoutError):
+                future.cancel()
+                raise
+
+    async def set_image(self, image: Any, timeout: Optional[float] = None) -> None:
+        """Encode an image once for subsequent prompt calls."""
+        await self.run(self.predictor.set_image, image, timeout=timeout)
+
+    async def predict(self, source: Any = None, timeout: Optional[float] = None, **kwargs) -> list:
+        """
+        Run a single (non-streaming) prediction.
+
+        Args:
+            source: Image source, or None to use the image set with set_image
+            timeout: Seconds to wait before raising asyncio.TimeoutError
+            **kwargs: Prompts and options forwarded to the predictor
+                (text, bboxes, points, point_labels, save, ...)
+
+        Returns:
+            List of Results
+        """
+        kwargs.pop("stream", None)
+        return as_list(await self.run(self.predictor, source, timeout=timeout, **kwargs))
+
+    async def stream(
+        self,
+        source: Any,
+        max_buffer: int = 8,
+        frame_timeout: Optional[float] = None,
+        **kwargs,
+    ) -> AsyncIterator[Any]:
+        """
+        Iterate over per-frame Results of a video source.
+
+        Decoding and inference run on the executor thread. At most
+        ``max_buffer`` results are buffered; when the consumer falls behind the
+        worker blocks until there is room, so memory stays bounded.
+
+        Args:
+            source: Video path, stream URL or any source the predictor accepts
+            max_buffer: Maximum number of undelivered results
+            frame_timeout: Seconds to wait for each frame before raising
+                asyncio.TimeoutError
+            **kwargs: Prompts and options forwarded to the predictor
+
+        Yields:
+            Results for each frame, in order
+
+        Note:
+            Leaving the loop early (break, error or timeout) returns at once.
+            The executor finishes the frame being decoded or predicted in the
+            background before it runs the next call.
+        """
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue(maxsize=max_buffer)
+        stop = threading.Event()
+        kwargs["stream"] = True
+
+        def put(item) -> bool:
+            """Block the worker until the item is queued; False once the consumer is gone."""
+            # One put per item: a timed-out wait may already have queued it, so keep waiting
+            # on the same future and cancel only when stopping
+            future = asyncio.run_coroutine_threadsafe(queue.put(item), loop)
+            while not stop.is_set():
+                try:
+                    future.result(timeout=0.1)
+                    return True
+                except FutureTimeoutError:
+                    continue
+                except Exception:
+                    return False
+            future.cancel()
+            return False
+
+        def produce() -> None:
+            try:
+                for result in self.predictor(source, **kwargs):
+                    if not put(result):
+                        return
+            except BaseException as e:  # propagate to the consumer
+                put(e)
+            else:
+                put(_STREAM_END)
+
+        async with self.slots:
+            worker = loop.run_in_executor(self._executor, produce)
+            try:
+                while True:
+                    item = await asyncio.wait_for(queue.get(), frame_timeout)
+                    if item is _STREAM_END:
+                        break
+                    if isinstance(item, BaseException):
+                        raise item
+                    yield item
+            finally:
+                stop.set()
+                # Drain so a worker blocked on a full queue can observe ``stop``
+                while not queue.empty():
+                    queue.get_nowait()
+                # Not awaited: a hung source would hold the caller past ``frame_timeout``.
+                # The worker stops at its next frame; ``aclose`` joins it
+
+    async def aclose(self) -> None:
+        """Shut down the private executor (waits for the running call to finish)."""
+        if self._owns_executor:
+            await asyncio.get_running_loop().run_in_executor(None, self._executor.shutdown)
+
+    async def __aenter__(self) -> "AsyncPredictor":
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        await self.aclose()
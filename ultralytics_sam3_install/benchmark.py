@@ -0,0 +1,376 @@
+#!/usr/bin/env python3
+"""
+SAM3 Benchmark Suite
+Measures cold/warm latency, throughput vs batch size, peak host RSS and peak
+device memory for the four modes exercised by ``tests/v8.3.237/00-basic``:
+text prompts, visual prompts, exemplar prompts and video tracking.
+
+Results are written as JSON so runs can be compared for regressions.
+
+Usage:
+    python -m ultralytics_sam3_install.benchmark --output bench.json
+    python -m ultralytics_sam3_install.benchmark --random-weights --modes text visual   # no checkpoint
+"""
+
+import argparse
+import gc
+import json
+import os
+import platform
+import statistics
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Callable, Optional
+
+import cv2
+import numpy as np
+import torch
+
+from ultralytics_sam3_install.memory import PeakMemory
+from ultralytics_sam3_install.predictors import DEFAULT_BPE, DEFAULT_MODEL, build_predictor
+from ultralytics_sam3_install.sweep import PromptSweep
+
+MODES = ("text", "visual", "exemplar", "video")
+
+# Concepts cycled through when scaling the number of text prompts per call
+CONCEPTS = ["person", "bus", "glasses", "car", "bicycle", "dog", "bag", "shoe", "hat", "window"]
+
+
+def summarize(samples: list[float]) -> dict:
+    """
+    Summarize latency samples in milliseconds.
+
+    Args:
+        samples: Latencies in seconds
+
+    Returns:
+        Dict with n, mean, median, p90, p99, std, min and max in ms
+    """
+    ms = sorted(s * 1000 for s in samples)
+    if not ms:
+        return {"n": 0}
+
+    def percentile(q: float) -> float:
+        return ms[min(len(ms) - 1, int(round(q * (len(ms) - 1))))]
+
+    return dict(
+        n=len(ms),
+        mean=statistics.fmean(ms),
+        median=statistics.median(ms),
+        p90=percentile(0.90),
+        p99=percentile(0.99),
+        std=statistics.stdev(ms) if len(ms) > 1 else 0.0,
+        min=ms[0],
+        max=ms[-1],
+    )
+
+
+def sync() -> None:
+    """Wait for queued device work so timings cover the whole call."""
+    if torch.cuda.is_available():
+        torch.cuda.synchronize()
+
+
+def time_call(fn: Callable[[], Any], warmup: int, repeats: int) -> dict:
+    """
+    Time a callable: first call (cold), ``warmup`` discarded calls, then ``repeats`` timed calls.
+
+    Returns:
+        Dict with cold_ms, latency_ms summary, peak_rss_mb and device_peak_mb
+    """
+    with PeakMemory() as mem:
+        start = time.perf_counter()
+        fn()
+        sync()
+        cold = time.perf_counter() - start
+        for _ in range(warmup):
+            fn()
+        sync()
+        samples = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            fn()
+            sync()
+            samples.append(time.perf_counter() - start)
+    return dict(
+        cold_ms=cold * 1000,
+        latency_ms=summarize(samples),
+        peak_rss_mb=mem.peak_rss_mb,
+        device_peak_mb=mem.device_peak_mb,
+    )
+
+
+def throughput(fn: Callable[[int], Any], batch_sizes: list[int], warmup: int, repeats: int) -> dict:
+    """
+    Measure items/sec for each batch size.
+
+    Args:
+        fn: Callable processing ``n`` items per call
+        batch_sizes: Values of ``n`` to measure
+
+    Returns:
+        Dict keyed by batch size with items_per_s and latency_ms summary
+    """
+    out = {}
+    for n in batch_sizes:
+        stats = time_call(lambda: fn(n), warmup, repeats)
+        median_s = stats["latency_ms"]["median"] / 1000
+        out[str(n)] = dict(items_per_s=n / median_s if median_s else None, **stats)
+    return out
+
+
+def synthetic_image(width: int = 640, height: int = 480, seed: int = 0) -> np.ndarray:
+    """Return a reproducible random BGR image."""
+    return np.random.default_rng(seed).integers(0, 255, (height, width, 3), dtype=np.uint8)
+
+
+def synthetic_video(path: Path, frames: int = 8, width: int = 320, height: int = 240) -> str:
+    """Write a short reproducible video with a moving square and return its path."""
+    writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*"mp4v"), 10, (width, height))
+    for i in range(frames):
+        frame = synthetic_image(width, height, seed=i) // 4
+        x = 20 + i * 10
+        cv2.rectangle(frame, (x, 60), (x + 60, 160), (0, 0, 255), -1)
+        writer.write(frame)
+    writer.release()
+    return str(path)
+
+
+def bench_text(predictor, image, cfg) -> dict:
+    """Text prompts with SAM3SemanticPredictor (test 01)."""
+    cases = {}
+    t0 = time.perf_counter()
+    predictor.set_image(image)  # builds the model on first use
+    cases["load_ms"] = (time.perf_counter() - t0) * 1000
+    cases["encode"] = time_call(lambda: predictor.set_image(image), cfg.warmup, cfg.repeats)
+    cases["prompt"] = time_call(lambda: predictor(text=CONCEPTS[:3], save=False), cfg.warmup, cfg.repeats)
+
+    def end_to_end():
+        predictor.set_image(image)
+        return predictor(text=CONCEPTS[:3], save=False)
+
+    cases["end_to_end"] = time_call(end_to_end, cfg.warmup, cfg.repeats)
+    cases["concepts_per_call"] = throughput(
+        lambda n: predictor(text=[CONCEPTS[i % len(CONCEPTS)] for i in range(n)], save=False),
+        cfg.batch_sizes,
+        cfg.warmup,
+        cfg.repeats,
+    )
+    return cases
+
+
+def bench_visual(predictor, image, cfg) -> dict:
+    """Point and box prompts with SAM3Predictor (test 02)."""
+    h, w = image.shape[:2]
+    cases = {}
+    t0 = time.perf_counter()
+    predictor.set_image(image)
+    cases["load_ms"] = (time.perf_counter() - t0) * 1000
+    cases["encode"] = time_call(lambda: predictor.set_image(image), cfg.warmup, cfg.repeats)
+    point = [[w // 2, h // 2]]
+    box = [[w // 4, h // 4, 3 * w // 4, 3 * h // 4]]
+    cases["points"] = time_call(lambda: predictor(points=point, point_labels=[1], save=False), cfg.warmup, cfg.repeats)
+    cases["box"] = time_call(lambda: predictor(bboxes=box, save=False), cfg.warmup, cfg.repeats)
+
+    sweep = PromptSweep(predictor)
+    sweep.set_image(image)
+    rng = np.random.default_rng(0)
+
+    def decode(n):
+        sweep.batch_size = n
+        clicks = rng.uniform((0, 0), (w, h), (n, 2))
+        return list(sweep.run_points(clicks, return_masks=False))
+
+    cases["prompts_per_call"] = throughput(decode, cfg.batch_sizes, cfg.warmup, cfg.repeats)
+    return cases
+
+
+def bench_exemplar(predictor, image, cfg) -> dict:
+    """Exemplar box prompts with SAM3SemanticPredictor (test 03)."""
+    h, w = image.shape[:2]
+    cases = {}
+    t0 = time.perf_counter()
+    predictor.set_image(image)
+    cases["load_ms"] = (time.perf_counter() - t0) * 1000
+    rng = np.random.default_rng(0)
+
+    def boxes(n):
+        xy = rng.uniform((0, 0), (w * 0.75, h * 0.75), (n, 2))
+        return np.concatenate([xy, xy + (w / 4, h / 4)], 1).tolist()
+
+    box = boxes(1)
+    cases["prompt"] = time_call(lambda: predictor(bboxes=box, save=False), cfg.warmup, cfg.repeats)
+    cases["exemplars_per_call"] = throughput(
+        lambda n: predictor(bboxes=boxes(n), save=False), cfg.batch_sizes, cfg.warmup, cfg.repeats
+    )
+    return cases
+
+
+def bench_video(predictor, video, cfg) -> dict:
+    """Box-prompted tracking with SAM3VideoPredictor (test 04)."""
+    cap = cv2.VideoCapture(video)
+    w, h = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)), int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+    cap.release()
+
+    def run(n_objects: int) -> list[float]:
+        step = w / (n_objects + 1)
+        bboxes = [[step * (i + 0.5), h * 0.25, step * (i + 1.5), h * 0.75] for i in range(n_objects)]
+        times = []
+        start = time.perf_counter()
+        for _ in predictor(source=video, bboxes=bboxes, stream=True, save=False):
+            sync()
+            now = time.perf_counter()
+            times.append(now - start)
+            start = now
+        return times
+
+    cases = {}
+    with PeakMemory() as mem:
+        frame_times = run(1)
+    cases["first_run"] = dict(
+        cold_ms=frame_times[0] * 1000 if frame_times else None,
+        latency_ms=summarize(frame_times[1:]),
+        peak_rss_mb=mem.peak_rss_mb,
+        device_peak_mb=mem.device_peak_mb,
+    )
+    for _ in range(cfg.warmup):
+        run(1)
+    objects = {}
+    for n in cfg.batch_sizes:
+        with PeakMemory() as mem:
+            frame_times = [t for _ in range(cfg.repeats) for t in run(n)[1:]]
+        total = sum(frame_times)
+        objects[str(n)] = dict(
+            frames_per_s=len(frame_times) / total if total else None,
+            latency_ms=summarize(frame_times),
+            peak_rss_mb=mem.peak_rss_mb,
+            device_peak_mb=mem.device_peak_mb,
+        )
+    cases["objects_tracked"] = objects
+    return cases
+
+
+def environment() -> dict:
+    """Describe the host and software stack so reports are comparable."""
+    info = dict(
+        python=platform.python_version(),
+        platform=platform.platform(),
+        processor=platform.processor(),
+        cpu_count=os.cpu_count(),
+        torch=torch.__version__,
+        torch_threads=torch.get_num_threads(),
+        cuda=torch.version.cuda if torch.cuda.is_available() else None,
+        device=torch.cuda.get_device_name(0) if torch.cuda.is_available() else "cpu",
+    )
+    try:
+        import ultralytics
+
+        info["ultralytics"] = ultralytics.__version__
+    except ImportError:
+        pass
+    return info
+
+
+def run_benchmarks(cfg: argparse.Namespace) -> dict:
+    """
+    Run the selected benchmark modes.
+
+    Args:
+        cfg: Parsed command-line options (see ``parse_args``)
+
+    Returns:
+        JSON-serializable report
+    """
+    overrides = dict(half=cfg.half)
+    if cfg.device is not None:
+        overrides["device"] = cfg.device
+    image = cv2.imread(cfg.image) if cfg.image else synthetic_image()
+    if image is None:
+        raise FileNotFoundError(f"Could not read image: {cfg.image}")
+    report = dict(
+        created=time.time(),
+        environment=environment(),
+        config=dict(
+            modes=cfg.modes,
+            warmup=cfg.warmup,
+            repeats=cfg.repeats,
+            batch_sizes=cfg.batch_sizes,
+            random_weights=cfg.random_weights,
+            half=cfg.half,
+            device=cfg.device,
+            image=cfg.image,
+            image_shape=list(image.shape),
+            video=cfg.video,
+        ),
+        results={},
+    )
+    with tempfile.TemporaryDirectory() as tmp:
+        video = cfg.video or synthetic_video(Path(tmp) / "synthetic.mp4")
+        for mode in cfg.modes:
+            kind = {"text": "semantic", "visual": "visual", "exemplar": "semantic", "video": "video"}[mode]
+            print(f"[benchmark] {mode} ({kind} predictor)...")
+            t0 = time.perf_counter()
+            predictor = build_predictor(kind, cfg.model, cfg.bpe, random_init=cfg.random_weights, **overrides)
+            build_ms = (time.perf_counter() - t0) * 1000
+            if mode == "video":
+                cases = bench_video(predictor, video, cfg)
+            else:
+                cases = {"text": bench_text, "visual": bench_visual, "exemplar": bench_exemplar}[mode](
+                    predictor, image, cfg
+                )
+            report["results"][mode] = dict(build_ms=build_ms, **cases)
+            del predictor
+            gc.collect()
+            if torch.cuda.is_available():
+                torch.cuda.empty_cache()
+    return report
+
+
+def parse_args(argv: Optional[list[str]] = None) -> argparse.Namespace:
+    """Parse benchmark options."""
+    parser = argparse.ArgumentParser(description="Benchmark SAM3 predictors")
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=list(MODES), help="Modes to benchmark")
+    parser.add_argument("--model", type=str, default=str(DEFAULT_MODEL), help="Path to SAM3 weights")
+    parser.add_argument("--bpe", type=str, default=str(DEFAULT_BPE), help="Path to BPE vocabulary")
+    parser.add_argument("--image", type=str, default=None, help="Image to use (default: synthetic)")
+    parser.add_argument("--video", type=str, default=None, help="Video to use (default: synthetic)")
+    parser.add_argument("--warmup", type=int, default=2, help="Discarded calls after the cold call")
+    parser.add_argument("--repeats", type=int, default=10, help="Timed calls per case")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 4, 16], help="Batch sizes for throughput")
+    parser.add_argument("--device", type=str, default=None, help="Device override, e.g. cpu or 0")
+    parser.add_argument("--half", action=argparse.BooleanOptionalAction, default=True, help="Use FP16")
+    parser.add_argument(
+        "--random-weights",
+        action="store_true",
+        help="Full-size model with random weights (no checkpoint download), CPU, FP32, few repeats",
+    )
+    parser.add_argument("--output", type=str, default=None, help="Write JSON report to this path")
+    cfg = parser.parse_args(argv)
+    if cfg.random_weights:
+        # SAM3's builders fix the architecture, so this profile is still the
+        # full-size model (GBs of RAM, seconds per call on CPU); it only skips
+        # the checkpoint and shrinks the work (iterations, batch sizes)
+        cfg.device = cfg.device or "cpu"
+        cfg.half = False
+        cfg.warmup = min(cfg.warmup, 1)
+        cfg.repeats = min(cfg.repeats, 3)
+        cfg.batch_sizes = [n for n in cfg.batch_sizes if n <= 4] or [1]
+    return cfg
+
+
+def main(argv: Optional[list[str]] = None) -> dict:
+    """Run the benchmark suite from the command line."""
+    cfg = parse_args(argv)
+    report = run_benchmarks(cfg)
+    text = json.dumps(report, indent=2)
+    if cfg.output:
+        Path(cfg.output).write_text(text)
+        print(f"[benchmark] Saved report to: {cfg.output}")
+    else:
+        print(text)
+    return report
+
+
+if __name__ == "__main__":
+    main()
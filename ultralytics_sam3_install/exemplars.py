@@ -0,0 +1,208 @@
+"""
+Exemplar Library
+Persistent store of encoded SAM3 exemplar prompts.
+
+Exemplar boxes are encoded once against their source image and the resulting
+prompt embeddings are saved to disk. Applying a set of exemplars to a new image
+then costs one backbone pass for that image only: the exemplars' source images
+are never decoded or encoded again.
+
+Layout on disk:
+    <root>/index.json          name -> metadata (bbox, source, model, shape)
+    <root>/embeddings/<name>.pt
+"""
+
+import json
+import os
+import time
+from pathlib import Path
+from typing import Any, Iterable, Optional, Union
+
+import numpy as np
+import torch
+
+from ultralytics_sam3_install import _sam3
+from ultralytics_sam3_install.predictors import as_list
+
+
+class ExemplarLibrary:
+    """
+    Register exemplar crops once and reuse their encoded features on any image.
+
+    Example:
+        library = ExemplarLibrary("exemplars/")
+        library.register(predictor, "catalog/sku-123.jpg", {"sku-123": [480, 290, 590, 650]})
+        results = library.apply(predictor, "shelf.jpg", names=["sku-123"])
+    """
+
+    INDEX_NAME = "index.json"
+
+    def __init__(self, root: Union[str, Path], cache_size: int = 256):
+        """
+        Args:
+            root: Directory holding the library (created if missing)
+            cache_size: Number of decoded embeddings kept in memory
+        """
+        self.root = Path(root)
+        (self.root / "embeddings").mkdir(parents=True, exist_ok=True)
+        self.index_path = self.root / self.INDEX_NAME
+        self.index: dict[str, dict] = json.loads(self.index_path.read_text()) if self.index_path.exists() else {}
+        self.cache_size = cache_size
+        self._cache: dict[str, tuple[torch.Tensor, torch.Tensor]] = {}
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.index
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def names(self) -> list[str]:
+        """Return registered exemplar names."""
+        return sorted(self.index)
+
+    def register(
+        self,
+        predictor: Any,
+        image: Union[str, Path, np.ndarray],
+        exemplars: dict[str, Optional[list[float]]],
+        overwrite: bool = False,
+    ) -> list[str]:
+        """
+        Encode exemplar boxes from one source image and store them.
+
+        All boxes from the same image share a single backbone pass.
+
+        Args:
+            predictor: SAM3SemanticPredictor used for encoding
+            image: Source image path or BGR array
+            exemplars: Mapping of exemplar name to xyxy box in source pixels;
+                None uses the whole image (for pre-cropped exemplars)
+            overwrite: Replace existing entries with the same name
+
+        Returns:
+            Names that were registered
+        """
+        clashes = [name for name in exemplars if name in self.index and not overwrite]
+        if clashes:
+            raise KeyError(f"Exemplars already registered (pass overwrite=True): {clashes}")
+        im = _sam3.load_image(image)
+        predictor.set_image(im)
+        fingerprint = _sam3.model_fingerprint(predictor)
+        h, w = im.shape[:2]
+        for name, bbox in exemplars.items():
+            bbox = [0.0, 0.0, float(w), float(h)] if bbox is None else bbox
+            embeds, mask = _sam3.encode_box_exemplars(predictor, np.asarray([bbox]), im.shape[:2])
+            path = self.root / "embeddings" / f"{name}.pt"
+            tmp = path.with_suffix(".pt.tmp")
+            torch.save({"embeds": embeds.half(), "mask": mask}, tmp)
+            os.replace(tmp, path)
+            self.index[name] = dict(
+                bbox=[float(v) for v in bbox],
+                source=str(image) if not isinstance(image, np.ndarray) else None,
+                shape=list(im.shape[:2]),
+                model=fingerprint,
+                created=time.time(),
+            )
+            self._cache.pop(name, None)
+        self._save_index()
+        return list(exemplars)
+
+    def remove(self, name: str) -> None:
+        """Delete an exemplar from the library."""
+        self.index.pop(name)
+        self._cache.pop(name, None)
+        (self.root / "embeddings" / f"{name}.pt").unlink(missing_ok=True)
+        self._save_index()
+
+    def load(self, names: Iterable[str], predictor: Optional[Any] = None) -> tuple[torch.Tensor, torch.Tensor]:
+        """
+        Load and concatenate the embeddings of several exemplars.
+
+        Args:
+            names: Exemplar names to combine into one prompt
+            predictor: If given, reject exemplars encoded with different weights
+
+        Returns:
+            Tuple of (S, C) embeddings and (S,) padding mask
+        """
+        names = list(names)
+        if not names:
+            raise ValueError("At least one exemplar name is required")
+        missing = [name for name in names if name not in self.index]
+        if missing:
+            raise KeyError(f"Unknown exemplars: {missing}")
+        if predictor is not None:
+            fingerprint = _sam3.model_fingerprint(predictor)
+            stale = [name for name in names if self.index[name]["model"] != fingerprint]
+            if stale:
+                raise ValueError(f"Exemplars were encoded with different weights, re-register them: {stale}")
+        embeds, masks = zip(*(self._load_one(name) for name in names))
+        return torch.cat(embeds), torch.cat(masks)
+
+    def apply(
+        self,
+        predictor: Any,
+        image: Union[str, Path, np.ndarray],
+        names: Optional[Iterable[str]] = None,
+        **kwargs,
+    ) -> list:
+        """
+        Segment everything matching the chosen exemplars in a new image.
+
+        Args:
+            predictor: SAM3SemanticPredictor
+            image: Target image path or BGR array
+            names: Exemplars to apply (all registered exemplars if None)
+            **kwargs: Options forwarded to the predictor call (e.g. save)
+
+        Returns:
+            List of Results
+        """
+        results = self.apply_many(predictor, [image], names, **kwargs)
+        try:
+            return next(results)
+        finally:
+            results.close()  # restore the predictor's prompt encoder
+
+    def apply_many(
+        self,
+        predictor: Any,
+        images: Iterable[Union[str, Path, np.ndarray]],
+        names: Optional[Iterable[str]] = None,
+        **kwargs,
+    ) -> Iterable[list]:
+        """
+        Apply the same exemplar set to a sequence of images.
+
+        The exemplar embeddings are loaded and moved to the device once and
+        reused for every image.
+
+        Args:
+            predictor: SAM3SemanticPredictor
+            images: Target image paths or BGR arrays
+            names: Exemplars to apply (all registered exemplars if None)
+            **kwargs: Options forwarded to the predictor call
+
+        Yields:
+            List of Results for each image
+        """
+        embeds, mask = self.load(self.names() if names is None else names, predictor)
+        kwargs.setdefault("save", False)
+        with _sam3.visual_prompt(predictor, embeds, mask):
+            for image in images:
+                predictor.set_image(_sam3.load_image(image))
+                # "visual" is SAM3's placeholder concept when prompting by exemplars only
+                yield as_list(predictor(text=["visual"], **kwargs))
+
+    def _load_one(self, name: str) -> tuple[torch.Tensor, torch.Tensor]:
+        if name not in self._cache:
+            if len(self._cache) >= self.cache_size:
+                self._cache.pop(next(iter(self._cache)))
+            data = torch.load(self.root / "embeddings" / f"{name}.pt", map_location="cpu")
+            self._cache[name] = (data["embeds"].float(), data["mask"])
+        return self._cache[name]
+
+    def _save_index(self) -> None:
+        tmp = self.index_path.with_suffix(".json.tmp")
+        tmp.write_text(json.dumps(self.index, indent=2, sort_keys=True))
+        os.replace(tmp, self.index_path)
@@ -0,0 +1,441 @@
+"""
+Graph Export
+Exports the image encoder, text encoder and mask decoder of a SAM3 semantic
+model as standalone TorchScript or ONNX graphs for ``runtime.ExportedPredictor``.
+
+Export runs the full predictor once on a sample image and records what each
+stage receives and returns. Each stage is then traced with flat tensor inputs
+and outputs:
+
+- ``image_encoder``: preprocessed image (1, 3, H, W) -> image features
+- ``text_encoder``: token ids (1, L) -> text features
+- ``mask_decoder``: image + text features -> masks and scores for every query
+
+The decoder graph is everything ``predictor.inference`` does besides the two
+encoders, traced with the confidence threshold at 0 so that thresholding
+happens in the runtime. Preprocessing (resize mode, channel order and
+normalization) is recovered from the recorded encoder input and written to
+``manifest.json`` with the output layout, which comes from the known
+``SAM3SemanticPredictor.inference`` return (``_sam3.SEMANTIC_OUTPUTS``). The
+manifest is only written once the runtime reproduces the predictor's masks on
+the sample image.
+
+Usage:
+    python -m ultralytics_sam3_install export --output exported/
+    python -m ultralytics_sam3_install export --output exported-onnx/ --format onnx
+"""
+
+import argparse
+import json
+import shutil
+import subprocess
+import sys
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Optional
+
+import numpy as np
+import torch
+from torch.utils import _pytree as pytree
+
+from ultralytics_sam3_install import _sam3
+from ultralytics_sam3_install.predictors import DEFAULT_BPE, DEFAULT_MODEL, build_predictor, project_root
+from ultralytics_sam3_install.runtime import MANIFEST, ExportedPredictor, resize_image
+from ultralytics_sam3_install.tokenizer import BPETokenizer
+
+CONSTANT_TYPES = (type(None), bool, int, float, str, torch.dtype, torch.device)
+
+
+def split_tensors(obj: Any) -> tuple[list[torch.Tensor], Callable[[list], Any]]:
+    """
+    Separate the tensors of a nested structure from its constants.
+
+    Returns:
+        Tuple of the tensor leaves and a function rebuilding the structure
+        from replacement tensors
+    """
+    leaves, spec = pytree.tree_flatten(obj)
+    index = [i for i, leaf in enumerate(leaves) if isinstance(leaf, torch.Tensor)]
+    for leaf in leaves:
+        if not isinstance(leaf, (torch.Tensor, *CONSTANT_TYPES)):
+            raise TypeError(f"Cannot export stage input/output of type {type(leaf).__name__}")
+
+    def rebuild(tensors):
+        out = list(leaves)
+        for i, t in zip(index, tensors):
+            out[i] = t
+        return pytree.tree_unflatten(out, spec)
+
+    return [leaves[i] for i in index], rebuild
+
+
+@contextmanager
+def record_stages(predictor: Any) -> dict:
+    """
+    Record the first call of the image encoder, text encoder and ``predictor.inference``.
+
+    Yields:
+        Dict filled with ``image_encode``/``text_encode`` -> (args, kwargs, output),
+        ``inference`` -> (args, kwargs) and ``tokens`` -> tokenizer output
+    """
+    modules = _sam3.stage_modules(_sam3.get_model(predictor))
+    missing = {"image_encode", "text_encode"} - set(modules)
+    if missing:
+        raise RuntimeError(f"SAM3 model has no {sorted(missing)} stage; see _sam3.STAGE_MODULES")
+    calls = {}
+    handles = [
+        modules[stage].register_forward_hook(
+            lambda module, args, kwargs, output, stage=stage: calls.setdefault(stage, (args, kwargs, output)),
+            with_kwargs=True,
+        )
+        for stage in ("image_encode", "text_encode")
+    ]
+    owner = _sam3.tokenizer_owner(modules["text_encode"])
+    tokenizer = owner.tokenizer
+    inference = predictor.inference
+
+    def recording_tokenizer(*args, **kwargs):
+        tokens = tokenizer(*args, **kwargs)
+        calls.setdefault("tokens", tokens)
+        return tokens
+
+    def recording_inference(*args, **kwargs):
+        calls.setdefault("inference", (args, kwargs))
+        return inference(*args, **kwargs)
+
+    owner.tokenizer = recording_tokenizer
+    predictor.inference = recording_inference
+    try:
+        yield calls
+    finally:
+        for handle in handles:
+            handle.remove()
+        owner.tokenizer = tokenizer
+        del predictor.inference
+
+
+@contextmanager
+def replay(module: torch.nn.Module, output: Any, name: str, used: set):
+    """Make ``module`` return ``output`` instead of running, noting in ``used`` that it was called."""
+
+    def forward(*args, **kwargs):
+        used.add(name)
+        return output
+
+    module.forward = forward
+    try:
+        yield
+    finally:
+        del module.forward
+
+
+class ImageGraph(torch.nn.Module):
+    """Image encoder with the preprocessed image as its only input."""
+
+    def __init__(self, module: torch.nn.Module, call: tuple):
+        super().__init__()
+        self.module = module
+        tensors, self.rebuild = split_tensors(call[:2])
+        if len(tensors) != 1:
+            raise RuntimeError(f"Expected the image encoder to take one tensor, got {len(tensors)}")
+
+    def forward(self, image):
+        args, kwargs = self.rebuild([image])
+        return tuple(split_tensors(self.module(*args, **kwargs))[0])
+
+
+class TextGraph(torch.nn.Module):
+    """Text encoder fed token ids instead of prompt strings."""
+
+    def __init__(self, module: torch.nn.Module, call: tuple):
+        super().__init__()
+        self.module = module
+        self.args, self.kwargs = call[:2]
+        self.owner = _sam3.tokenizer_owner(module)
+
+    def forward(self, tokens):
+        tokenizer = self.owner.tokenizer
+        self.owner.tokenizer = lambda *args, **kwargs: tokens
+        try:
+            out = self.module(*self.args, **self.kwargs)
+        finally:
+            self.owner.tokenizer = tokenizer
+        return tuple(split_tensors(out)[0])
+
+
+class DecoderGraph(torch.nn.Module):
+    """
+    Everything ``predictor.inference`` runs after the encoders.
+
+    The model is not registered as a submodule, so only the weights the
+    decoder actually uses end up in the graph (as constants).
+    """
+
+    def __init__(self, predictor: Any, inference: Callable, calls: dict):
+        super().__init__()
+        modules = _sam3.stage_modules(_sam3.get_model(predictor))
+        self.predictor = predictor
+        self.inference = inference
+        self.args, self.kwargs = calls["inference"]
+        self.stages = (modules["image_encode"], modules["text_encode"])  # a tuple is not registered as submodules
+        image_tensors, self.rebuild_image = split_tensors(calls["image_encode"][2])
+        _, self.rebuild_text = split_tensors(calls["text_encode"][2])
+        self.n_image = len(image_tensors)
+
+    def forward(self, *features):
+        return tuple(split_tensors(self.raw(*features))[0])
+
+    def raw(self, *features):
+        """Run the decoder and return ``predictor.inference``'s output as structured."""
+        image_out = self.rebuild_image(features[: self.n_image])
+        text_out = self.rebuild_text(features[self.n_image :])
+        used = set()
+        image_module, text_module = self.stages
+        with replay(image_module, image_out, "image", used), replay(text_module, text_out, "text", used):
+            _sam3.reset_features(self.predictor)
+            out = self.inference(*self.args, **self.kwargs)
+        if used != {"image", "text"}:
+            raise RuntimeError(
+                f"predictor.inference did not call the {sorted({'image', 'text'} - used)} encoder; "
+                "cannot separate the mask decoder"
+            )
+        return out
+
+
+def fit_preprocess(image: np.ndarray, encoder_input: torch.Tensor, tolerance: float = 0.05) -> dict:
+    """
+    Recover resize mode, channel order and normalization from a recorded encoder input.
+
+    Tries letterbox (pad 114 or 0) and stretch resizing in RGB and BGR order and
+    fits a per-channel affine map ``x = (pixel - mean) / std`` to each.
+
+    Args:
+        image: BGR source image
+        encoder_input: (1, 3, H, W) tensor the image encoder received
+        tolerance: Largest accepted residual relative to the input's std
+
+    Returns:
+        Preprocess section of the manifest
+    """
+    target = encoder_input[0].float().cpu().numpy().reshape(3, -1)
+    shape = tuple(encoder_input.shape[-2:])
+    best = None
+    for resize, pad in (("letterbox", 114), ("letterbox", 0), ("stretch", 0)):
+        resized = resize_image(image, shape, resize, pad)
+        for order in ("rgb", "bgr"):
+            src = (resized[..., ::-1] if order == "rgb" else resized).transpose(2, 0, 1).reshape(3, -1)
+            src = src.astype(np.float32)
+            coeffs = [np.polyfit(src[c], target[c], 1) for c in range(3)]
+            fitted = np.stack([a * src[c] + b for c, (a, b) in enumerate(coeffs)])
+            residual = float(np.abs(fitted - target).mean() / (target.std() + 1e-6))
+            if best is None or residual < best["residual"]:
+                best = dict(
+                    shape=list(shape),
+                    resize=resize,
+                    pad=pad,
+                    order=order,
+                    mean=[float(-b / a) for a, b in coeffs],
+                    std=[float(1 / a) for a, b in coeffs],
+                    residual=residual,
+                )
+    if best["residual"] > tolerance:
+        raise RuntimeError(f"Could not reproduce the predictor's preprocessing (residual {best['residual']:.3f})")
+    return best
+
+
+def check_outputs(
+    output: Path, manifest: dict, predictor: Any, image: np.ndarray, prompt: str, conf: float = 0.25, min_iou: float = 0.9
+) -> dict:
+    """
+    Run the runtime with ``manifest`` against ``predictor`` on the sample image.
+
+    Raises:
+        RuntimeError: If the runtime finds a different number of objects or
+            its masks match the predictor's with mean IoU below ``min_iou``
+    """
+    from ultralytics_sam3_install.quantize import compare_results
+
+    traced_conf, predictor.args.conf = predictor.args.conf, conf
+    try:
+        _sam3.reset_features(predictor)
+        reference = predictor(source=image, text=[prompt], save=False)[0]
+    finally:
+        predictor.args.conf = traced_conf
+    runtime = ExportedPredictor(output, conf=conf, manifest=manifest)
+    report = compare_results(reference, runtime(source=image, text=[prompt])[0])
+    if report["candidate"] != report["reference"] or report["mean_iou"] < min_iou:
+        raise RuntimeError(f"Exported graphs do not reproduce the predictor on the sample image: {report}")
+    return report
+
+
+def save_graph(graph: torch.nn.Module, inputs: tuple, path: Path, fmt: str) -> Path:
+    """Trace ``graph`` with ``inputs`` and write it as TorchScript (.pt) or ONNX (.onnx)."""
+    if fmt == "onnx":
+        path = path.with_suffix(".onnx")
+        n_out = len(graph(*inputs))
+        torch.onnx.export(
+            graph,
+            inputs,
+            str(path),
+            input_names=[f"input_{i}" for i in range(len(inputs))],
+            output_names=[f"output_{i}" for i in range(n_out)],
+            opset_version=17,
+        )
+    else:
+        path = path.with_suffix(".pt")
+        torch.jit.trace(graph, inputs, check_trace=False, strict=False).save(str(path))
+    return path
+
+
+def find_sample_image() -> Path:
+    """Return the first bundled test image (as used by tests 01-05)."""
+    for path in (
+        project_root / "submodules" / "inference" / "assets" / "bus.jpg",
+        project_root / "submodules" / "sam3" / "assets" / "images" / "test_image.jpg",
+    ):
+        if path.exists():
+            return path
+    raise FileNotFoundError("No sample image found; pass --image")
+
+
+@torch.no_grad()
+def export(
+    output: Path,
+    model: Any = DEFAULT_MODEL,
+    bpe_path: Any = DEFAULT_BPE,
+    image: Optional[Any] = None,
+    prompt: str = "person",
+    fmt: str = "torchscript",
+) -> dict:
+    """
+    Export the three graphs of a SAM3 semantic model to ``output``.
+
+    Args:
+        output: Artifact directory
+        model: Path to the SAM3 weights
+        bpe_path: Path to the BPE vocabulary (copied into ``output``)
+        image: Sample image (defaults to a bundled test image)
+        prompt: Sample text prompt
+        fmt: "torchscript" or "onnx"
+
+    Returns:
+        The written manifest
+    """
+    output = Path(output)
+    output.mkdir(parents=True, exist_ok=True)
+    source = _sam3.load_image(image if image is not None else find_sample_image())
+    predictor = build_predictor("semantic", model, bpe_path, device="cpu", half=False, conf=0.0)
+    _sam3.get_model(predictor).eval().requires_grad_(False)
+    inference = predictor.inference
+
+    with record_stages(predictor) as calls:
+        _sam3.reset_features(predictor)
+        predictor(source=source, text=[prompt], save=False)
+    missing = {"image_encode", "text_encode", "inference", "tokens"} - set(calls)
+    if missing:
+        raise RuntimeError(f"Sample run did not reach {sorted(missing)}")
+
+    tokens = calls["tokens"]
+    tokenizer = BPETokenizer(bpe_path, context_length=tokens.shape[-1])
+    if not np.array_equal(tokenizer([prompt]), tokens.cpu().numpy().reshape(1, -1)):
+        raise RuntimeError("Standalone tokenizer does not match the SAM3 tokenizer on the sample prompt")
+
+    modules = _sam3.stage_modules(_sam3.get_model(predictor))
+    image_graph = ImageGraph(modules["image_encode"], calls["image_encode"])
+    text_graph = TextGraph(modules["text_encode"], calls["text_encode"])
+    decoder_graph = DecoderGraph(predictor, inference, calls)
+    image_input = split_tensors(calls["image_encode"][:2])[0][0]
+    features = image_graph(image_input) + text_graph(tokens)
+
+    paths = dict(
+        image_encoder=save_graph(image_graph, (image_input,), output / "image_encoder", fmt),
+        text_encoder=save_graph(text_graph, (tokens,), output / "text_encoder", fmt),
+        mask_decoder=save_graph(decoder_graph, features, output / "mask_decoder", fmt),
+    )
+    shutil.copy(bpe_path, output / Path(bpe_path).name)
+    manifest = dict(
+        format=fmt,
+        model=_sam3.model_fingerprint(predictor),
+        prompt=prompt,
+        graphs={name: path.name for name, path in paths.items()},
+        bpe=Path(bpe_path).name,
+        context_length=int(tokens.shape[-1]),
+        preprocess=fit_preprocess(source, image_input),
+        outputs=_sam3.semantic_outputs(predictor, decoder_graph.raw(*features)),
+    )
+    manifest["check"] = check_outputs(output, manifest, predictor, source, prompt)
+    (output / MANIFEST).write_text(json.dumps(manifest, indent=2))
+    return manifest
+
+
+STARTUP_PROBE = """
+import json, resource, sys, time
+start = time.perf_counter()
+from {module} import {cls}
+predictor = {cls}({args})
+predictor.set_image(sys.argv[1])
+predictor(text=[sys.argv[2]], save=False)
+peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(json.dumps(dict(seconds=time.perf_counter() - start, peak_rss_mb=peak / 1024)))
+"""
+
+
+def measure_startup(module: str, cls: str, args: str, image: Path, prompt: str) -> dict:
+    """Time import + load + first prediction in a fresh process and report its peak RSS (Linux)."""
+    code = STARTUP_PROBE.format(module=module, cls=cls, args=args)
+    out = subprocess.run(
+        [sys.executable, "-c", code, str(image), prompt], capture_output=True, text=True, check=True, cwd=project_root
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def validate(output: Path, model: Any, bpe_path: Any, image: Path, prompt: str) -> dict:
+    """Compare runtime masks with the full predictor and measure cold-start cost of both."""
+    from ultralytics_sam3_install.quantize import compare_results
+
+    reference = build_predictor("semantic", model, bpe_path, device="cpu", half=False)
+    reference.set_image(str(image))
+    runtime = ExportedPredictor(output)
+    runtime.set_image(str(image))
+    accuracy = compare_results(reference(text=[prompt], save=False)[0], runtime(text=[prompt])[0])
+    full_args = f"overrides=dict(conf=0.25, task='segment', mode='predict', model={str(model)!r}, half=False, device='cpu'), bpe_path={str(bpe_path)!r}"
+    return dict(
+        accuracy=accuracy,
+        startup_full=measure_startup("ultralytics.models.sam.predict", "SAM3SemanticPredictor", full_args, image, prompt),
+        startup_runtime=measure_startup("ultralytics_sam3_install.runtime", "ExportedPredictor", repr(str(output)), image, prompt),
+    )
+
+
+def parse_args(argv: Optional[list[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Export SAM3 image encoder, text encoder and mask decoder graphs")
+    parser.add_argument("--output", type=str, default="exported", help="Artifact directory (default: exported)")
+    parser.add_argument("--model", type=str, default=str(DEFAULT_MODEL), help="Path to SAM3 weights")
+    parser.add_argument("--bpe", type=str, default=str(DEFAULT_BPE), help="Path to BPE vocabulary")
+    parser.add_argument("--image", type=str, default=None, help="Sample image used for tracing")
+    parser.add_argument("--prompt", type=str, default="person", help="Sample text prompt used for tracing")
+    parser.add_argument("--format", type=str, default="torchscript", choices=("torchscript", "onnx"))
+    parser.add_argument("--no-validate", action="store_true", help="Skip the accuracy and startup comparison")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[list[str]] = None) -> dict:
+    """Export graphs and compare the runtime against the full predictor."""
+    args = parse_args(argv)
+    image = Path(args.image) if args.image else find_sample_image()
+    start = time.perf_counter()
+    manifest = export(Path(args.output), args.model, args.bpe, image, args.prompt, args.format)
+    print(f"[export] wrote {', '.join(manifest['graphs'].values())} to {args.output} in {time.perf_counter() - start:.1f}s")
+    if not args.no_validate:
+        report = validate(Path(args.output), args.model, args.bpe, image, args.prompt)
+        acc, full, rt = report["accuracy"], report["startup_full"], report["startup_runtime"]
+        print(f"[export] mask IoU vs full predictor: mean {acc['mean_iou']:.3f}, min {acc['min_iou']:.3f}")
+        print(f"[export] cold start  full: {full['seconds']:.1f}s / {full['peak_rss_mb']:.0f} MB")
+        print(f"[export] cold start  runtime: {rt['seconds']:.1f}s / {rt['peak_rss_mb']:.0f} MB")
+        manifest["validation"] = report
+        (Path(args.output) / MANIFEST).write_text(json.dumps(manifest, indent=2))
+    return manifest
+
+
+if __name__ == "__main__":
+    main()
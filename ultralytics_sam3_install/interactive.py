@@ -0,0 +1,172 @@
+"""
+Interactive Session
+Click-by-click object refinement on one encoded image, for annotation UIs.
+
+``set_image`` runs the image backbone once. Every click afterwards only runs
+the prompt encoder and mask decoder (``_sam3.decode_prompts``) with all of
+the object's clicks plus its previous low-resolution mask logits as the mask
+prompt, so the decoder refines the last mask instead of starting over. The
+first single click of an object asks for three candidate masks and keeps the
+best-scoring one, as SAM does for ambiguous prompts.
+
+Example:
+    session = InteractiveSession(predictor)
+    session.set_image("image.jpg")
+    mask = session.click(1, (430, 730))                  # new object 1
+    mask = session.click(1, (520, 610), positive=False)  # refine it
+    session.undo(1)
+    print(session.stats())
+"""
+
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Optional, Sequence, Union
+
+import numpy as np
+import torch
+
+from ultralytics_sam3_install import _sam3
+
+
+@dataclass
+class ObjectState:
+    """
+    Prompts and latest decode of one object.
+
+    Attributes:
+        points: (K, 2) clicks in source pixels
+        labels: (K,) click labels (1 positive, 0 negative)
+        box: xyxy box prompt in source pixels, if any
+        logits: (1, h, w) low-resolution mask logits of the current mask
+        score: Predicted quality of the current mask
+        history: Earlier states, for ``undo``
+    """
+
+    points: np.ndarray = field(default_factory=lambda: np.zeros((0, 2), np.float32))
+    labels: np.ndarray = field(default_factory=lambda: np.zeros(0, np.int32))
+    box: Optional[np.ndarray] = None
+    logits: Optional[torch.Tensor] = None
+    score: float = 0.0
+    history: list = field(default_factory=list)
+    mask: Optional[np.ndarray] = None  # source-resolution mask, computed on demand
+
+
+class InteractiveSession:
+    """
+    Keep image features and per-object mask logits across clicks.
+
+    Args:
+        predictor: SAM3Predictor
+        max_history: Undo steps kept per object
+    """
+
+    def __init__(self, predictor: Any, max_history: int = 32):
+        self.predictor = predictor
+        self.max_history = max_history
+        self.objects: dict[int, ObjectState] = {}
+        self.src_shape: Optional[tuple[int, int]] = None
+        self.encode_ms = 0.0
+        self.click_ms: list[float] = []
+
+    def set_image(self, image: Union[str, Path, np.ndarray]) -> None:
+        """Encode a new image and drop all objects."""
+        im = _sam3.load_image(image)
+        start = time.perf_counter()
+        self.predictor.set_image(im)
+        self.encode_ms = (time.perf_counter() - start) * 1000
+        self.src_shape = im.shape[:2]
+        self.objects.clear()
+        self.click_ms.clear()
+
+    def _update(self, obj_id: int, points: np.ndarray, labels: np.ndarray, box: Optional[np.ndarray]) -> ObjectState:
+        if self.src_shape is None:
+            raise RuntimeError("Call set_image() before prompting")
+        state = self.objects.setdefault(obj_id, ObjectState())
+        # Without a prior mask a lone click is ambiguous (part, object, group): pick the best of three
+        multimask = state.logits is None and box is None and len(points) == 1
+        logits, scores = _sam3.decode_prompts(
+            self.predictor,
+            self.src_shape,
+            bboxes=None if box is None else box[None],
+            points=points[None] if len(points) else None,
+            labels=labels[None] if len(points) else None,
+            masks=state.logits,
+            multimask_output=multimask,
+        )
+        best = int(scores[0].argmax())
+        state.history = (state.history + [(state.points, state.labels, state.box, state.logits, state.score)])[-self.max_history :]
+        state.points, state.labels, state.box = points, labels, box
+        state.logits, state.score, state.mask = logits[:, best], float(scores[0, best]), None
+        return state
+
+    def click(self, obj_id: int, point: Sequence[float], positive: bool = True) -> np.ndarray:
+        """
+        Add a click to an object (created on its first click) and return its refined mask.
+
+        Args:
+            obj_id: Object identifier chosen by the caller
+            point: (x, y) in source pixels
+            positive: Foreground (True) or background (False) click
+
+        Returns:
+            (H, W) boolean mask in source pixels
+        """
+        start = time.perf_counter()
+        state = self.objects.get(obj_id, ObjectState())
+        points = np.concatenate([state.points, np.asarray(point, np.float32).reshape(1, 2)])
+        labels = np.append(state.labels, np.int32(1 if positive else 0))
+        self._update(obj_id, points, labels, state.box)
+        return self._timed_mask(obj_id, start)
+
+    def set_box(self, obj_id: int, box: Sequence[float]) -> np.ndarray:
+        """Set or replace an object's box prompt (keeping its clicks) and return its mask."""
+        start = time.perf_counter()
+        state = self.objects.get(obj_id, ObjectState())
+        self._update(obj_id, state.points, state.labels, np.asarray(box, np.float32).reshape(4))
+        return self._timed_mask(obj_id, start)
+
+    def _timed_mask(self, obj_id: int, start: float) -> np.ndarray:
+        mask = self.mask(obj_id)
+        self.click_ms.append((time.perf_counter() - start) * 1000)
+        return mask
+
+    def mask(self, obj_id: int) -> np.ndarray:
+        """Source-resolution mask of an object, upsampled once per refinement."""
+        state = self.objects[obj_id]
+        if state.mask is None:
+            imgsz = _sam3.input_size(self.predictor)
+            state.mask = _sam3.masks_to_source(state.logits[:, None], self.src_shape, imgsz)[0, 0].cpu().numpy()
+        return state.mask
+
+    def masks(self) -> dict[int, np.ndarray]:
+        """Masks of all objects."""
+        return {obj_id: self.mask(obj_id) for obj_id in self.objects}
+
+    def undo(self, obj_id: int) -> Optional[np.ndarray]:
+        """Revert an object's last prompt; returns its previous mask, or None once no prompts remain."""
+        state = self.objects[obj_id]
+        if not state.history:
+            return None
+        state.points, state.labels, state.box, state.logits, state.score = state.history.pop()
+        state.mask = None
+        if state.logits is None:
+            del self.objects[obj_id]
+            return None
+        return self.mask(obj_id)
+
+    def remove(self, obj_id: int) -> None:
+        """Forget an object."""
+        self.objects.pop(obj_id, None)
+
+    def stats(self) -> dict:
+        """Encoder time and per-click latency (decode plus mask upsampling)."""
+        ms = self.click_ms
+        return dict(
+            objects=len(self.objects),
+            clicks=len(ms),
+            encode_ms=self.encode_ms,
+            last_click_ms=ms[-1] if ms else None,
+            mean_click_ms=float(np.mean(ms)) if ms else None,
+            max_click_ms=max(ms) if ms else None,
+        )
@@ -0,0 +1,312 @@
+"""
+Dataset Labelling
+Labels a directory (or file list) of images with text prompts through the
+semantic predictor and writes sharded COCO-RLE or YOLO-seg labels.
+
+Images are sorted and cut into fixed-size shards, and every shard is
+committed atomically (written under a temporary name, then renamed), so an
+interrupted run resumes by skipping the shards already on disk. Images are
+decoded and normalized ahead of the predictor by ``loader.ImageLoader``, and
+throughput is reported per shard.
+
+Layout of ``--output``:
+    labels.json                 run manifest (prompts, format, shard size, image list hash)
+    shard-00000.json            COCO shard (images, annotations with RLE masks, categories)
+    shard-00000/<rel>.txt       YOLO-seg shard (one label file per image, polygons)
+
+Usage:
+    python -m ultralytics_sam3_install label datasets/raw --text person car \\
+        --output datasets/raw-labels --format coco --shard-size 1000
+    python -m ultralytics_sam3_install label images.txt --text person --format yolo --batch 4
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import sys
+import time
+from pathlib import Path
+from typing import Any, Iterator, Optional, Sequence
+
+import numpy as np
+
+from ultralytics_sam3_install.loader import BACKENDS, ImageLoader
+from ultralytics_sam3_install.predictors import DEFAULT_BPE, DEFAULT_MODEL, build_predictor
+from ultralytics_sam3_install.result_cache import CachedResult
+
+IMAGE_SUFFIXES = {".bmp", ".jpeg", ".jpg", ".png", ".tif", ".tiff", ".webp"}
+FORMATS = ("coco", "yolo")
+# Detection queries of the SAM3 decoder: the most detections one text prompt can return per image
+MAX_QUERIES = 200
+
+
+def list_images(sources: Sequence[str]) -> list[Path]:
+    """
+    Expand directories (recursively), ``.txt`` file lists and image paths into a sorted, de-duplicated list.
+    """
+    paths = set()
+    for source in map(Path, sources):
+        if source.is_dir():
+            paths.update(p for p in source.rglob("*") if p.suffix.lower() in IMAGE_SUFFIXES)
+        elif source.suffix.lower() == ".txt":
+            lines = (line.strip() for line in source.read_text().splitlines())
+            paths.update((source.parent / line).resolve() if not Path(line).is_absolute() else Path(line) for line in lines if line)
+        elif source.exists():
+            paths.add(source)
+        else:
+            raise FileNotFoundError(f"No such image, directory or list: {source}")
+    return sorted(p.resolve() for p in paths)
+
+
+def commit(tmp: Path, final: Path) -> None:
+    """Atomically move a finished shard file or directory into place."""
+    os.replace(tmp, final)
+
+
+def coco_entry(image_id: int, file_name: str, result: Any) -> tuple:
+    """Reduce a ``Results`` to what a COCO shard stores (boxes, scores, classes, RLE masks)."""
+    classes = result.boxes.cls.int().tolist() if result.boxes is not None else []
+    return image_id, file_name, CachedResult.from_results(result), classes
+
+
+def coco_shard(items: list[tuple], categories: list[str]) -> dict:
+    """
+    Build one COCO shard.
+
+    Args:
+        items: ``coco_entry`` per labelled image
+        categories: Class names in prompt order; category ids are their 1-based positions
+
+    Returns:
+        COCO dict with uncompressed RLE segmentations and per-annotation scores
+    """
+    per_image = MAX_QUERIES * max(1, len(categories))  # annotation id block of each image, unique across shards
+    images, annotations = [], []
+    for image_id, file_name, compact, classes in items:
+        h, w = compact.shape
+        images.append(dict(id=image_id, file_name=file_name, height=int(h), width=int(w)))
+        if len(compact.rles) > per_image:
+            raise ValueError(f"{file_name}: {len(compact.rles)} detections exceed {per_image} annotation ids per image")
+        for k, (box, score, c, rle) in enumerate(zip(compact.boxes, compact.scores, classes, compact.rles)):
+            x1, y1, x2, y2 = box.tolist()
+            annotations.append(
+                dict(
+                    id=image_id * per_image + k,
+                    image_id=image_id,
+                    category_id=c + 1,
+                    segmentation=dict(size=[int(h), int(w)], counts=[int(n) for n in rle["counts"]]),
+                    area=int(np.sum(rle["counts"][1::2])),
+                    bbox=[x1, y1, x2 - x1, y2 - y1],
+                    score=float(score),
+                    iscrowd=0,
+                )
+            )
+    return dict(images=images, annotations=annotations, categories=[dict(id=i + 1, name=n) for i, n in enumerate(categories)])
+
+
+def yolo_lines(result: Any) -> list[str]:
+    """YOLO-seg label lines (class index, normalized polygon) of one ``Results``."""
+    if result.masks is None or result.boxes is None:
+        return []
+    lines = []
+    for c, polygon in zip(result.boxes.cls.int().tolist(), result.masks.xyn):
+        if len(polygon) >= 3:
+            coords = " ".join(f"{v:.6f}" for v in polygon.reshape(-1))
+            lines.append(f"{c} {coords}")
+    return lines
+
+
+def manifest_for(images: list[Path], root: Path, cfg: argparse.Namespace) -> dict:
+    """Run settings that must match for a resumed run to reuse existing shards."""
+    listing = hashlib.sha1("\n".join(str(p) for p in images).encode()).hexdigest()
+    return dict(text=cfg.text, format=cfg.format, shard_size=cfg.shard_size, conf=cfg.conf, images=len(images), listing=listing, root=str(root))
+
+
+class Labeller:
+    """
+    Label shards of images with one semantic predictor.
+
+    Args:
+        predictor: SAM3SemanticPredictor
+        text: Text prompts (class names)
+        output: Output directory
+        fmt: "coco" or "yolo"
+        root: Directory file names are recorded relative to
+        batch: Images per predictor call
+        workers: Decode threads
+        reduce: Decode large JPEGs at a reduced scale (YOLO only: polygons
+            are normalized, COCO masks would be stored at the reduced size)
+        backend: Image decoder, "cv2" or "pil"
+    """
+
+    def __init__(
+        self,
+        predictor: Any,
+        text: list[str],
+        output: Path,
+        fmt: str,
+        root: Path,
+        batch: int = 1,
+        workers: int = 4,
+        reduce: bool = False,
+        backend: str = "cv2",
+    ):
+        if fmt not in FORMATS:
+            raise ValueError(f"format must be one of {FORMATS}, got {fmt!r}")
+        if reduce and fmt == "coco":
+            raise ValueError("reduced decoding stores COCO masks at the reduced size; use format='yolo'")
+        self.predictor = predictor
+        self.text = text
+        self.output = output
+        self.format = fmt
+        self.root = root
+        self.batch = max(1, batch)
+        self.workers = workers
+        self.reduce = reduce
+        self.backend = backend
+        self._pending = None  # result read ahead across a shard boundary
+
+    def shard_path(self, index: int) -> Path:
+        return self.output / (f"shard-{index:05d}.json" if self.format == "coco" else f"shard-{index:05d}")
+
+    def results(self, paths: list[Path]) -> Iterator[Any]:
+        """Stream ``Results`` for ``paths`` in order; unreadable images yield nothing."""
+        from ultralytics_sam3_install import _sam3
+
+        loader = ImageLoader.from_predictor(
+            self.predictor, paths, batch=self.batch, workers=self.workers, reduce=self.reduce, backend=self.backend
+        )
+        with _sam3.prepared_source(self.predictor, loader, loader.batch):
+            _sam3.reset_features(self.predictor)
+            yield from self.predictor(source=str(self.root), text=self.text, stream=True, save=False)
+
+    def label_shard(self, index: int, first_id: int, paths: list[Path], results: Iterator[Any]) -> int:
+        """
+        Label one shard and commit it atomically.
+
+        Args:
+            index: Shard number
+            first_id: COCO image id of the shard's first image
+            paths: Images of the shard
+            results: Shared ``results`` stream, positioned at this shard
+
+        Returns:
+            Number of images labelled
+        """
+        final = self.shard_path(index)
+        tmp = final.with_name(final.name + ".tmp")
+        if tmp.is_dir():
+            shutil.rmtree(tmp)
+        items, done = [], 0
+        for k, path in enumerate(paths):
+            if self._pending is None:
+                self._pending = next(results, None)
+            if self._pending is None or Path(self._pending.path) != path:
+                print(f"[label] WARNING: could not read {path}, skipping", file=sys.stderr)
+                continue
+            result, self._pending = self._pending, None
+            rel = path.relative_to(self.root).as_posix() if path.is_relative_to(self.root) else str(path)
+            if self.format == "coco":
+                items.append(coco_entry(first_id + k, rel, result))
+            else:
+                target = tmp / Path(rel.lstrip("/")).with_suffix(".txt")
+                target.parent.mkdir(parents=True, exist_ok=True)
+                target.write_text("\n".join(yolo_lines(result)) + "\n")
+            done += 1
+        if self.format == "coco":
+            tmp.write_text(json.dumps(coco_shard(items, self.text)))
+        else:
+            tmp.mkdir(parents=True, exist_ok=True)  # shards of unreadable images still commit
+        commit(tmp, final)
+        return done
+
+    def run(self, images: list[Path], shard_size: int) -> dict:
+        """
+        Label every shard of ``images`` that is not on disk yet.
+
+        Returns:
+            Summary with image, shard and throughput counts
+        """
+        shards = [(i, images[s : s + shard_size]) for i, s in enumerate(range(0, len(images), shard_size))]
+        todo = [(i, paths) for i, paths in shards if not self.shard_path(i).exists()]
+        print(f"[label] {len(images)} images in {len(shards)} shards, {len(shards) - len(todo)} already written")
+        results = self.results([p for _, paths in todo for p in paths])
+        start, labelled = time.perf_counter(), 0
+        for i, paths in todo:
+            t0 = time.perf_counter()
+            n = self.label_shard(i, i * shard_size + 1, paths, results)
+            labelled += n
+            dt = time.perf_counter() - t0
+            print(f"[label] shard {i + 1}/{len(shards)}: {n} images, {n / dt:.2f} img/s -> {self.shard_path(i).name}")
+        elapsed = time.perf_counter() - start
+        summary = dict(
+            images=len(images),
+            shards=len(shards),
+            skipped_shards=len(shards) - len(todo),
+            labelled=labelled,
+            seconds=elapsed,
+            images_per_second=labelled / elapsed if elapsed > 0 else 0.0,
+        )
+        print(f"[label] {labelled} images in {elapsed:.1f}s ({summary['images_per_second']:.2f} img/s)")
+        return summary
+
+
+def parse_args(argv: Optional[list[str]] = None) -> argparse.Namespace:
+    """Parse labelling options."""
+    parser = argparse.ArgumentParser(description="Label images with SAM3 text prompts into sharded COCO-RLE or YOLO-seg files")
+    parser.add_argument("sources", nargs="+", help="Image directories, .txt file lists or image files")
+    parser.add_argument("--text", nargs="+", required=True, help="Text prompts (class names)")
+    parser.add_argument("--output", type=str, default="labels", help="Output directory")
+    parser.add_argument("--format", choices=FORMATS, default="coco", help="Label format")
+    parser.add_argument("--shard-size", type=int, default=1000, help="Images per shard")
+    parser.add_argument("--batch", type=int, default=1, help="Images per predictor call")
+    parser.add_argument("--workers", type=int, default=4, help="Decode threads")
+    parser.add_argument("--backend", choices=BACKENDS, default="cv2", help="Image decoder")
+    parser.add_argument("--reduced-decode", action="store_true", help="Decode large JPEGs at 1/2-1/8 scale (YOLO only)")
+    parser.add_argument("--conf", type=float, default=0.25, help="Confidence threshold")
+    parser.add_argument("--model", type=str, default=str(DEFAULT_MODEL), help="Path to SAM3 weights")
+    parser.add_argument("--bpe", type=str, default=str(DEFAULT_BPE), help="Path to BPE vocabulary")
+    parser.add_argument("--device", type=str, default=None, help="Device override, e.g. cpu or 0")
+    parser.add_argument("--half", action=argparse.BooleanOptionalAction, default=None, help="Use FP16 (default: on, or the plan's)")
+    parser.add_argument("--plan", action="store_true", help="Use the cached host plan for device and precision")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    """Label a dataset from the command line."""
+    cfg = parse_args(argv)
+    images = list_images(cfg.sources)
+    if not images:
+        print("[label] No images found", file=sys.stderr)
+        return 1
+    if cfg.reduced_decode and cfg.format == "coco":
+        print("[label] --reduced-decode needs --format yolo (COCO masks would be stored at the reduced size)", file=sys.stderr)
+        return 2
+    root = Path(os.path.commonpath([p.parent for p in images]))
+    output = Path(cfg.output)
+    output.mkdir(parents=True, exist_ok=True)
+    manifest, manifest_path = manifest_for(images, root, cfg), output / "labels.json"
+    if manifest_path.exists():
+        previous = json.loads(manifest_path.read_text())
+        if previous != manifest:
+            changed = sorted(k for k in manifest if previous.get(k) != manifest[k])
+            print(f"[label] {output} holds a different run (changed: {', '.join(changed)}); use a new --output", file=sys.stderr)
+            return 2
+    else:
+        manifest_path.write_text(json.dumps(manifest, indent=2))
+
+    overrides = dict(conf=cfg.conf)
+    if cfg.half is not None:
+        overrides["half"] = cfg.half
+    if cfg.device is not None:
+        overrides["device"] = cfg.device
+    predictor = build_predictor("semantic", cfg.model, cfg.bpe, plan=cfg.plan, **overrides)
+    labeller = Labeller(predictor, cfg.text, output, cfg.format, root, cfg.batch, cfg.workers, cfg.reduced_decode, cfg.backend)
+    labeller.run(images, cfg.shard_size)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,262 @@
+"""
+Live Objects
+Add, remove and re-prompt objects at any frame of a running video tracking
+stream, without restarting it or reprocessing earlier frames.
+
+SAM3 video predictors only accept new objects before tracking starts, and
+prompting one object of a tracked batch blanks the others on that frame.
+``LiveObjects`` therefore tracks every object added mid-stream in its own
+tracking state, started on the frame the command takes effect, while the
+stream's own prompts (``bboxes=...``) stay one batched state as before. All
+states share the frame's image features (``_sam3.shared_image_features``),
+so an added object costs only its own prompt decode, memory attention and
+memory encoding per frame, whatever else is tracked.
+
+Commands are thread-safe and queue until the next frame (or the frame given
+with ``at``). Prompts are in pixels of the frames the predictor sees
+(``result.orig_img``). ``remove`` hides an object at once and frees its state
+once nothing else in it is tracked; ``reprompt`` restarts an object's track
+from the new prompt under the same id.
+
+Example:
+    live = LiveObjects(predictor)
+    with live:
+        for result in source.stream(predictor, bboxes=bboxes):
+            ids = live.ids  # object id of each result mask, in order
+
+    # from the operator's thread, while the stream runs
+    new_id = live.add(bbox=[410, 220, 520, 380])
+    live.reprompt(new_id, points=[[470, 300]])
+    live.remove(0)
+"""
+
+import threading
+import time
+import warnings
+from dataclasses import dataclass, field
+from typing import Any, Optional, Sequence
+
+import numpy as np
+import torch
+
+from ultralytics_sam3_install import _sam3
+
+
+@dataclass(eq=False)
+class TrackGroup:
+    """
+    One video tracking state and the objects it tracks.
+
+    Attributes:
+        state: The predictor ``inference_state`` of this group
+        ids: Object id of each object index in ``state``
+        hidden: Removed objects still tracked in ``state``
+        ms: Time of this group's last tracking step
+    """
+
+    state: dict
+    ids: list = field(default_factory=list)
+    hidden: set = field(default_factory=set)
+    ms: float = 0.0
+
+    @property
+    def live(self) -> list:
+        """Ids of the objects still reported."""
+        return [i for i in self.ids if i not in self.hidden]
+
+
+def _prompts(bbox: Optional[Sequence[float]], points: Optional[Sequence], labels: Optional[Sequence]) -> dict:
+    if bbox is None and points is None:
+        raise ValueError("A box or points prompt is required")
+    prompts = {}
+    if bbox is not None:
+        prompts["bboxes"] = np.asarray(bbox, np.float32).reshape(1, 4)
+    if points is not None:
+        points = np.asarray(points, np.float32).reshape(1, -1, 2)
+        labels = np.ones(points.shape[1], np.int32) if labels is None else np.asarray(labels, np.int32)
+        prompts["points"], prompts["labels"] = points, labels.reshape(1, -1)
+    return prompts
+
+
+class LiveObjects:
+    """
+    Object commands for a running SAM3VideoPredictor stream.
+
+    Objects from the stream's own prompts and added ones share one id
+    sequence, in order of creation (the stream's ``bboxes`` are 0..n-1 when
+    nothing was added before its first frame).
+
+    Args:
+        predictor: SAM3VideoPredictor
+
+    Attributes:
+        ids: Object ids of the masks in the latest result, in order
+        groups: Tracking states in use
+    """
+
+    def __init__(self, predictor: Any):
+        self.predictor = predictor
+        self.groups: list[TrackGroup] = []
+        self.ids: list[int] = []
+        self.pending: list[tuple] = []
+        self._next_id = 0
+        self._lock = threading.Lock()
+
+    def _queue(self, op: str, obj_id: int, prompts: Optional[dict], at: Optional[int]) -> None:
+        with self._lock:
+            self.pending.append((op, obj_id, prompts, at))
+
+    def add(
+        self,
+        obj_id: Optional[int] = None,
+        bbox: Optional[Sequence[float]] = None,
+        points: Optional[Sequence] = None,
+        labels: Optional[Sequence[int]] = None,
+        at: Optional[int] = None,
+    ) -> int:
+        """
+        Start tracking a new object.
+
+        Args:
+            obj_id: Id for the object (default: the next free id)
+            bbox: xyxy box prompt
+            points: (K, 2) point prompts
+            labels: (K,) point labels (1 positive, 0 negative; default all positive)
+            at: Frame (``dataset.frame``) to add it on (default: the next frame)
+
+        Returns:
+            The object's id
+        """
+        prompts = _prompts(bbox, points, labels)
+        with self._lock:
+            obj_id = self._next_id if obj_id is None else int(obj_id)
+            self._next_id = max(self._next_id, obj_id + 1)
+        self._queue("add", obj_id, prompts, at)
+        return obj_id
+
+    def remove(self, obj_id: int, at: Optional[int] = None) -> None:
+        """Stop tracking an object from the next frame (or frame ``at``)."""
+        self._queue("remove", obj_id, None, at)
+
+    def reprompt(
+        self,
+        obj_id: int,
+        bbox: Optional[Sequence[float]] = None,
+        points: Optional[Sequence] = None,
+        labels: Optional[Sequence[int]] = None,
+        at: Optional[int] = None,
+    ) -> None:
+        """Replace an object's prompt; its track restarts from the new prompt, keeping its id."""
+        self._queue("reprompt", obj_id, _prompts(bbox, points, labels), at)
+
+    def _due(self, frame: int) -> list:
+        with self._lock:
+            due = [c for c in self.pending if c[3] is None or c[3] <= frame]
+            self.pending = [c for c in self.pending if not (c[3] is None or c[3] <= frame)]
+        return due
+
+    def _group_of(self, obj_id: int) -> Optional[TrackGroup]:
+        return next((g for g in self.groups if obj_id in g.live), None)
+
+    def _apply(self, frame: int) -> list[tuple[TrackGroup, dict]]:
+        """Apply due commands; returns the new groups with their prompts."""
+        starts: dict[int, dict] = {}  # objects starting on this frame -> prompts
+        for op, obj_id, prompts, _ in self._due(frame):
+            group = self._group_of(obj_id)
+            if op == "add":
+                if group is not None or obj_id in starts:
+                    warnings.warn(f"Object {obj_id} is already tracked; add ignored")
+                    continue
+                starts[obj_id] = prompts
+                continue
+            if obj_id in starts:  # started by an earlier command of this frame: not tracked yet
+                if op == "remove":
+                    del starts[obj_id]
+                else:
+                    starts[obj_id] = prompts
+                continue
+            if group is None:
+                warnings.warn(f"Object {obj_id} is not tracked; {op} ignored")
+                continue
+            group.hidden.add(obj_id)
+            if not group.live:
+                self.groups.remove(group)
+            if op == "reprompt":
+                starts[obj_id] = prompts
+        return [(TrackGroup(_sam3.new_tracker_state(self.predictor), [i]), p) for i, p in starts.items()]
+
+    def _inference(self, im: torch.Tensor, *args, **kwargs) -> tuple[torch.Tensor, torch.Tensor]:
+        predictor = self.predictor
+        frame = predictor.dataset.frame
+        runs: list[tuple[TrackGroup, tuple, dict]] = []
+        if self._initial is None:  # first frame: the stream's own prompts, if any, form the initial group
+            given = args or any(v is not None for v in kwargs.values()) or getattr(predictor, "prompts", None)
+            self._initial = TrackGroup(predictor.inference_state) if given else False
+            if given:
+                runs.append((self._initial, args, kwargs))
+        new = [(g, (), prompts) for g, prompts in self._apply(frame)]
+        for group in self.groups:
+            # the stream's prompts are passed on every frame and ignored once its objects exist
+            runs.append((group, args, kwargs) if group is self._initial else (group, (), {}))
+        runs += new
+
+        masks, ids = [], []
+        for group, group_args, group_kwargs in runs:
+            predictor.inference_state = group.state
+            start = time.perf_counter()
+            self._original(im, *group_args, **group_kwargs)
+            group.ms = (time.perf_counter() - start) * 1000
+            if group is self._initial and not group.ids:
+                with self._lock:
+                    group.ids = list(range(self._next_id, self._next_id + len(group.state["obj_ids"])))
+                    self._next_id += len(group.ids)
+            if group not in self.groups:
+                self.groups.append(group)
+            logits = _sam3.tracked_masks(group.state, frame)
+            for idx, obj_id in enumerate(group.ids):
+                if logits is not None and obj_id not in group.hidden:
+                    masks.append(logits[idx])
+                    ids.append(obj_id)
+        predictor.inference_state = self.groups[0].state if self.groups else {}
+        predictor.tracker_states[:] = [g.state for g in self.groups]
+
+        if not masks:
+            self.ids = []
+            return torch.zeros((0, *im.shape[-2:]), device=im.device), torch.zeros(0, device=im.device)
+        pred_masks = torch.stack(masks)
+        keep = (pred_masks > getattr(_sam3.get_model(predictor), "mask_threshold", 0.0)).flatten(1).any(1)
+        self.ids = [i for i, k in zip(ids, keep.tolist()) if k]
+        pred_masks = pred_masks[keep]  # blank masks are dropped, as the predictor does
+        return pred_masks, torch.ones(len(pred_masks), dtype=pred_masks.dtype, device=pred_masks.device)
+
+    def stats(self) -> dict:
+        """Tracked objects, tracking states and each state's last step time."""
+        return dict(
+            objects=sum(len(g.live) for g in self.groups),
+            groups=len(self.groups),
+            hidden=sum(len(g.hidden) for g in self.groups),
+            pending=len(self.pending),
+            group_ms={tuple(g.live): g.ms for g in self.groups},
+        )
+
+    def __enter__(self) -> "LiveObjects":
+        predictor = self.predictor
+        self.groups.clear()
+        self.ids = []
+        self._initial: Any = None
+        self._original = predictor.inference
+        self._patched_already = "inference" in vars(predictor)
+        self._features = _sam3.shared_image_features(predictor)
+        self._features.__enter__()
+        predictor.inference = self._inference
+        predictor.tracker_states = []
+        return self
+
+    def __exit__(self, *exc) -> None:
+        predictor = self.predictor
+        if self._patched_already:
+            predictor.inference = self._original
+        else:
+            del predictor.inference
+        del predictor.tracker_states
+        self._features.__exit__(*exc)
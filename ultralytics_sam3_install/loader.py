@@ -0,0 +1,271 @@
+"""
+Prefetching Image Loader
+Decodes, letterboxes and normalizes images on a thread pool into preallocated
+(pinned on CUDA hosts) batch buffers, and hands them to a predictor in order,
+so decoding overlaps inference instead of running serially with it.
+
+The preprocessing matches the SAM3 predictors' own: resize the long side to
+the model input size, pad to the bottom/right with gray (114), convert BGR
+to RGB and normalize with the predictor's mean and std. ``depth`` buffers
+rotate; a buffer is refilled only after the batch it held has been consumed
+(and, on CUDA, after its host-to-device copy finished).
+
+With ``reduce=True`` JPEGs larger than needed are decoded at 1/2, 1/4 or
+1/8 scale (libjpeg DCT scaling), which is several times faster; the decoded
+image, and therefore the returned masks and boxes, are at that reduced size
+(``Batch.scales`` holds the source/decoded ratio).
+
+Example:
+    loader = ImageLoader.from_predictor(predictor, paths, batch=4, workers=8)
+    with _sam3.prepared_source(predictor, loader, loader.batch):
+        for result in predictor(source="images", text=["person"], stream=True):
+            ...
+"""
+
+import threading
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Iterator, Optional, Sequence, Union
+
+import cv2
+import numpy as np
+
+try:
+    import torch
+except ImportError:  # numpy buffers only
+    torch = None
+
+try:
+    from PIL import Image
+except ImportError:  # cv2 backend only
+    Image = None
+
+BACKENDS = ("cv2", "pil")
+PAD_VALUE = 114  # ultralytics LetterBox fill
+REDUCED_FLAGS = {2: cv2.IMREAD_REDUCED_COLOR_2, 4: cv2.IMREAD_REDUCED_COLOR_4, 8: cv2.IMREAD_REDUCED_COLOR_8}
+
+
+def jpeg_size(path: Union[str, Path]) -> Optional[tuple[int, int]]:
+    """Read (width, height) from a JPEG's frame header, or None if ``path`` is not a JPEG."""
+    with open(path, "rb") as f:
+        if f.read(2) != b"\xff\xd8":
+            return None
+        while True:
+            marker = f.read(2)
+            if len(marker) < 2 or marker[0] != 0xFF:
+                return None
+            if marker[1] in (0xD8, 0x01) or 0xD0 <= marker[1] <= 0xD7:  # no length field
+                continue
+            length = int.from_bytes(f.read(2), "big")
+            if 0xC0 <= marker[1] <= 0xCF and marker[1] not in (0xC4, 0xC8, 0xCC):  # SOFn
+                height, width = np.frombuffer(f.read(5)[1:], ">u2")
+                return int(width), int(height)
+            f.seek(length - 2, 1)
+
+
+def reduction(size: tuple[int, int], imgsz: int) -> int:
+    """Largest JPEG scale-down factor (1, 2, 4 or 8) that keeps the long side at least ``imgsz``."""
+    long_side = max(size)
+    for factor in (8, 4, 2):
+        if long_side // factor >= imgsz:
+            return factor
+    return 1
+
+
+def decode(path: Union[str, Path], imgsz: Optional[int] = None, backend: str = "cv2") -> tuple[Optional[np.ndarray], float]:
+    """
+    Decode an image as BGR.
+
+    Args:
+        path: Image file
+        imgsz: Model input size; when given, JPEGs are decoded at a reduced scale
+            that still covers it
+        backend: "cv2" or "pil"
+
+    Returns:
+        Tuple of the image (None if unreadable) and the source/decoded size ratio
+    """
+    factor, size = 1, None
+    if imgsz:
+        try:
+            size = jpeg_size(path)
+        except OSError:
+            return None, 1.0
+        factor = reduction(size, imgsz) if size else 1
+    if backend == "pil":
+        if Image is None:
+            raise ImportError("backend='pil' needs Pillow")
+        try:
+            with Image.open(path) as im:
+                if factor > 1:
+                    im.draft("RGB", (size[0] // factor, size[1] // factor))
+                image = cv2.cvtColor(np.asarray(im.convert("RGB")), cv2.COLOR_RGB2BGR)
+        except OSError:
+            return None, 1.0
+    else:
+        image = cv2.imread(str(path), REDUCED_FLAGS[factor] if factor > 1 else cv2.IMREAD_COLOR)
+    if image is None:
+        return None, 1.0
+    return image, (size[0] / image.shape[1] if size else 1.0)
+
+
+def letterbox_into(image: np.ndarray, out: np.ndarray, mean: np.ndarray, std: np.ndarray) -> None:
+    """
+    Write ``image`` (BGR uint8) into ``out`` (3, S, S) as the SAM3 predictors would:
+    top-left letterbox, RGB, ``(x - mean) / std``.
+    """
+    s = out.shape[-1]
+    h, w = image.shape[:2]
+    r = s / max(h, w)
+    nw, nh = int(round(w * r)), int(round(h * r))
+    if (nw, nh) != (w, h):
+        image = cv2.resize(image, (nw, nh), interpolation=cv2.INTER_LINEAR)
+    for c in range(3):
+        region = out[c, :nh, :nw]
+        region[...] = image[:, :, 2 - c]
+        region -= mean[c]
+        region /= std[c]
+        out[c, nh:, :] = (PAD_VALUE - mean[c]) / std[c]
+        out[c, :nh, nw:] = (PAD_VALUE - mean[c]) / std[c]
+
+
+@dataclass
+class Batch:
+    """
+    One prepared batch.
+
+    Attributes:
+        paths: Image paths, in order (unreadable images are left out)
+        images: Decoded BGR images (``orig_img`` for the predictor)
+        scales: Source/decoded size ratio per image (1.0 unless reduced)
+        data: (B, 3, S, S) normalized float32 buffer (a view of a reused slot)
+    """
+
+    paths: list
+    images: list
+    scales: list
+    data: Any
+    slot: int = 0
+    loader: Any = None
+
+    def to(self, device: Any, dtype: Any = None) -> Any:
+        """Return the model input on ``device`` (non-blocking from pinned memory)."""
+        return self.loader._to_device(self, device, dtype)
+
+
+class ImageLoader:
+    """
+    Ordered, prefetching image loader producing ready model inputs.
+
+    Args:
+        paths: Image files
+        imgsz: Square model input size
+        mean: Per-channel RGB mean on the 0-255 scale
+        std: Per-channel RGB std on the 0-255 scale
+        batch: Images per batch
+        workers: Decode threads
+        depth: Batch buffers in rotation (prefetch distance + 1)
+        reduce: Decode large JPEGs at a reduced scale
+        backend: "cv2" or "pil"
+        pin_memory: Allocate page-locked buffers (default: when CUDA is available)
+
+    Attributes:
+        failed: Paths that could not be decoded
+    """
+
+    def __init__(
+        self,
+        paths: Sequence[Union[str, Path]],
+        imgsz: int = 1008,
+        mean: Sequence[float] = (127.5, 127.5, 127.5),
+        std: Sequence[float] = (127.5, 127.5, 127.5),
+        batch: int = 1,
+        workers: int = 4,
+        depth: int = 4,
+        reduce: bool = False,
+        backend: str = "cv2",
+        pin_memory: Optional[bool] = None,
+    ):
+        if backend not in BACKENDS:
+            raise ValueError(f"backend must be one of {BACKENDS}, got {backend!r}")
+        self.paths = list(paths)
+        self.imgsz = imgsz
+        self.mean = np.asarray(mean, np.float32)
+        self.std = np.asarray(std, np.float32)
+        self.batch = max(1, batch)
+        self.workers = max(1, workers)
+        self.depth = max(2, depth)
+        self.reduce = reduce
+        self.backend = backend
+        if pin_memory is None:
+            pin_memory = torch is not None and torch.cuda.is_available()
+        shape = (self.depth, self.batch, 3, imgsz, imgsz)
+        if torch is not None:
+            self.buffers = torch.empty(shape, dtype=torch.float32, pin_memory=pin_memory)
+            self.arrays = self.buffers.numpy()
+        else:
+            self.buffers = self.arrays = np.empty(shape, np.float32)
+        self.events: list[Any] = [None] * self.depth  # CUDA copy-done events per slot
+        self.failed: list = []
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_predictor(cls, predictor: Any, paths: Sequence[Union[str, Path]], **kwargs) -> "ImageLoader":
+        """Build a loader with the predictor's input size and normalization."""
+        from ultralytics_sam3_install import _sam3
+
+        mean, std = _sam3.normalization(predictor)
+        return cls(paths, _sam3.input_size(predictor), mean, std, **kwargs)
+
+    def __len__(self) -> int:
+        return (len(self.paths) + self.batch - 1) // self.batch
+
+    def _load(self, path: Union[str, Path], slot: int, index: int) -> tuple[Optional[np.ndarray], float]:
+        event = self.events[slot]
+        if event is not None:
+            event.synchronize()  # the previous copy out of this slot must finish first
+        image, scale = decode(path, self.imgsz if self.reduce else None, self.backend)
+        if image is None:
+            with self._lock:
+                self.failed.append(path)
+            return None, scale
+        letterbox_into(image, self.arrays[slot, index], self.mean, self.std)
+        return image, scale
+
+    def _to_device(self, batch: Batch, device: Any, dtype: Any = None) -> Any:
+        data = batch.data
+        if torch is None:
+            return data
+        data = data.to(device, non_blocking=True)
+        if data.device.type == "cuda":
+            event = torch.cuda.Event()
+            event.record()
+            self.events[batch.slot] = event
+        return data.to(dtype) if dtype is not None else data
+
+    def __iter__(self) -> Iterator[Batch]:
+        """Yield batches in path order; the previous batch's buffer is reused once the next one is requested."""
+        chunks = [self.paths[i : i + self.batch] for i in range(0, len(self.paths), self.batch)]
+        with ThreadPoolExecutor(self.workers, thread_name_prefix="loader") as pool:
+            pending: deque[tuple[int, list, list[Future]]] = deque()
+
+            def submit(k: int) -> None:
+                slot = k % self.depth
+                pending.append((slot, chunks[k], [pool.submit(self._load, p, slot, j) for j, p in enumerate(chunks[k])]))
+
+            for k in range(min(self.depth - 1, len(chunks))):
+                submit(k)
+            for k in range(len(chunks)):
+                if k + self.depth - 1 < len(chunks):
+                    submit(k + self.depth - 1)  # reuses the slot of batch k - 1, consumed by now
+                slot, paths, futures = pending.popleft()
+                loaded = [f.result() for f in futures]
+                keep = [j for j, (image, _) in enumerate(loaded) if image is not None]
+                if not keep:
+                    continue
+                data = self.buffers[slot, : len(paths)]
+                if len(keep) < len(paths):
+                    data = data[keep] if torch is None else data[torch.as_tensor(keep)]
+                yield Batch([paths[j] for j in keep], [loaded[j][0] for j in keep], [loaded[j][1] for j in keep], data, slot, self)
@@ -0,0 +1,435 @@
+"""
+Mask IoU and Mask NMS
+Pairwise overlap between thousands of instance masks and duplicate removal
+when results of several prompts, tiles or models are combined.
+
+Masks are compared as run-length intervals (``MaskRuns``) built from dense
+masks, bbox-cropped masks or COCO RLE. Only pairs whose bounding boxes
+intersect are evaluated. For a pair, the intersection is the covered length
+of one mask's runs under the other mask's cumulative coverage, looked up for
+all pairs at once with a single ``np.searchsorted`` over every mask's run
+boundaries, so there is no Python loop over pairs and the cost scales with the
+number of runs rather than pixels. Dense torch masks can instead be compared
+with chunked matrix products on the GPU.
+
+Example:
+    keep = mask_nms(result.masks.data, result.boxes.conf, iou_threshold=0.5)
+    iou = mask_iou(MaskRuns.from_rle(coco_rles))
+    red, blue = nms_results([result_red, result_blue])  # drop cross-prompt duplicates
+"""
+
+from dataclasses import dataclass
+from typing import Any, Optional, Sequence
+
+import numpy as np
+
+try:
+    import torch
+except ImportError:  # numpy-only use (RLE / crops)
+    torch = None
+
+METRICS = ("iou", "ios")  # intersection over union / over the smaller mask
+DENSE_BUDGET = 1 << 28  # largest float32 element count of dense GPU masks compared by matrix product
+
+
+def _is_tensor(x: Any) -> bool:
+    return torch is not None and isinstance(x, torch.Tensor)
+
+
+def _to_numpy(x: Any) -> np.ndarray:
+    return x.detach().cpu().numpy() if _is_tensor(x) else np.asarray(x)
+
+
+@dataclass
+class MaskRuns:
+    """
+    Masks as sorted foreground runs over flattened pixel indices.
+
+    Runs of mask ``i`` are ``starts[offsets[i]:offsets[i + 1]]`` (inclusive)
+    to ``ends[...]`` (exclusive). All masks in one comparison must share
+    ``shape`` and pixel order (row-major for dense masks and crops,
+    column-major for COCO RLE).
+
+    Attributes:
+        starts: (R,) run start indices
+        ends: (R,) run end indices
+        offsets: (N + 1,) run ranges per mask
+        shape: (height, width) of the full mask
+        boxes: (N, 4) xyxy bounds (conservative for runs that wrap lines)
+        order: "C" (row-major) or "F" (column-major)
+    """
+
+    starts: np.ndarray
+    ends: np.ndarray
+    offsets: np.ndarray
+    shape: tuple[int, int]
+    boxes: np.ndarray
+    order: str = "C"
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    @property
+    def areas(self) -> np.ndarray:
+        """(N,) foreground pixel counts."""
+        lengths = np.concatenate([[0], np.cumsum(self.ends - self.starts)])
+        return lengths[self.offsets[1:]] - lengths[self.offsets[:-1]]
+
+    @classmethod
+    def from_flat(cls, starts: np.ndarray, ends: np.ndarray, counts: np.ndarray, shape: tuple[int, int], order: str = "C"):
+        """Build from concatenated runs and the number of runs per mask; computes bounds."""
+        starts, ends = starts.astype(np.int64), ends.astype(np.int64)
+        offsets = np.concatenate([[0], np.cumsum(counts)]).astype(np.int64)
+        h, w = shape
+        line = w if order == "C" else h  # pixels per row (C) or column (F)
+        first, last = starts // line, (ends - 1) // line
+        lo, hi = starts % line, (ends - 1) % line + 1
+        wraps = first != last
+        lo, hi = np.where(wraps, 0, lo), np.where(wraps, line, hi)
+        boxes = np.zeros((len(counts), 4), np.int64)
+        owner = np.repeat(np.arange(len(counts)), counts)
+        if len(starts):
+            big = np.iinfo(np.int64).max
+            for col, values, fn, init in ((0, lo, np.minimum, big), (1, first, np.minimum, big), (2, hi, np.maximum, 0), (3, last + 1, np.maximum, 0)):
+                out = np.full(len(counts), init, np.int64)
+                fn.at(out, owner, values)
+                boxes[:, col] = np.where(counts > 0, out, 0)
+        if order == "F":  # lines are columns: swap x and y bounds
+            boxes = boxes[:, [1, 0, 3, 2]]
+        return cls(starts, ends, offsets, (h, w), boxes, order)
+
+    @classmethod
+    def from_masks(cls, masks: Any) -> "MaskRuns":
+        """Encode (N, H, W) dense boolean masks (numpy or torch)."""
+        masks = _to_numpy(masks).astype(bool)
+        n, h, w = masks.shape
+        flat = np.zeros((n, h * w + 2), np.int8)
+        flat[:, 1:-1] = masks.reshape(n, h * w)
+        edges = np.diff(flat, axis=1)  # +1 at run starts, -1 at run ends
+        mask_s, starts = np.nonzero(edges == 1)
+        _, ends = np.nonzero(edges == -1)
+        return cls.from_flat(starts, ends, np.bincount(mask_s, minlength=n), (h, w))
+
+    @classmethod
+    def from_crops(cls, crops: Sequence[np.ndarray], boxes: Any, shape: tuple[int, int]) -> "MaskRuns":
+        """
+        Encode bbox-cropped masks.
+
+        Args:
+            crops: Boolean masks, ``crops[i]`` covering ``boxes[i]``
+            boxes: (N, 4) integer xyxy placement of each crop in the full mask
+            shape: (height, width) of the full mask
+        """
+        boxes = _to_numpy(boxes).astype(np.int64).reshape(-1, 4)
+        w = shape[1]
+        starts, ends, counts = [], [], []
+        for crop, (x0, y0, _, _) in zip(crops, boxes.tolist()):
+            crop = _to_numpy(crop).astype(bool)
+            ch, cw = crop.shape
+            padded = np.zeros((ch, cw + 2), np.int8)
+            padded[:, 1:-1] = crop
+            edges = np.diff(padded, axis=1)
+            rs, cs = np.nonzero(edges == 1)
+            _, ce = np.nonzero(edges == -1)
+            base = (y0 + rs) * w + x0
+            starts.append(base + cs)
+            ends.append(base + ce)
+            counts.append(len(rs))
+        cat = lambda parts: np.concatenate(parts) if parts else np.zeros(0, np.int64)  # noqa: E731
+        return cls.from_flat(cat(starts), cat(ends), np.array(counts, np.int64), shape)
+
+    @classmethod
+    def from_rle(cls, rles: Sequence[dict]) -> "MaskRuns":
+        """Encode COCO uncompressed RLEs (``{"size": [h, w], "counts": [...]}``, column-major)."""
+        if not rles:
+            return cls.from_flat(np.zeros(0), np.zeros(0), np.zeros(0, np.int64), (0, 0), "F")
+        shape = tuple(rles[0]["size"])
+        starts, ends, counts = [], [], []
+        for rle in rles:
+            bounds = np.cumsum(rle["counts"])  # counts alternate background / foreground
+            s, e = bounds[0::2], bounds[1::2]
+            s = s[: len(e)]
+            keep = e > s
+            starts.append(s[keep])
+            ends.append(e[keep])
+            counts.append(int(keep.sum()))
+        return cls.from_flat(np.concatenate(starts), np.concatenate(ends), np.array(counts, np.int64), shape, "F")
+
+    def to_rle(self) -> list[dict]:
+        """Return COCO uncompressed RLEs (runs must be column-major, e.g. from ``from_rle`` or ``rle_encode``)."""
+        if self.order != "F":
+            raise ValueError("COCO RLE is column-major; encode dense masks with rle_encode")
+        out = []
+        for i in range(len(self)):
+            s, e = self.starts[self.offsets[i] : self.offsets[i + 1]], self.ends[self.offsets[i] : self.offsets[i + 1]]
+            bounds = np.stack([s, e], 1).ravel()
+            counts = np.diff(np.concatenate([[0], bounds, [self.shape[0] * self.shape[1]]]))
+            out.append(dict(size=list(self.shape), counts=counts.tolist()))
+        return out
+
+    def to_masks(self) -> np.ndarray:
+        """Decode to (N, H, W) dense boolean masks."""
+        h, w = self.shape
+        delta = np.zeros((len(self), h * w + 1), np.int8)
+        owner = np.repeat(np.arange(len(self)), np.diff(self.offsets))
+        np.add.at(delta, (owner, self.starts), 1)
+        np.add.at(delta, (owner, self.ends), -1)
+        flat = np.cumsum(delta[:, :-1], axis=1, dtype=np.int8) > 0
+        return flat.reshape(len(self), h, w) if self.order == "C" else flat.reshape(len(self), w, h).transpose(0, 2, 1)
+
+
+def rle_encode(masks: Any) -> list[dict]:
+    """Encode (N, H, W) dense masks as COCO uncompressed RLEs."""
+    masks = _to_numpy(masks).astype(bool)
+    runs = MaskRuns.from_masks(masks.transpose(0, 2, 1))  # column-major flattening
+    return MaskRuns(runs.starts, runs.ends, runs.offsets, masks.shape[1:], runs.boxes[:, [1, 0, 3, 2]], "F").to_rle()
+
+
+def rle_decode(rles: Sequence[dict]) -> np.ndarray:
+    """Decode COCO uncompressed RLEs to (N, H, W) boolean masks."""
+    return MaskRuns.from_rle(rles).to_masks()
+
+
+def box_overlap_pairs(a: np.ndarray, b: np.ndarray, same: Optional[np.ndarray] = None, chunk: int = 4096):
+    """
+    Index pairs of intersecting xyxy boxes, computed in row chunks.
+
+    Args:
+        a: (N, 4) boxes
+        b: (M, 4) boxes
+        same: (N, M) extra mask of allowed pairs (e.g. equal classes), or a
+            pair of (N,) / (M,) label arrays
+
+    Returns:
+        Row and column indices of candidate pairs
+    """
+    rows, cols = [], []
+    for i in range(0, len(a), chunk):
+        ai = a[i : i + chunk]
+        ok = (np.minimum(ai[:, None, 2], b[None, :, 2]) > np.maximum(ai[:, None, 0], b[None, :, 0])) & (
+            np.minimum(ai[:, None, 3], b[None, :, 3]) > np.maximum(ai[:, None, 1], b[None, :, 1])
+        )
+        if same is not None:
+            ok &= same[0][i : i + chunk, None] == same[1][None]
+        r, c = np.nonzero(ok)
+        rows.append(r + i)
+        cols.append(c)
+    if not rows:
+        return np.zeros(0, np.int64), np.zeros(0, np.int64)
+    return np.concatenate(rows), np.concatenate(cols)
+
+
+def _boundaries(runs: MaskRuns) -> tuple[np.ndarray, np.ndarray, int]:
+    """
+    Interleaved run boundaries s0, e0, s1, e1, ... of all masks, shifted by
+    ``mask * span`` so masks never interleave, with the covered pixel count
+    of the mask at each boundary.
+    """
+    span = runs.shape[0] * runs.shape[1] + 1
+    mask_of_run = np.repeat(np.arange(len(runs)), np.diff(runs.offsets))
+    bounds = (np.stack([runs.starts, runs.ends], 1) + (mask_of_run * span)[:, None]).ravel()
+    lengths = runs.ends - runs.starts
+    csum = np.concatenate([[0], np.cumsum(lengths)])
+    prior = csum[:-1] - csum[runs.offsets[:-1]][mask_of_run]  # pixels covered before each run, per mask
+    return bounds, np.stack([prior, prior + lengths], 1).ravel(), span
+
+
+def _coverage(runs: MaskRuns, table: tuple, owner: np.ndarray, x: np.ndarray) -> np.ndarray:
+    """Foreground pixels of mask ``owner[k]`` before flat index ``x[k]`` (vectorized over k)."""
+    bounds, cover, span = table
+    key = x + owner * span
+    pos = np.searchsorted(bounds, key, side="right") - 1
+    valid = pos >= 2 * runs.offsets[owner]  # at or after this mask's first boundary
+    pos = np.maximum(pos, 0)
+    inside = pos % 2 == 0  # last boundary passed is a run start
+    return np.where(valid, np.where(inside, cover[pos] + key - bounds[pos], cover[pos]), 0)
+
+
+def _gather_runs(first: np.ndarray, counts: np.ndarray) -> np.ndarray:
+    """Concatenated run index ranges ``first[k] : first[k] + counts[k]``."""
+    shift = first - np.concatenate([[0], np.cumsum(counts)[:-1]])
+    return np.repeat(shift, counts) + np.arange(counts.sum())
+
+
+def pairwise_intersections(a: MaskRuns, b: MaskRuns, rows: np.ndarray, cols: np.ndarray, chunk: int = 1 << 22) -> np.ndarray:
+    """
+    Exact intersection areas of mask pairs ``(a[rows[k]], b[cols[k]])``.
+
+    For every pair, the runs of the mask with fewer runs that fall in the
+    lines (rows, or columns for RLE) shared by both boxes are measured against
+    the other mask's cumulative coverage; each chunk of about ``chunk`` runs
+    is one ``searchsorted`` call.
+    """
+    out = np.zeros(len(rows), np.int64)
+    swap = np.diff(a.offsets)[rows] < np.diff(b.offsets)[cols]
+    y = (1, 3) if a.order == "C" else (0, 2)  # box coordinates along the line axis
+    line = a.shape[1] if a.order == "C" else a.shape[0]
+    for probe, target, p_all, t_all, sel in (
+        (b, a, cols, rows, np.flatnonzero(~swap)),
+        (a, b, rows, cols, np.flatnonzero(swap)),
+    ):
+        if not len(sel):
+            continue
+        p_idx, t_idx = p_all[sel], t_all[sel]
+        table = _boundaries(target)
+        span = table[2]
+        # Probe runs overlapping the shared lines: a contiguous range per pair
+        lo = np.maximum(probe.boxes[p_idx, y[0]], target.boxes[t_idx, y[0]]) * line + p_idx * span
+        hi = np.minimum(probe.boxes[p_idx, y[1]], target.boxes[t_idx, y[1]]) * line + p_idx * span
+        mask_of_run = np.repeat(np.arange(len(probe)), np.diff(probe.offsets))
+        first = np.searchsorted(probe.ends + mask_of_run * span, lo, side="right")
+        counts = np.maximum(np.searchsorted(probe.starts + mask_of_run * span, hi, side="left") - first, 0)
+        total = np.cumsum(counts)
+        splits = np.searchsorted(total, np.arange(chunk, total[-1], chunk), side="right") if total[-1] else []
+        for part in np.split(np.arange(len(sel)), splits):
+            if not len(part):
+                continue
+            run = _gather_runs(first[part], counts[part])
+            pair = np.repeat(np.arange(len(part)), counts[part])
+            owner = t_idx[part][pair]
+            covered = _coverage(target, table, owner, probe.ends[run]) - _coverage(target, table, owner, probe.starts[run])
+            out[sel[part]] = np.bincount(pair, weights=covered, minlength=len(part)).astype(np.int64)
+    return out
+
+
+def _dense_overlap(a: "torch.Tensor", b: "torch.Tensor", metric: str, chunk: int = 256) -> "torch.Tensor":
+    """Pairwise IoU/IoS of dense torch masks with chunked matrix products on their device."""
+    fa, fb = a.flatten(1).float(), b.flatten(1).float()
+    area_a, area_b = fa.sum(1), fb.sum(1)
+    inter = torch.cat([fa[i : i + chunk] @ fb.T for i in range(0, len(fa), chunk)]) if len(fa) else fa.new_zeros(0, len(fb))
+    if metric == "ios":
+        denom = torch.minimum(area_a[:, None], area_b[None])
+    else:
+        denom = area_a[:, None] + area_b[None] - inter
+    return torch.where(denom > 0, inter / denom.clamp_min(1), torch.zeros_like(inter))
+
+
+def as_runs(masks: Any) -> MaskRuns:
+    """Convert dense masks (numpy/torch), COCO RLE lists or ``MaskRuns`` to ``MaskRuns``."""
+    if isinstance(masks, MaskRuns):
+        return masks
+    if isinstance(masks, (list, tuple)) and (not masks or isinstance(masks[0], dict)):
+        return MaskRuns.from_rle(masks)
+    return MaskRuns.from_masks(masks)
+
+
+def mask_iou(a: Any, b: Optional[Any] = None, metric: str = "iou", classes: Optional[tuple] = None) -> Any:
+    """
+    Pairwise mask IoU (or intersection over the smaller mask).
+
+    Dense CUDA masks (up to ``DENSE_BUDGET`` elements) are compared with
+    matrix products on the GPU and return a tensor; every other input is
+    compared through ``MaskRuns`` and returns a numpy array. Pairs whose boxes do not intersect (or whose
+    classes differ, when ``classes`` is given) are 0.
+
+    Args:
+        a: (N, H, W) dense masks, list of COCO RLE dicts, or ``MaskRuns``
+        b: Second set (default: ``a``)
+        metric: "iou" or "ios"
+        classes: Pair of (N,) and (M,) labels for class-aware comparison
+
+    Returns:
+        (N, M) overlap matrix
+    """
+    if metric not in METRICS:
+        raise ValueError(f"metric must be one of {METRICS}, got {metric!r}")
+    b_dense = a if b is None else b
+    if _is_tensor(a) and _is_tensor(b_dense) and a.is_cuda and a.numel() + b_dense.numel() <= DENSE_BUDGET:
+        out = _dense_overlap(a, b_dense, metric)
+        if classes is not None:
+            ca, cb = (torch.as_tensor(c, device=out.device) for c in classes)
+            out = out * (ca[:, None] == cb[None])
+        return out
+    ra = as_runs(a)
+    rb = ra if b is None else as_runs(b)
+    out = np.zeros((len(ra), len(rb)), np.float32)
+    same = None if classes is None else tuple(_to_numpy(c) for c in classes)
+    rows, cols = box_overlap_pairs(ra.boxes, rb.boxes, same)
+    if b is None:  # symmetric: compute each unordered pair once
+        upper = rows <= cols
+        rows, cols = rows[upper], cols[upper]
+    if not len(rows):
+        return out
+    inter = pairwise_intersections(ra, rb, rows, cols)
+    area_a, area_b = ra.areas[rows], rb.areas[cols]
+    denom = np.minimum(area_a, area_b) if metric == "ios" else area_a + area_b - inter
+    out[rows, cols] = np.where(denom > 0, inter / np.maximum(denom, 1), 0.0)
+    if b is None:
+        out[cols, rows] = out[rows, cols]
+    return out
+
+
+def mask_nms(
+    masks: Any,
+    scores: Any,
+    iou_threshold: float = 0.5,
+    classes: Optional[Any] = None,
+    metric: str = "iou",
+) -> Any:
+    """
+    Greedy mask non-maximum suppression.
+
+    Args:
+        masks: (N, H, W) dense masks, list of COCO RLE dicts, or ``MaskRuns``
+        scores: (N,) confidences
+        iou_threshold: Overlap above which the lower-scoring mask is removed
+        classes: (N,) labels for class-aware NMS (None: class-agnostic)
+        metric: "iou" or "ios" (intersection over the smaller mask, which also
+            removes fragments of a larger mask)
+
+    Returns:
+        Indices of kept masks, highest score first (a tensor for torch input)
+    """
+    torch_in = _is_tensor(scores)
+    device = scores.device if torch_in else None
+    scores_np = _to_numpy(scores).astype(np.float32).ravel()
+    order = np.argsort(-scores_np, kind="stable")
+    pair_cls = None if classes is None else (_to_numpy(classes).ravel()[order],) * 2
+    if _is_tensor(masks) and masks.is_cuda and 2 * masks.numel() <= DENSE_BUDGET:
+        overlap = _to_numpy(mask_iou(masks[torch.as_tensor(order, device=masks.device)], metric=metric, classes=pair_cls))
+    else:
+        overlap = mask_iou(_subset(as_runs(masks), order), metric=metric, classes=pair_cls)
+    suppress = np.triu(overlap > iou_threshold, 1)
+    removed = np.zeros(len(order), bool)
+    for i in np.flatnonzero(suppress.any(1)):
+        if not removed[i]:
+            removed |= suppress[i]
+    keep = order[~removed]
+    return torch.as_tensor(keep, device=device) if torch_in else keep
+
+
+def _subset(runs: MaskRuns, index: np.ndarray) -> MaskRuns:
+    """Return the masks ``runs[index]`` as a new ``MaskRuns``."""
+    counts = np.diff(runs.offsets)[index]
+    run = _gather_runs(runs.offsets[index], counts)
+    offsets = np.concatenate([[0], np.cumsum(counts)]).astype(np.int64)
+    return MaskRuns(runs.starts[run], runs.ends[run], offsets, runs.shape, runs.boxes[index], runs.order)
+
+
+def nms_results(results: Sequence[Any], iou_threshold: float = 0.5, agnostic: bool = True, metric: str = "iou") -> list:
+    """
+    Remove duplicates across ultralytics ``Results`` of the same image (e.g. one per prompt).
+
+    Args:
+        results: Results objects with masks (None entries are passed through)
+        iou_threshold: Mask overlap above which the lower-scoring detection is dropped
+        agnostic: Compare detections of different classes too
+        metric: "iou" or "ios"
+
+    Returns:
+        Each input ``Results`` filtered to its surviving detections
+    """
+    parts = [(i, r) for i, r in enumerate(results) if r is not None and r.masks is not None and len(r.masks)]
+    if len(parts) < 1:
+        return list(results)
+    masks = torch.cat([r.masks.data.bool() for _, r in parts])
+    scores = torch.cat([r.boxes.conf for _, r in parts])
+    source = np.concatenate([np.full(len(r.masks), i) for i, r in parts])
+    local = np.concatenate([np.arange(len(r.masks)) for _, r in parts])
+    classes = None if agnostic else torch.cat([r.boxes.cls for _, r in parts])
+    keep = _to_numpy(mask_nms(masks, scores, iou_threshold, classes, metric))
+    out = list(results)
+    for i, r in parts:
+        mine = np.sort(local[keep][source[keep] == i])
+        out[i] = r[torch.as_tensor(mine, dtype=torch.long)]
+    return out
@@ -0,0 +1,333 @@
+"""
+Memory Profiling
+Peak host RSS, per-stage tensor allocations and per-frame memory for SAM3
+predictors.
+
+Stages (image encode, text encode, decoder, postprocess, ...) are measured by
+hooking the model's submodules and the predictor's ``postprocess``. On CUDA
+the allocator counters give exact tensor allocations; on CPU-only hosts each
+stage reports RSS growth and, optionally, the Python heap peak from
+``tracemalloc``.
+
+Example:
+    profiler = MemoryProfiler()
+    with profiler.attach(predictor):
+        predictor.set_image("image.jpg")
+        predictor(text=["person"])
+        for result in profiler.frames(video_predictor(source="video.mp4", stream=True)):
+            ...
+    print(profiler.summary())
+"""
+
+import functools
+import gc
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from typing import Any, Callable, Iterable, Iterator, Optional
+
+import torch
+
+from ultralytics_sam3_install import _sam3
+
+try:
+    import psutil
+except ImportError:  # peak RSS falls back to the process high-water mark
+    psutil = None
+
+MB = 1024**2
+
+
+def current_rss_mb() -> float:
+    """Return the current resident set size of this process in MB."""
+    if psutil is not None:
+        return psutil.Process().memory_info().rss / MB
+    import resource
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / MB if sys.platform == "darwin" else peak / 1024
+
+
+def device_allocated_mb() -> Optional[float]:
+    """Return memory currently held by tensors on the CUDA device, or None on CPU."""
+    return torch.cuda.memory_allocated() / MB if torch.cuda.is_available() else None
+
+
+class RssSampler:
+    """Background thread keeping the running peak RSS since the last ``reset``."""
+
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self.peak_mb = current_rss_mb()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def reset(self) -> float:
+        """Start a new peak window and return the peak of the previous one."""
+        previous, self.peak_mb = self.peak_mb, current_rss_mb()
+        return max(previous, self.peak_mb)
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self.peak_mb = max(self.peak_mb, current_rss_mb())
+            self._stop.wait(self.interval)
+
+    def start(self) -> "RssSampler":
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.peak_mb = max(self.peak_mb, current_rss_mb())
+
+
+class PeakMemory:
+    """
+    Track peak host RSS and peak device memory over a block.
+
+    RSS is sampled on a background thread; device memory uses the CUDA
+    allocator's own peak counters.
+    """
+
+    def __init__(self, interval: float = 0.005):
+        self.sampler = RssSampler(interval)
+        self.peak_rss_mb = 0.0
+        self.device_peak_mb: Optional[float] = None
+
+    def __enter__(self) -> "PeakMemory":
+        gc.collect()
+        if torch.cuda.is_available():
+            torch.cuda.reset_peak_memory_stats()
+        self.sampler.reset()
+        self.sampler.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.sampler.stop()
+        self.peak_rss_mb = self.sampler.peak_mb
+        if torch.cuda.is_available():
+            self.device_peak_mb = torch.cuda.max_memory_allocated() / MB
+
+
+class _Window:
+    """Open measurement window for one stage invocation."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.start = time.perf_counter()
+        self.rss_start = current_rss_mb()
+        self.device_start = device_allocated_mb()
+        self.rss_peak = self.rss_start
+        self.device_peak = self.device_start
+        self.python_peak = 0
+
+
+class MemoryProfiler:
+    """
+    Record memory use per stage, per call and per video frame.
+
+    Stages may nest (e.g. a decorated function calling the model); peaks are
+    attributed to the innermost open stage and folded into its parents.
+    """
+
+    def __init__(self, python_heap: bool = False, interval: float = 0.005):
+        """
+        Args:
+            python_heap: Also track Python heap peaks with tracemalloc
+                (adds overhead; useful on CPU-only hosts)
+            interval: RSS sampling interval in seconds
+        """
+        self.python_heap = python_heap
+        self.sampler = RssSampler(interval)
+        self.stages: dict[str, dict] = {}
+        self.frame_records: list[dict] = []
+        self._stack: list[_Window] = []
+        self._lock = threading.RLock()
+        self._active = 0
+
+    def start(self) -> "MemoryProfiler":
+        """Begin sampling (called automatically by ``attach``, ``stage`` and ``frames``)."""
+        if self._active == 0:
+            self.sampler.start()
+            if self.python_heap and not tracemalloc.is_tracing():
+                tracemalloc.start()
+        self._active += 1
+        return self
+
+    def stop(self) -> None:
+        """Stop sampling once every ``start`` has been matched."""
+        self._active = max(0, self._active - 1)
+        if self._active == 0:
+            self.sampler.stop()
+            if self.python_heap and tracemalloc.is_tracing():
+                tracemalloc.stop()
+
+    def _fold_peaks_into_top(self) -> None:
+        """Move the current peak counters into the innermost open window."""
+        if not self._stack:
+            return
+        top = self._stack[-1]
+        top.rss_peak = max(top.rss_peak, self.sampler.reset())
+        if torch.cuda.is_available():
+            top.device_peak = max(top.device_peak or 0.0, torch.cuda.max_memory_allocated() / MB)
+            torch.cuda.reset_peak_memory_stats()
+        if self.python_heap and tracemalloc.is_tracing():
+            top.python_peak = max(top.python_peak, tracemalloc.get_traced_memory()[1])
+            tracemalloc.reset_peak()
+
+    @contextmanager
+    def stage(self, name: str):
+        """Measure a block as stage ``name``; repeated calls are aggregated."""
+        self.start()
+        with self._lock:
+            self._fold_peaks_into_top()
+            if not self._stack:
+                self.sampler.reset()
+                if torch.cuda.is_available():
+                    torch.cuda.reset_peak_memory_stats()
+            self._stack.append(_Window(name))
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._fold_peaks_into_top()
+                window = self._stack.pop()
+                self._record(window)
+                if self._stack:  # parents see the child's peak
+                    parent = self._stack[-1]
+                    parent.rss_peak = max(parent.rss_peak, window.rss_peak)
+                    if window.device_peak is not None:
+                        parent.device_peak = max(parent.device_peak or 0.0, window.device_peak)
+                    parent.python_peak = max(parent.python_peak, window.python_peak)
+            self.stop()
+
+    def _record(self, window: _Window) -> None:
+        rss_end = current_rss_mb()
+        device_end = device_allocated_mb()
+        stats = self.stages.setdefault(
+            window.name,
+            dict(calls=0, total_ms=0.0, peak_rss_mb=0.0, max_rss_growth_mb=0.0, device_peak_mb=None,
+                 max_device_growth_mb=None, max_device_retained_mb=None, python_peak_mb=None),
+        )
+        stats["calls"] += 1
+        stats["total_ms"] += (time.perf_counter() - window.start) * 1000
+        stats["peak_rss_mb"] = max(stats["peak_rss_mb"], window.rss_peak)
+        stats["max_rss_growth_mb"] = max(stats["max_rss_growth_mb"], window.rss_peak - window.rss_start)
+        if window.device_start is not None:
+            growth = (window.device_peak or window.device_start) - window.device_start
+            retained = device_end - window.device_start
+            stats["device_peak_mb"] = max(stats["device_peak_mb"] or 0.0, window.device_peak or 0.0)
+            stats["max_device_growth_mb"] = max(stats["max_device_growth_mb"] or 0.0, growth)
+            stats["max_device_retained_mb"] = max(stats["max_device_retained_mb"] or 0.0, retained)
+        if self.python_heap:
+            stats["python_peak_mb"] = max(stats["python_peak_mb"] or 0.0, window.python_peak / MB)
+
+    def profile(self, name: Optional[str] = None) -> Callable:
+        """Decorator measuring every call of a function as a stage."""
+
+        def decorator(fn: Callable) -> Callable:
+            stage_name = name or fn.__qualname__
+
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                with self.stage(stage_name):
+                    return fn(*args, **kwargs)
+
+            return wrapper
+
+        return decorator
+
+    @contextmanager
+    def attach(self, predictor: Any):
+        """
+        Instrument a predictor's stages for the duration of the block.
+
+        Model submodules are measured with forward hooks; ``postprocess`` is
+        wrapped on the predictor instance.
+        """
+        model = _sam3.get_model(predictor)
+        handles = []
+        for stage_name, module in _sam3.stage_modules(model).items():
+            opened = {}
+
+            def pre_hook(_module, _inputs, stage_name=stage_name, opened=opened):
+                ctx = self.stage(stage_name)
+                ctx.__enter__()
+                opened.setdefault("stack", []).append(ctx)
+
+            def post_hook(_module, _inputs, _output, opened=opened):
+                opened["stack"].pop().__exit__(None, None, None)
+
+            handles.append(module.register_forward_pre_hook(pre_hook))
+            handles.append(module.register_forward_hook(post_hook))
+        original_postprocess = predictor.postprocess
+        patched_already = "postprocess" in vars(predictor)
+        predictor.postprocess = self.profile("postprocess")(original_postprocess)
+        self.start()
+        try:
+            yield self
+        finally:
+            self.stop()
+            for handle in handles:
+                handle.remove()
+            if patched_already:
+                predictor.postprocess = original_postprocess
+            else:
+                del predictor.postprocess
+
+    def frames(self, results: Iterable[Any]) -> Iterator[Any]:
+        """
+        Wrap a streaming results iterator and record memory after every frame.
+
+        Yields:
+            The original results, unchanged
+        """
+        self.start()
+        try:
+            start = time.perf_counter()
+            for index, result in enumerate(results):
+                self.frame_records.append(
+                    dict(
+                        frame=index,
+                        ms=(time.perf_counter() - start) * 1000,
+                        rss_mb=current_rss_mb(),
+                        peak_rss_mb=self.sampler.peak_mb,
+                        device_allocated_mb=device_allocated_mb(),
+                    )
+                )
+                yield result
+                start = time.perf_counter()
+        finally:
+            self.stop()
+
+    def report(self) -> dict:
+        """Return all measurements as a JSON-serializable dict."""
+        return dict(
+            stages=self.stages,
+            frames=self.frame_records,
+            peak_rss_mb=max(self.sampler.peak_mb, max((s["peak_rss_mb"] for s in self.stages.values()), default=0.0)),
+            device_peak_mb=torch.cuda.max_memory_allocated() / MB if torch.cuda.is_available() else None,
+        )
+
+    def summary(self) -> str:
+        """Render per-stage measurements as a text table."""
+
+        def fmt(value):
+            return "-" if value is None else f"{value:.1f}"
+
+        lines = [f"{'stage':<20} {'calls':>6} {'avg ms':>9} {'peak RSS':>9} {'RSS +':>8} {'dev peak':>9} {'dev +':>8}"]
+        for name, s in self.stages.items():
+            lines.append(
+                f"{name:<20} {s['calls']:>6} {s['total_ms'] / s['calls']:>9.1f} {s['peak_rss_mb']:>9.1f} "
+                f"{s['max_rss_growth_mb']:>8.1f} {fmt(s['device_peak_mb']):>9} {fmt(s['max_device_growth_mb']):>8}"
+            )
+        if self.frame_records:
+            rss = [f["rss_mb"] for f in self.frame_records]
+            lines.append(f"frames: {len(rss)}, RSS first/last/max: {rss[0]:.1f}/{rss[-1]:.1f}/{max(rss):.1f} MB")
+        return "\n".join(lines)
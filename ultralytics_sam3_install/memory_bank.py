@@ -0,0 +1,224 @@
+"""
+Memory-Bank Policy
+Bounds the per-frame outputs that SAM3 video predictors keep in
+``inference_state``, so hour-long streams run at flat latency and memory.
+
+The trackers store every frame's outputs (memory features, object pointers,
+mask logits) in ``cond_frame_outputs`` (prompted / keyframes) and
+``non_cond_frame_outputs`` dicts, globally and per object, and never drop
+them. Memory attention only reads the last ``num_maskmem`` frames and
+``max_obj_ptrs_in_encoder`` object pointers, but conditioning frames are all
+attended to, and everything stays resident. After each frame the policy:
+
+- keeps the last ``keep_last`` non-conditioning frames (clamped to what
+  memory attention reads, so the default changes no prediction)
+- keeps at most ``keyframes`` conditioning frames: the first (prompt) frame
+  and the most confident others by object score
+- caps every per-object bank at ``max_per_object`` entries
+- runs every ``prune_every`` frames
+
+Policies come from predictor overrides (``memory_keep_last``,
+``memory_keyframes``, ``memory_prune_every``, ``memory_max_per_object``),
+which are popped before ultralytics validates the overrides.
+
+Example:
+    overrides = dict(model="sam3.pt", memory_keep_last=16, memory_keyframes=4)
+    policy = MemoryBankPolicy.pop_from(overrides)
+    predictor = SAM3VideoPredictor(overrides=overrides)
+    policy.attach(predictor)
+    ...
+    print(policy.summary())
+"""
+
+import time
+from dataclasses import dataclass, field
+from typing import Any, Optional
+
+import torch
+
+# Override key -> policy field
+OVERRIDE_KEYS = {
+    "memory_keep_last": "keep_last",
+    "memory_keyframes": "keyframes",
+    "memory_prune_every": "prune_every",
+    "memory_max_per_object": "max_per_object",
+}
+BANK_KEYS = ("cond_frame_outputs", "non_cond_frame_outputs")
+
+
+def find_banks(state: Any) -> list[dict]:
+    """All dicts in a tracker state holding ``cond_frame_outputs`` / ``non_cond_frame_outputs``."""
+    banks, stack, seen = [], [state], set()
+    while stack:
+        obj = stack.pop()
+        if id(obj) in seen:
+            continue
+        seen.add(id(obj))
+        if isinstance(obj, dict):
+            if all(isinstance(obj.get(k), dict) for k in BANK_KEYS):
+                banks.append(obj)
+                continue
+            stack.extend(v for v in obj.values() if isinstance(v, (dict, list, tuple)))
+        elif isinstance(obj, (list, tuple)):
+            stack.extend(v for v in obj if isinstance(v, (dict, list, tuple)))
+    return banks
+
+
+def tensor_bytes(obj: Any, seen: Optional[set] = None) -> int:
+    """Bytes of the distinct tensors reachable from ``obj``."""
+    seen = set() if seen is None else seen
+    if isinstance(obj, torch.Tensor):
+        key = (obj.device, obj.untyped_storage().data_ptr())
+        if key in seen:
+            return 0
+        seen.add(key)
+        return obj.untyped_storage().nbytes()
+    if isinstance(obj, dict):
+        return sum(tensor_bytes(v, seen) for v in obj.values())
+    if isinstance(obj, (list, tuple)):
+        return sum(tensor_bytes(v, seen) for v in obj)
+    return 0
+
+
+def confidence(output: Any) -> float:
+    """Object score of one frame output (higher is more confident)."""
+    score = output.get("object_score_logits") if isinstance(output, dict) else None
+    return float(score.float().mean()) if isinstance(score, torch.Tensor) and score.numel() else 0.0
+
+
+@dataclass
+class MemoryBankPolicy:
+    """
+    Pruning rules for video tracker memory banks.
+
+    Args:
+        keep_last: Non-conditioning frames kept (None: unbounded)
+        keyframes: Conditioning frames kept (None: unbounded)
+        prune_every: Frames between pruning passes
+        max_per_object: Entries kept in each per-object bank (None: unbounded)
+
+    Attributes:
+        history: Per-frame records (frame, entries, bank_mb, frame_ms, pruned)
+    """
+
+    keep_last: Optional[int] = 16
+    keyframes: Optional[int] = 8
+    prune_every: int = 10
+    max_per_object: Optional[int] = None
+    history: list = field(default_factory=list, repr=False)
+
+    @classmethod
+    def pop_from(cls, overrides: dict) -> Optional["MemoryBankPolicy"]:
+        """Remove ``memory_*`` keys from ``overrides`` and build a policy from them (None if absent)."""
+        values = {name: overrides.pop(key) for key, name in OVERRIDE_KEYS.items() if key in overrides}
+        return cls(**values) if values else None
+
+    def attach(self, predictor: Any) -> "MemoryBankPolicy":
+        """Prune and record after every frame the predictor yields."""
+        self.predictor = predictor
+        self.history.clear()
+        self._last = None
+        predictor.add_callback("on_predict_batch_end", lambda p: self.step())
+        return self
+
+    def _limits(self) -> tuple[Optional[int], Optional[int]]:
+        model = getattr(self.predictor, "model", None)
+        needed = max(getattr(model, "num_maskmem", 7), getattr(model, "max_obj_ptrs_in_encoder", 16))
+        keep_last = None if self.keep_last is None else max(self.keep_last, needed)
+        keyframes = None if self.keyframes is None else max(self.keyframes, 1)
+        return keep_last, keyframes
+
+    def prune(self, state: Any, frame: int) -> int:
+        """
+        Apply the policy to every bank in ``state``.
+
+        Args:
+            state: Tracker ``inference_state``
+            frame: Index of the latest tracked frame (``dataset.frame``)
+
+        Returns:
+            Number of frame entries removed
+        """
+        keep_last, keyframes = self._limits()
+        removed = 0
+        for bank in find_banks(state):
+            cond, non_cond = bank["cond_frame_outputs"], bank["non_cond_frame_outputs"]
+            drop_non_cond = [t for t in non_cond if keep_last is not None and t <= frame - keep_last]
+            drop_cond = []
+            if keyframes is not None and len(cond) > keyframes:
+                first = min(cond)
+                ranked = sorted((t for t in cond if t != first), key=lambda t: confidence(cond[t]), reverse=True)
+                drop_cond = ranked[keyframes - 1 :]
+            if self.max_per_object is not None and bank is not state.get("output_dict"):
+                excess = len(cond) - len(drop_cond) + len(non_cond) - len(drop_non_cond) - self.max_per_object
+                if excess > 0:
+                    kept = sorted(t for t in non_cond if t not in set(drop_non_cond))
+                    drop_non_cond += kept[:excess]
+            for t in drop_non_cond:
+                non_cond.pop(t, None)
+            for t in drop_cond:
+                cond.pop(t, None)
+            if drop_cond and bank is state.get("output_dict"):
+                self._forget_inputs(state, drop_cond)
+            removed += len(drop_non_cond) + len(drop_cond)
+        tracked = state.get("frames_already_tracked") if isinstance(state, dict) else None
+        if isinstance(tracked, dict) and keep_last is not None:
+            for t in [t for t in tracked if t <= frame - keep_last]:
+                del tracked[t]
+        return removed
+
+    @staticmethod
+    def _forget_inputs(state: dict, frames: list) -> None:
+        """Drop the prompts of pruned conditioning frames; the predictor checks they match the consolidated frames."""
+        consolidated = state.get("consolidated_frame_inds", {}).get("cond_frame_outputs")
+        for t in frames:
+            if consolidated is not None:
+                consolidated.discard(t)
+            for key in ("point_inputs_per_obj", "mask_inputs_per_obj"):
+                for inputs in state.get(key, {}).values():
+                    inputs.pop(t, None)
+
+    def step(self) -> None:
+        """Callback body: prune on schedule and record bank size and frame cost."""
+        # live_objects.LiveObjects tracks objects in several states
+        states = getattr(self.predictor, "tracker_states", None) or [getattr(self.predictor, "inference_state", None)]
+        states = [s for s in states if s]
+        now = time.perf_counter()
+        frame_ms = (now - self._last) * 1000 if self._last is not None else None
+        self._last = now
+        if not states:
+            return
+        dataset = getattr(self.predictor, "dataset", None)
+        frame = int(getattr(dataset, "frame", len(self.history) + 1))  # the key the predictor stores outputs under
+        pruned = sum(self.prune(s, frame) for s in states) if frame % max(1, self.prune_every) == 0 else 0
+        banks = find_banks(states)
+        self.history.append(
+            dict(
+                frame=frame,
+                entries=sum(len(b[k]) for b in banks for k in BANK_KEYS),
+                bank_mb=tensor_bytes(banks) / 2**20,
+                frame_ms=frame_ms,
+                pruned=pruned,
+            )
+        )
+
+    def summary(self, window: int = 100) -> dict:
+        """First and last ``window`` frames' mean cost and the bank size, to check latency stays flat."""
+        if not self.history:
+            return {}
+
+        def mean(records: list, key: str) -> Optional[float]:
+            values = [r[key] for r in records if r[key] is not None]
+            return sum(values) / len(values) if values else None
+
+        head, tail = self.history[:window], self.history[-window:]
+        return dict(
+            frames=len(self.history),
+            first_frame_ms=mean(head, "frame_ms"),
+            last_frame_ms=mean(tail, "frame_ms"),
+            max_entries=max(r["entries"] for r in self.history),
+            last_entries=self.history[-1]["entries"],
+            max_bank_mb=max(r["bank_mb"] for r in self.history),
+            last_bank_mb=self.history[-1]["bank_mb"],
+            pruned=sum(r["pruned"] for r in self.history),
+        )
@@ -0,0 +1,157 @@
+"""
+Motion Gate
+Skips SAM3 video inference on frames where nothing moved, reusing the
+previous results, for fixed cameras that watch empty scenes most of the time.
+
+Each frame is reduced to a small blurred grayscale image (about 0.2 ms) and
+compared with either the last frame sent to the model ("diff") or a running
+average background ("background"). The frame goes to the predictor when
+enough pixels changed; after motion the gate stays open for ``hold`` frames
+so objects that stop moving are still tracked, and it never stays closed for
+more than ``max_skip`` frames so the tracker and slow scene changes are
+refreshed.
+
+Example:
+    gate = MotionGate(area_threshold=0.002)
+    source = VideoSource("corridor.mp4", imgsz=1008)
+    for result in gate.stream(predictor, source, text=["person"]):
+        ...
+    print(gate.stats())
+"""
+
+import time
+from typing import Any, Iterator
+
+import cv2
+import numpy as np
+
+from ultralytics_sam3_install.video_source import FrameFeed, VideoSource
+
+METHODS = ("diff", "background")
+
+
+class MotionGate:
+    """
+    Decide per frame whether inference is needed.
+
+    Args:
+        size: Long side of the downscaled grayscale frame the gate compares
+        pixel_threshold: Gray-level difference (0-255) that marks a pixel as changed
+        area_threshold: Fraction of changed pixels that counts as motion
+        method: "diff" (against the last inferred frame) or "background"
+            (against a running average)
+        alpha: Update rate of the running-average background
+        hold: Frames kept open after the last motion
+        max_skip: Largest number of consecutive skipped frames
+
+    Attributes:
+        frames: Frames seen
+        inferred: Frames sent to the predictor
+        skipped: Frames answered from the previous results
+        gate_seconds: Time spent in the gate itself
+        changed: Changed-pixel fraction of the latest frame
+    """
+
+    def __init__(
+        self,
+        size: int = 160,
+        pixel_threshold: int = 25,
+        area_threshold: float = 0.002,
+        method: str = "diff",
+        alpha: float = 0.05,
+        hold: int = 15,
+        max_skip: int = 150,
+    ):
+        if method not in METHODS:
+            raise ValueError(f"method must be one of {METHODS}, got {method!r}")
+        self.size = size
+        self.pixel_threshold = pixel_threshold
+        self.area_threshold = area_threshold
+        self.method = method
+        self.alpha = alpha
+        self.hold = hold
+        self.max_skip = max_skip
+        self.reference = None  # float32 image compared against
+        self.open_for = 0
+        self.since_inference = 0
+        self.frames = self.inferred = self.skipped = 0
+        self.gate_seconds = 0.0
+        self.changed = 0.0
+
+    def _small(self, frame: np.ndarray) -> np.ndarray:
+        h, w = frame.shape[:2]
+        r = self.size / max(h, w)
+        if r < 1:
+            # Bilinear is ~40x cheaper than area averaging at non-integer ratios; the blur absorbs the aliasing
+            frame = cv2.resize(frame, (max(1, round(w * r)), max(1, round(h * r))), interpolation=cv2.INTER_LINEAR)
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+        return cv2.GaussianBlur(gray, (5, 5), 0).astype(np.float32)
+
+    def __call__(self, frame: np.ndarray) -> bool:
+        """Return True when ``frame`` should be sent to the predictor."""
+        start = time.perf_counter()
+        small = self._small(frame)
+        self.frames += 1
+        if self.reference is None or self.reference.shape != small.shape:
+            self.changed, motion = 1.0, True
+            self.reference = small
+        else:
+            self.changed = float(np.count_nonzero(cv2.absdiff(small, self.reference) > self.pixel_threshold)) / small.size
+            motion = self.changed >= self.area_threshold
+            if self.method == "background":
+                cv2.accumulateWeighted(small, self.reference, self.alpha)
+        if motion:
+            self.open_for = self.hold
+        infer = motion or self.open_for > 0 or self.since_inference >= self.max_skip
+        self.open_for = max(0, self.open_for - 1)
+        if infer:
+            self.inferred += 1
+            self.since_inference = 0
+            if self.method == "diff":
+                self.reference = small
+        else:
+            self.skipped += 1
+            self.since_inference += 1
+        self.gate_seconds += time.perf_counter() - start
+        return infer
+
+    def stats(self) -> dict:
+        """Frame counts, skip rate and mean gate cost."""
+        return dict(
+            frames=self.frames,
+            inferred=self.inferred,
+            skipped=self.skipped,
+            skip_rate=self.skipped / self.frames if self.frames else 0.0,
+            gate_ms=self.gate_seconds / self.frames * 1000 if self.frames else 0.0,
+        )
+
+    def stream(self, predictor: Any, source: VideoSource, **kwargs) -> Iterator[Any]:
+        """
+        Run a video predictor on ``source``, sending only frames that pass the gate.
+
+        Skipped frames yield the previous ``Results`` again (``last_skipped``
+        is True); ``source.history[-1]`` is always the current frame. The
+        tracker sees only inferred frames, so its frame gaps grow while the
+        scene is static.
+
+        Args:
+            predictor: SAM3VideoSemanticPredictor or SAM3VideoPredictor
+            source: Video source
+            **kwargs: Prompt arguments (``text=...``)
+        """
+        from ultralytics_sam3_install import _sam3  # torch is only needed on the model branch
+
+        feed = FrameFeed(source.model_width, source.model_height)
+        self.reference, self.last_skipped = None, False  # the first frame is always inferred
+        with _sam3.frame_source(predictor, feed, source.path, source.fps, source.frames):
+            results = predictor(source=source.path, stream=True, **kwargs)
+            previous = None
+            try:
+                for frame in source:
+                    self.last_skipped = not self(frame.model)
+                    if not self.last_skipped:
+                        feed.put(frame)
+                        previous = next(results)
+                    yield previous
+            finally:
+                results.close()
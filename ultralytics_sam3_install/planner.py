@@ -0,0 +1,319 @@
+"""
+Device and Precision Planner
+Picks device, precision and thread count for a SAM3 predictor on this host.
+
+The planner probes the available hardware, times a short calibration run
+for each candidate (fp16/bf16/fp32 on GPU; fp32/bf16/int8 and several thread
+counts on CPU), caches the fastest choice per host and model, and applies it to
+predictor overrides instead of hardcoding ``half=True``.
+
+Usage:
+    python -m ultralytics_sam3_install.planner --kind semantic
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import platform
+import time
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Optional
+
+import numpy as np
+import torch
+
+from ultralytics_sam3_install.predictors import DEFAULT_BPE, DEFAULT_MODEL, build_predictor, default_overrides
+
+CACHE_PATH = Path(os.environ.get("SAM3_PLAN_CACHE", Path.home() / ".cache" / "ultralytics_sam3_install" / "plans.json"))
+# Bumped when what a plan runs changes, so cached choices are recalibrated
+PLAN_VERSION = 2
+# Predictor methods run under autocast for bf16: the image encoder (``set_image``) and prompt decoding
+AUTOCAST_METHODS = ("get_im_features", "inference")
+
+
+def _autocast(method: Callable, device_type: str) -> Callable:
+    def autocast_method(*args, **kwargs):
+        with torch.autocast(device_type, dtype=torch.bfloat16):
+            return method(*args, **kwargs)
+
+    return autocast_method
+
+
+@dataclass
+class Plan:
+    """
+    Execution settings for one predictor kind on one host.
+
+    Attributes:
+        device: ultralytics device string ("cpu", "0", ...)
+        precision: "fp32", "fp16", "bf16" or "int8" (CPU dynamic quantization)
+        threads: torch intra-op threads (CPU plans only)
+        latency_ms: Median calibration latency of this plan
+        candidates: Calibration results for every candidate tried
+    """
+
+    device: str
+    precision: str
+    threads: Optional[int] = None
+    latency_ms: Optional[float] = None
+    candidates: list = field(default_factory=list)
+
+    def overrides(self, **overrides) -> dict:
+        """Return predictor overrides implementing this plan; ``device`` and ``half`` given explicitly win."""
+        return {"device": self.device, "half": self.precision == "fp16", **overrides}
+
+    def agrees(self, **overrides) -> bool:
+        """Whether explicit ``device`` / ``half`` overrides are compatible with this plan."""
+        return str(overrides.get("device", self.device)) == self.device and bool(
+            overrides.get("half", self.precision == "fp16")
+        ) == (self.precision == "fp16")
+
+    def configure(self, predictor: Any) -> Any:
+        """
+        Apply the parts of the plan that overrides cannot express.
+
+        Sets the torch thread count, runs the image encoder and prompt decoding
+        under autocast for bf16 (ultralytics only knows fp16 via ``half``) and
+        quantizes the encoders for int8.
+
+        Returns:
+            The same predictor
+        """
+        if self.threads:
+            torch.set_num_threads(self.threads)
+        if self.precision == "bf16":
+            device_type = "cpu" if self.device == "cpu" else "cuda"
+            for name in AUTOCAST_METHODS:
+                method = getattr(predictor, name, None)
+                if callable(method):
+                    setattr(predictor, name, _autocast(method, device_type))
+        elif self.precision == "int8":
+            from ultralytics_sam3_install.quantize import quantize_predictor
+
+            quantize_predictor(predictor)
+        return predictor
+
+
+def cpu_flags() -> set:
+    """Return CPU feature flags (Linux only; empty elsewhere)."""
+    try:
+        for line in Path("/proc/cpuinfo").read_text().splitlines():
+            if line.startswith("flags"):
+                return set(line.split(":", 1)[1].split())
+    except OSError:
+        pass
+    return set()
+
+
+def probe() -> dict:
+    """Describe the devices available on this host."""
+    info = dict(
+        hostname=platform.node(),
+        processor=platform.processor() or platform.machine(),
+        cpu_count=os.cpu_count(),
+        cpu_bf16=bool(cpu_flags() & {"avx512_bf16", "amx_bf16"}),
+        torch=torch.__version__,
+        cuda=[],
+    )
+    if torch.cuda.is_available():
+        for i in range(torch.cuda.device_count()):
+            props = torch.cuda.get_device_properties(i)
+            info["cuda"].append(
+                dict(
+                    index=i,
+                    name=props.name,
+                    capability=f"{props.major}.{props.minor}",
+                    memory_gb=round(props.total_memory / 1024**3, 1),
+                    bf16=props.major >= 8,
+                )
+            )
+    return info
+
+
+def candidates(host: dict, max_candidates: Optional[int] = None, allow_int8: bool = False) -> list[Plan]:
+    """
+    List the plans worth calibrating on this host, most promising first.
+
+    Args:
+        host: Output of ``probe``
+        max_candidates: Keep only the first N candidates
+        allow_int8: Also try dynamic int8 on CPU (opt-in, trades accuracy)
+
+    Returns:
+        Candidate plans (without timings)
+    """
+    plans = []
+    if host["cuda"]:
+        gpu = host["cuda"][0]
+        plans.append(Plan(device=str(gpu["index"]), precision="fp16"))
+        if gpu["bf16"]:
+            plans.append(Plan(device=str(gpu["index"]), precision="bf16"))
+        plans.append(Plan(device=str(gpu["index"]), precision="fp32"))
+    cores = host["cpu_count"] or 1
+    thread_counts = sorted({cores, max(1, cores // 2)}, reverse=True)
+    precisions = ["fp32", "bf16"] if host["cpu_bf16"] else ["fp32"]
+    for precision in precisions:
+        for threads in thread_counts:
+            plans.append(Plan(device="cpu", precision=precision, threads=threads))
+    if allow_int8 and torch.backends.quantized.supported_engines != ["none"]:
+        plans.append(Plan(device="cpu", precision="int8", threads=cores))
+    return plans[:max_candidates] if max_candidates else plans
+
+
+def cache_key(kind: str, model: Any, host: dict) -> str:
+    """Key cached plans by host hardware, torch version, predictor kind and weights."""
+    ident = dict(
+        version=PLAN_VERSION,
+        kind=kind,
+        model=str(model),
+        host={k: host[k] for k in ("hostname", "processor", "cpu_count", "torch")},
+        cuda=[g["name"] for g in host["cuda"]],
+    )
+    return hashlib.sha1(json.dumps(ident, sort_keys=True).encode()).hexdigest()[:16]
+
+
+def calibrate(
+    plan: Plan,
+    run: Callable[[Any], None],
+    factory: Callable[[Plan], Any],
+    repeats: int = 3,
+) -> Optional[float]:
+    """
+    Time a plan with a short calibration run.
+
+    Args:
+        plan: Candidate plan
+        run: Calibration workload, called with the predictor
+        factory: Builds a configured predictor for a plan
+        repeats: Timed runs after one warmup run
+
+    Returns:
+        Median latency in ms, or None if the plan fails on this host
+    """
+    try:
+        predictor = plan.configure(factory(plan))
+        run(predictor)  # warmup, includes model build
+        times = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            run(predictor)
+            if torch.cuda.is_available():
+                torch.cuda.synchronize()
+            times.append(time.perf_counter() - start)
+        return float(np.median(times) * 1000)
+    except (RuntimeError, TypeError, NotImplementedError) as e:  # unsupported dtype/device combination
+        print(f"[planner] {plan.device}/{plan.precision}: unsupported ({e})")
+        return None
+    finally:
+        predictor = None
+        if torch.cuda.is_available():
+            torch.cuda.empty_cache()
+
+
+def default_workload(kind: str) -> Callable[[Any], None]:
+    """Return a calibration workload representative of ``kind`` (one image, one prompt)."""
+    image = np.random.default_rng(0).integers(0, 255, (480, 640, 3), dtype=np.uint8)
+
+    def run(predictor):
+        predictor.set_image(image)
+        if kind in ("semantic", "video-semantic"):
+            predictor(text=["person"], save=False)
+        else:
+            predictor(points=[[320, 240]], point_labels=[1], save=False)
+
+    return run
+
+
+def plan_for(
+    kind: str = "semantic",
+    model: Any = DEFAULT_MODEL,
+    bpe_path: Any = DEFAULT_BPE,
+    refresh: bool = False,
+    repeats: int = 3,
+    max_candidates: Optional[int] = None,
+    workload: Optional[Callable[[Any], None]] = None,
+    cache_path: Path = CACHE_PATH,
+    allow_int8: bool = False,
+) -> Plan:
+    """
+    Return the cached plan for this host, calibrating one if needed.
+
+    Args:
+        kind: Predictor kind (see ``predictors.PREDICTOR_CLASSES``)
+        model: Path to the SAM3 weights
+        bpe_path: Path to the BPE vocabulary
+        refresh: Ignore the cache and recalibrate
+        repeats: Timed calibration runs per candidate
+        max_candidates: Limit the number of candidates tried
+        workload: Calibration workload (defaults to one image + one prompt)
+        cache_path: JSON file holding plans for this host
+        allow_int8: Consider dynamic int8 on CPU
+
+    Returns:
+        Fastest working plan
+    """
+    host = probe()
+    key = cache_key(kind, model, host) + ("-int8" if allow_int8 else "")
+    cache = json.loads(cache_path.read_text()) if cache_path.exists() else {}
+    if not refresh and key in cache:
+        return Plan(**cache[key])
+
+    run = workload or default_workload(kind)
+    video_kinds = {"video": "visual", "video-semantic": "semantic"}  # calibrate on the image counterpart
+
+    def factory(plan: Plan):
+        return build_predictor(video_kinds.get(kind, kind), model, bpe_path, **plan.overrides())
+
+    results = []
+    threads = torch.get_num_threads()  # CPU candidates change it; the winner must not inherit the last one
+    try:
+        for plan in candidates(host, max_candidates, allow_int8):
+            plan.latency_ms = calibrate(plan, run, factory, repeats)
+            print(f"[planner] {plan.device}/{plan.precision}/threads={plan.threads}: {plan.latency_ms} ms")
+            if plan.latency_ms is not None:
+                results.append(plan)
+    finally:
+        torch.set_num_threads(threads)
+    if not results:
+        raise RuntimeError("No device/precision candidate could run the calibration workload")
+    best = min(results, key=lambda p: p.latency_ms)
+    best.candidates = [
+        dict(device=p.device, precision=p.precision, threads=p.threads, latency_ms=p.latency_ms) for p in results
+    ]
+    cache[key] = asdict(best)
+    cache_path.parent.mkdir(parents=True, exist_ok=True)
+    cache_path.write_text(json.dumps(cache, indent=2))
+    return best
+
+
+def planned_overrides(kind: str = "semantic", model: Any = DEFAULT_MODEL, **overrides) -> dict:
+    """
+    Return README-default overrides with device and precision taken from the plan.
+
+    Call ``plan_for(...).configure(predictor)`` as well to apply threads and bf16.
+    """
+    plan = plan_for(kind, model)
+    return default_overrides(model, **plan.overrides(**overrides))
+
+
+def main(argv: Optional[list[str]] = None) -> Plan:
+    """Calibrate (or show the cached) plan for this host."""
+    parser = argparse.ArgumentParser(description="Choose device, precision and threads for SAM3 on this host")
+    parser.add_argument("--kind", type=str, default="semantic", help="Predictor kind (default: semantic)")
+    parser.add_argument("--model", type=str, default=str(DEFAULT_MODEL), help="Path to SAM3 weights")
+    parser.add_argument("--bpe", type=str, default=str(DEFAULT_BPE), help="Path to BPE vocabulary")
+    parser.add_argument("--refresh", action="store_true", help="Recalibrate even if a plan is cached")
+    parser.add_argument("--repeats", type=int, default=3, help="Timed runs per candidate")
+    parser.add_argument("--allow-int8", action="store_true", help="Also consider dynamic int8 on CPU")
+    args = parser.parse_args(argv)
+    plan = plan_for(
+        args.kind, args.model, args.bpe, refresh=args.refresh, repeats=args.repeats, allow_int8=args.allow_int8
+    )
+    print(json.dumps(asdict(plan), indent=2))
+    return plan
+
+
+if __name__ == "__main__":
+    main()
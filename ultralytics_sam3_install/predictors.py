@@ -0,0 +1,128 @@
+"""
+Predictor Construction
+Builds the four SAM3 predictors the way the README and tests do, so every
+toolkit entry point shares the same defaults.
+"""
+
+from pathlib import Path
+from typing import Any, Optional, Union
+
+project_root = Path(__file__).parent.parent
+
+DEFAULT_MODEL = project_root / "models" / "sam3.pt"
+DEFAULT_BPE = project_root / "models" / "bpe_simple_vocab_16e6.txt.gz"
+
+# Predictor kinds and the ultralytics class backing each one
+PREDICTOR_CLASSES = {
+    "semantic": "SAM3SemanticPredictor",
+    "visual": "SAM3Predictor",
+    "video": "SAM3VideoPredictor",
+    "video-semantic": "SAM3VideoSemanticPredictor",
+}
+
+# Kinds whose constructor takes a BPE vocabulary
+TEXT_KINDS = {"semantic", "video-semantic"}
+
+
+def default_overrides(model: Union[str, Path] = DEFAULT_MODEL, **overrides) -> dict:
+    """
+    Return predictor overrides matching the README examples.
+
+    Args:
+        model: Path to the SAM3 weights
+        **overrides: Values replacing the defaults
+
+    Returns:
+        Overrides dict for a SAM3 predictor
+    """
+    return {**dict(conf=0.25, task="segment", mode="predict", model=str(model), half=True), **overrides}
+
+
+def build_predictor(
+    kind: str,
+    model: Union[str, Path] = DEFAULT_MODEL,
+    bpe_path: Union[str, Path] = DEFAULT_BPE,
+    random_init: bool = False,
+    plan: bool = False,
+    quantize: bool = False,
+    **overrides,
+) -> Any:
+    """
+    Construct a SAM3 predictor.
+
+    Args:
+        kind: One of ``PREDICTOR_CLASSES``
+        model: Path to the SAM3 weights
+        bpe_path: Path to the BPE vocabulary (text predictors only)
+        random_init: Build the architecture with random weights instead of
+            loading ``model`` (no checkpoint or Hugging Face access needed)
+        plan: Take device, precision and threads from the cached host plan
+            (see ``planner.plan_for``) instead of ``half=True``; ignored when
+            ``device`` or ``half`` is given explicitly and differs from the plan
+        quantize: Run on CPU with dynamic int8 image and text encoders
+            (see ``quantize.quantize_predictor``)
+        **overrides: Predictor overrides replacing the defaults; ``memory_*``
+            keys set a ``memory_bank.MemoryBankPolicy`` on video predictors
+
+    Returns:
+        Predictor instance
+    """
+    if kind not in PREDICTOR_CLASSES:
+        raise ValueError(f"Unknown predictor kind '{kind}', expected one of {sorted(PREDICTOR_CLASSES)}")
+    from ultralytics.models.sam import predict
+
+    cls = getattr(predict, PREDICTOR_CLASSES[kind])
+    host_plan = None
+    if plan:
+        from ultralytics_sam3_install.planner import plan_for
+
+        host_plan = plan_for(kind, model, bpe_path)
+        if host_plan.agrees(**overrides):
+            overrides = host_plan.overrides(**overrides)
+        else:
+            host_plan = None  # explicit device / half win over the plan
+    if quantize:
+        overrides.update(device="cpu", half=False)
+    from ultralytics_sam3_install.memory_bank import MemoryBankPolicy
+
+    memory_policy = MemoryBankPolicy.pop_from(overrides)
+    kwargs = dict(overrides=default_overrides(model, **overrides))
+    if kind in TEXT_KINDS:
+        kwargs["bpe_path"] = str(bpe_path)
+    predictor = cls(**kwargs)
+    if random_init:
+        predictor.setup_model(model=build_random_model(kind, bpe_path), verbose=False)
+    if host_plan is not None:
+        host_plan.configure(predictor)
+    if memory_policy is not None:
+        predictor.memory_policy = memory_policy.attach(predictor)
+    if quantize and (host_plan is None or host_plan.precision != "int8"):
+        from ultralytics_sam3_install.quantize import quantize_predictor
+
+        quantize_predictor(predictor)
+    return predictor
+
+
+def build_random_model(kind: str, bpe_path: Union[str, Path] = DEFAULT_BPE) -> Any:
+    """
+    Build a randomly initialized SAM3 model for ``kind``.
+
+    Used by benchmarks and smoke tests that must run without downloading the
+    gated checkpoint. The architecture is the full-size one (SAM3's builders
+    take no size options), so it needs as much memory and compute as the
+    real weights.
+    """
+    from ultralytics.models.sam import build_sam3
+
+    if kind == "semantic":
+        return build_sam3.build_sam3_image_model(None, str(bpe_path))
+    if kind == "video-semantic":
+        return build_sam3.build_sam3_video_model(None, str(bpe_path))
+    return build_sam3.build_interactive_sam3(None)
+
+
+def as_list(results: Optional[Any]) -> list:
+    """Normalize predictor output (None, single Results or list) to a list."""
+    if results is None:
+        return []
+    return results if isinstance(results, list) else [results]
@@ -0,0 +1,98 @@
+"""
+INT8 Quantization
+Opt-in dynamic int8 quantization of the SAM3 image and text encoders for
+CPU-only inference, plus an accuracy check against FP32 masks.
+
+Only ``nn.Linear`` layers are quantized (weights to int8, activations
+quantized on the fly), which covers the ViT and text transformer blocks where
+almost all CPU time is spent. Decoder and mask heads stay in FP32.
+"""
+
+from typing import Any, Iterable
+
+import numpy as np
+import torch
+
+from ultralytics_sam3_install import _sam3
+from ultralytics_sam3_install.mask_ops import mask_iou
+
+# Stages whose Linear layers are quantized by default
+DEFAULT_STAGES = ("image_encode", "text_encode")
+
+
+def quantize_model(model: torch.nn.Module, stages: Iterable[str] = DEFAULT_STAGES) -> list[str]:
+    """
+    Apply dynamic int8 quantization to the Linear layers of selected stages, in place.
+
+    Args:
+        model: SAM3 model on CPU in FP32
+        stages: Stage names from ``_sam3.STAGE_MODULES``
+
+    Returns:
+        Names of the stages that were quantized
+    """
+    if next(model.parameters()).device.type != "cpu":
+        raise ValueError("Dynamic int8 quantization runs on CPU only; build the predictor with device='cpu'")
+    engines = torch.backends.quantized.supported_engines
+    if "fbgemm" in engines:
+        torch.backends.quantized.engine = "fbgemm"
+    elif "qnnpack" in engines:  # ARM edge boxes
+        torch.backends.quantized.engine = "qnnpack"
+    modules = _sam3.stage_modules(model)
+    done = []
+    for stage in stages:
+        if stage in modules:
+            torch.ao.quantization.quantize_dynamic(modules[stage].float(), {torch.nn.Linear}, dtype=torch.qint8, inplace=True)
+            done.append(stage)
+    return done
+
+
+def quantize_predictor(predictor: Any, stages: Iterable[str] = DEFAULT_STAGES) -> Any:
+    """
+    Build the predictor's model if needed and quantize it.
+
+    The predictor must have been created with ``device="cpu"`` and
+    ``half=False``.
+
+    Returns:
+        The same predictor
+    """
+    if predictor.args.half:
+        raise ValueError("Quantized predictors must be built with half=False")
+    quantized = quantize_model(_sam3.get_model(predictor), stages)
+    if not quantized:
+        raise RuntimeError(f"None of the stages {list(stages)} were found in the model")
+    return predictor
+
+
+def compare_results(reference: Any, candidate: Any) -> dict:
+    """
+    Compare candidate masks against reference (FP32) masks from the same image.
+
+    Each reference mask is matched to its best-overlapping candidate mask.
+
+    Args:
+        reference: Results from the FP32 predictor
+        candidate: Results from the quantized predictor
+
+    Returns:
+        Dict with reference/candidate counts, mean and min matched IoU, and
+        recall at IoU 0.5
+    """
+
+    def masks(result):
+        if result is None or result.masks is None:
+            return np.zeros((0, 1, 1), dtype=bool)
+        return result.masks.data.cpu().numpy().astype(bool)
+
+    ref, cand = masks(reference), masks(candidate)
+    out = dict(reference=len(ref), candidate=len(cand), mean_iou=None, min_iou=None, recall50=None)
+    if len(ref) == 0:
+        out.update(mean_iou=1.0 if len(cand) == 0 else 0.0, min_iou=out["mean_iou"], recall50=1.0)
+        return out
+    if len(cand) == 0:
+        out.update(mean_iou=0.0, min_iou=0.0, recall50=0.0)
+        return out
+    best = mask_iou(ref, cand).max(1)
+    out.update(mean_iou=float(best.mean()), min_iou=float(best.min()), recall50=float((best >= 0.5).mean()))
+    return out
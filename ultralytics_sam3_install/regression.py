@@ -0,0 +1,216 @@
+"""
+Performance Regression Gate
+Records benchmark baselines and compares two runs, e.g. before and after
+bumping the ``ultralytics`` or ``sam3`` submodule pins.
+
+A metric only counts as regressed when it is worse than its relative
+tolerance AND the difference is larger than the run-to-run noise estimated
+from the repeat samples, so noisy hosts do not produce false alarms.
+
+Usage:
+    python -m ultralytics_sam3_install perf record --output baseline.json
+    python -m ultralytics_sam3_install perf record --output candidate.json
+    python -m ultralytics_sam3_install perf compare baseline.json candidate.json
+"""
+
+import argparse
+import json
+import math
+import subprocess
+import sys
+from pathlib import Path
+from typing import Optional
+
+from ultralytics_sam3_install.predictors import project_root
+
+# Relative tolerances per metric kind (fraction of the baseline value)
+DEFAULT_TOLERANCES = dict(latency=0.10, throughput=0.10, memory=0.10, startup=0.25)
+
+# Differences below these absolute floors are never reported (ms / items/s / MB)
+ABSOLUTE_FLOORS = dict(latency=1.0, throughput=0.0, memory=64.0, startup=50.0)
+
+# Metric kinds where a larger value is better
+HIGHER_IS_BETTER = {"throughput"}
+
+
+def submodule_pins() -> dict:
+    """Return the checked-out commit of each submodule."""
+    pins = {}
+    for path in sorted((project_root / "submodules").glob("*")):
+        try:
+            sha = subprocess.run(
+                ["git", "-C", str(path), "rev-parse", "HEAD"], capture_output=True, text=True, check=True
+            ).stdout.strip()
+        except (subprocess.CalledProcessError, FileNotFoundError):
+            sha = None
+        pins[path.name] = sha
+    return pins
+
+
+def extract_metrics(report: dict) -> dict[str, dict]:
+    """
+    Flatten a benchmark report into comparable metrics.
+
+    Args:
+        report: Report produced by ``benchmark.run_benchmarks``
+
+    Returns:
+        Mapping of metric name (e.g. ``text/prompt/latency``) to a dict with
+        kind, value, std and n
+    """
+    metrics = {}
+
+    def walk(node: dict, prefix: str) -> None:
+        for key, value in node.items():
+            name = f"{prefix}/{key}" if prefix else key
+            if isinstance(value, dict) and key != "latency_ms":
+                walk(value, name)
+            elif key == "latency_ms" and value.get("n"):
+                metrics[f"{prefix}/latency"] = dict(
+                    kind="latency", value=value["median"], std=value["std"], n=value["n"]
+                )
+            elif key in ("items_per_s", "frames_per_s") and value:
+                metrics[name] = dict(kind="throughput", value=value, std=None, n=None)
+            elif key in ("peak_rss_mb", "device_peak_mb") and value is not None:
+                metrics[name] = dict(kind="memory", value=value, std=None, n=None)
+            elif key in ("load_ms", "build_ms", "cold_ms") and value is not None:
+                metrics[name] = dict(kind="startup", value=value, std=None, n=None)
+
+    walk(report.get("results", {}), "")
+    # Throughput is derived from latency; carry the latency noise over relatively
+    for name, metric in metrics.items():
+        if metric["kind"] == "throughput":
+            latency = metrics.get(name.rsplit("/", 1)[0] + "/latency")
+            if latency and latency["value"]:
+                metric["std"] = metric["value"] * latency["std"] / latency["value"]
+                metric["n"] = latency["n"]
+    return metrics
+
+
+def _noise(base: dict, cand: dict, k: float) -> float:
+    """Return ``k`` standard errors of the difference, 0 when no samples are available."""
+    if not base["std"] or not cand["std"] or not base["n"] or not cand["n"]:
+        return 0.0
+    return k * math.sqrt(base["std"] ** 2 / base["n"] + cand["std"] ** 2 / cand["n"])
+
+
+def compare(
+    baseline: dict,
+    candidate: dict,
+    tolerances: Optional[dict] = None,
+    noise_k: float = 3.0,
+) -> list[dict]:
+    """
+    Compare two benchmark reports metric by metric.
+
+    Args:
+        baseline: Reference report
+        candidate: New report
+        tolerances: Relative tolerance per metric kind (see DEFAULT_TOLERANCES)
+        noise_k: Number of standard errors a difference must exceed
+
+    Returns:
+        One row per metric present in both reports, with baseline, candidate,
+        relative change and status ("ok", "improved" or "REGRESSED")
+    """
+    tolerances = {**DEFAULT_TOLERANCES, **(tolerances or {})}
+    base_metrics, cand_metrics = extract_metrics(baseline), extract_metrics(candidate)
+    rows = []
+    for name in sorted(base_metrics.keys() & cand_metrics.keys()):
+        base, cand = base_metrics[name], cand_metrics[name]
+        kind = base["kind"]
+        diff = cand["value"] - base["value"]
+        worse = -diff if kind in HIGHER_IS_BETTER else diff
+        rel = diff / base["value"] if base["value"] else 0.0
+        threshold = max(tolerances[kind] * abs(base["value"]), ABSOLUTE_FLOORS[kind], _noise(base, cand, noise_k))
+        if worse > threshold:
+            status = "REGRESSED"
+        elif -worse > threshold:
+            status = "improved"
+        else:
+            status = "ok"
+        rows.append(dict(metric=name, kind=kind, baseline=base["value"], candidate=cand["value"], change=rel, status=status))
+    return rows
+
+
+def format_table(rows: list[dict], only_changed: bool = False) -> str:
+    """Render comparison rows as a fixed-width text table."""
+    if only_changed:
+        rows = [row for row in rows if row["status"] != "ok"]
+    headers = ("metric", "kind", "baseline", "candidate", "change", "status")
+    lines = [
+        (
+            row["metric"],
+            row["kind"],
+            f"{row['baseline']:.2f}",
+            f"{row['candidate']:.2f}",
+            f"{row['change'] * 100:+.1f}%",
+            row["status"],
+        )
+        for row in rows
+    ]
+    widths = [max(len(str(c)) for c in col) for col in zip(headers, *lines)]
+    fmt = "  ".join(f"{{:<{w}}}" for w in widths)
+    out = [fmt.format(*headers), fmt.format(*("-" * w for w in widths))]
+    out += [fmt.format(*line) for line in lines]
+    return "\n".join(line.rstrip() for line in out)
+
+
+def record(argv: list[str]) -> int:
+    """Run the benchmark suite and save it as a baseline, tagged with the submodule pins."""
+    from ultralytics_sam3_install import benchmark
+
+    cfg = benchmark.parse_args(argv)
+    if not cfg.output:
+        print("Error: --output is required for 'perf record'")
+        return 2
+    report = benchmark.run_benchmarks(cfg)
+    report["submodules"] = submodule_pins()
+    Path(cfg.output).write_text(json.dumps(report, indent=2))
+    print(f"Saved baseline to: {cfg.output}")
+    return 0
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    """
+    ``perf`` command: record baselines or compare two runs.
+
+    Returns:
+        Process exit code (1 when a regression is detected)
+    """
+    argv = sys.argv[1:] if argv is None else argv
+    if argv[:1] == ["record"]:
+        return record(argv[1:])
+
+    parser = argparse.ArgumentParser(prog="perf", description="Record or compare SAM3 benchmark runs")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("record", help="Run benchmarks and save a baseline (accepts all benchmark options)")
+    cmp = sub.add_parser("compare", help="Compare a candidate run against a baseline")
+    cmp.add_argument("baseline", type=str, help="Baseline JSON report")
+    cmp.add_argument("candidate", type=str, help="Candidate JSON report")
+    for kind, tol in DEFAULT_TOLERANCES.items():
+        cmp.add_argument(f"--{kind}-tol", type=float, default=tol, help=f"Relative {kind} tolerance (default: {tol})")
+    cmp.add_argument("--noise-k", type=float, default=3.0, help="Standard errors a change must exceed (default: 3)")
+    cmp.add_argument("--all", action="store_true", help="Show unchanged metrics too")
+    args = parser.parse_args(argv)
+
+    baseline = json.loads(Path(args.baseline).read_text())
+    candidate = json.loads(Path(args.candidate).read_text())
+    tolerances = {kind: getattr(args, f"{kind}_tol") for kind in DEFAULT_TOLERANCES}
+    rows = compare(baseline, candidate, tolerances, args.noise_k)
+
+    for name in sorted(set(baseline.get("submodules", {})) | set(candidate.get("submodules", {}))):
+        old, new = baseline.get("submodules", {}).get(name), candidate.get("submodules", {}).get(name)
+        if old != new:
+            print(f"submodule {name}: {(old or '?')[:12]} -> {(new or '?')[:12]}")
+    if baseline.get("environment") != candidate.get("environment"):
+        print("Warning: runs were recorded on different environments; differences may not be comparable")
+
+    print(format_table(rows, only_changed=not args.all) if rows else "No common metrics to compare")
+    regressed = [row for row in rows if row["status"] == "REGRESSED"]
+    print(f"\n{len(rows)} metrics compared, {len(regressed)} regressed")
+    return 1 if regressed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
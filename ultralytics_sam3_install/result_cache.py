@@ -0,0 +1,420 @@
+"""
+Result Cache
+On-disk cache of SAM3 results keyed by image content and the normalized
+prompt set, so duplicate images and repeated queries skip the model.
+
+Keys combine an exact hash (of the file bytes for paths, so a hit never
+decodes the image, or of the pixel buffer for arrays) with a 64-bit
+difference hash (dHash) for near-exact duplicates such as re-encoded copies.
+The dHash is stored as four 16-bit bands; any hash within ``max_distance``
+<= 3 bits shares a band, so near lookups are indexed SQLite queries.
+
+Entries hold only boxes, scores, class names and COCO RLE masks, in one
+SQLite file (WAL mode). When the stored size exceeds ``max_bytes`` the least
+recently used entries are evicted.
+
+Example:
+    cache = ResultCache("results.sqlite", max_bytes=2 << 30)
+    cached = CachedPredictor(predictor, cache)
+    result = cached("image.jpg", text=["person", "bus"])   # model on a miss
+    result = cached("image.jpg", text=["bus", "person"])   # cache hit
+    print(cache.stats())
+"""
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Optional, Sequence, Union
+
+import cv2
+import numpy as np
+
+from ultralytics_sam3_install.mask_ops import rle_decode, rle_encode
+
+try:
+    import xxhash
+except ImportError:  # hashlib fallback (slower on large images)
+    xxhash = None
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    exact TEXT NOT NULL,
+    prompt TEXT NOT NULL,
+    height INTEGER NOT NULL,
+    width INTEGER NOT NULL,
+    band0 INTEGER, band1 INTEGER, band2 INTEGER, band3 INTEGER,
+    phash INTEGER,
+    size INTEGER NOT NULL,
+    accessed REAL NOT NULL,
+    value BLOB NOT NULL,
+    PRIMARY KEY (exact, prompt)
+);
+CREATE INDEX IF NOT EXISTS results_band0 ON results (prompt, band0);
+CREATE INDEX IF NOT EXISTS results_band1 ON results (prompt, band1);
+CREATE INDEX IF NOT EXISTS results_band2 ON results (prompt, band2);
+CREATE INDEX IF NOT EXISTS results_band3 ON results (prompt, band3);
+CREATE INDEX IF NOT EXISTS results_accessed ON results (accessed);
+"""
+# dHashes are stored signed (SQLite INTEGER is 64-bit signed)
+PHASH_MASK = (1 << 64) - 1
+
+
+def exact_hash(data: Union[bytes, np.ndarray]) -> str:
+    """Content hash of raw bytes or of an array's shape and pixels."""
+    h = xxhash.xxh3_128() if xxhash is not None else hashlib.blake2b(digest_size=16)
+    if isinstance(data, np.ndarray):
+        h.update(repr((data.shape, data.dtype.str)).encode())
+        data = np.ascontiguousarray(data)
+    h.update(memoryview(data).cast("B"))
+    return h.hexdigest()
+
+
+def dhash(image: np.ndarray) -> int:
+    """64-bit difference hash of a BGR or grayscale image."""
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if image.ndim == 3 else image
+    small = cv2.resize(gray, (9, 8), interpolation=cv2.INTER_AREA)
+    bits = (small[:, 1:] > small[:, :-1]).ravel()
+    return int(np.packbits(bits).view(">u8")[0])
+
+
+def _bands(phash: int) -> list[int]:
+    return [(phash >> (16 * i)) & 0xFFFF for i in range(4)]
+
+
+def _signed(phash: int) -> int:
+    """The unsigned 64-bit dHash as the signed value an SQLite INTEGER can hold."""
+    return phash - (1 << 64) if phash >= 1 << 63 else phash
+
+
+def normalize_prompts(text: Optional[Sequence[str]] = None, **prompts) -> str:
+    """
+    Canonical key of a prompt set.
+
+    Text prompts are case- and whitespace-normalized, de-duplicated and
+    sorted (results are stored by class name, so order does not matter).
+    Other prompt arguments (boxes, points, thresholds) are rounded and
+    serialized as given.
+    """
+    key: dict[str, Any] = {}
+    if text is not None:
+        key["text"] = sorted({" ".join(t.lower().split()) for t in ([text] if isinstance(text, str) else text)})
+    for name, value in sorted(prompts.items()):
+        if value is None:
+            continue
+        if hasattr(value, "cpu"):
+            value = value.cpu().numpy()
+        key[name] = np.round(np.asarray(value, dtype=float), 2).tolist() if not isinstance(value, str) else value
+    return json.dumps(key, sort_keys=True, separators=(",", ":"))
+
+
+@dataclass
+class CachedResult:
+    """
+    Compact detections for one image and prompt set.
+
+    Attributes:
+        shape: (height, width) of the image
+        boxes: (N, 4) xyxy boxes in source pixels
+        scores: (N,) confidences
+        labels: (N,) class names
+        rles: COCO uncompressed RLE per mask (``counts`` may be a uint32 array)
+        exact: Whether the hit matched the exact image (False for a perceptual match)
+    """
+
+    shape: tuple[int, int]
+    boxes: np.ndarray
+    scores: np.ndarray
+    labels: list[str]
+    rles: list[dict] = field(default_factory=list)
+    exact: bool = True
+
+    @property
+    def masks(self) -> np.ndarray:
+        """(N, H, W) boolean masks, decoded on access."""
+        return rle_decode(self.rles) if self.rles else np.zeros((0, *self.shape), bool)
+
+    @classmethod
+    def from_results(cls, result: Any) -> "CachedResult":
+        """Extract from an ultralytics ``Results``."""
+        shape = tuple(result.orig_shape)
+        if result.boxes is None or not len(result.boxes):
+            return cls(shape, np.zeros((0, 4), np.float32), np.zeros(0, np.float32), [])
+        cls_ids = result.boxes.cls.cpu().numpy().astype(int)
+        masks = result.masks.data.cpu().numpy() if result.masks is not None else None
+        return cls(
+            shape,
+            result.boxes.xyxy.cpu().numpy().astype(np.float32),
+            result.boxes.conf.cpu().numpy().astype(np.float32),
+            [result.names[i] for i in cls_ids.tolist()],
+            rle_encode(masks) if masks is not None else [],
+        )
+
+    def to_results(self, orig_img: Optional[np.ndarray] = None, names: Optional[Sequence[str]] = None, path: str = "") -> Any:
+        """
+        Build an ultralytics ``Results``.
+
+        Args:
+            orig_img: Image to attach (a blank image of ``shape`` when omitted)
+            names: Class names in the order of the current prompt (defaults
+                to the stored labels' first-seen order)
+            path: Source path recorded on the result
+        """
+        import torch
+        from ultralytics.engine.results import Results
+
+        names = list(names) if names is not None else list(dict.fromkeys(self.labels))
+        index = {n: i for i, n in enumerate(names)}
+        cls_ids = np.array([index.get(label, -1) for label in self.labels], np.float32)
+        data = np.concatenate([self.boxes, self.scores[:, None], cls_ids[:, None]], 1)
+        if orig_img is None:
+            orig_img = np.zeros((*self.shape, 3), np.uint8)
+        masks = torch.from_numpy(self.masks) if self.rles else None
+        return Results(orig_img, path=path, names=dict(enumerate(names)), boxes=torch.from_numpy(data), masks=masks)
+
+    def dumps(self) -> bytes:
+        """Serialize as a JSON header followed by the raw float32/uint32 arrays."""
+        lengths = [len(r["counts"]) for r in self.rles]
+        header = json.dumps(dict(shape=self.shape, labels=self.labels, lengths=lengths)).encode()
+        counts = [np.asarray(r["counts"], np.uint32) for r in self.rles]
+        arrays = [self.boxes.astype(np.float32), self.scores.astype(np.float32), *counts]
+        return b"".join([len(header).to_bytes(4, "little"), header, *(a.tobytes() for a in arrays)])
+
+    @classmethod
+    def loads(cls, blob: bytes, exact: bool = True) -> "CachedResult":
+        """Inverse of ``dumps``; RLE counts are returned as uint32 arrays (no copies)."""
+        size = int.from_bytes(blob[:4], "little")
+        meta = json.loads(blob[4 : 4 + size])
+        shape, n = tuple(meta["shape"]), len(meta["labels"])
+        data = np.frombuffer(blob, np.float32, 5 * n, 4 + size)
+        counts = np.frombuffer(blob, np.uint32, sum(meta["lengths"]), 4 + size + 20 * n)
+        splits = np.cumsum(meta["lengths"])[:-1]
+        rles = [dict(size=list(shape), counts=c) for c in np.split(counts, splits)] if meta["lengths"] else []
+        return cls(shape, data[: 4 * n].reshape(n, 4), data[4 * n :], meta["labels"], rles, exact)
+
+
+class ResultCache:
+    """
+    SQLite-backed result store with exact and perceptual lookup.
+
+    Args:
+        path: SQLite file (created if missing)
+        max_bytes: Stored result size above which least recently used entries are evicted
+        max_distance: Largest dHash Hamming distance accepted as a near duplicate
+            (0 disables perceptual matching; at most 3)
+        namespace: Extra key component shared by all entries (``CachedPredictor``
+            adds the model fingerprint and confidence threshold itself)
+
+    Attributes:
+        hits: Exact hits
+        near_hits: Perceptual hits
+        misses: Lookups that found nothing
+    """
+
+    def __init__(self, path: Union[str, Path], max_bytes: int = 1 << 30, max_distance: int = 2, namespace: str = ""):
+        if not 0 <= max_distance <= 3:
+            raise ValueError("max_distance must be between 0 and 3 (band index guarantees)")
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.max_distance = max_distance
+        self.namespace = namespace
+        self.db = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.executescript(SCHEMA)
+        self.lock = threading.Lock()
+        self.hits = self.near_hits = self.misses = 0
+        self.total_bytes = self.db.execute("SELECT COALESCE(SUM(size), 0) FROM results").fetchone()[0]
+
+    def _prompt_key(self, prompts: dict, scope: str = "") -> str:
+        return f"{self.namespace}|{scope}|{normalize_prompts(**prompts)}"
+
+    def get(self, image: Union[str, Path, np.ndarray], **prompts) -> Optional[CachedResult]:
+        """
+        Look up the result of ``prompts`` on ``image``.
+
+        Args:
+            image: Image path or BGR array
+            **prompts: Prompt arguments as passed to the predictor (``text=...``)
+
+        Returns:
+            Cached result, or None on a miss
+        """
+        return self.lookup(ImageKey(image), self._prompt_key(prompts))
+
+    def lookup(self, key: "ImageKey", prompt_key: str) -> Optional[CachedResult]:
+        """``get`` with a precomputed ``ImageKey`` and prompt key."""
+        with self.lock:
+            row = self.db.execute(
+                "SELECT value, rowid FROM results WHERE exact = ? AND prompt = ?", (key.exact, prompt_key)
+            ).fetchone()
+            exact = row is not None
+            if row is None and self.max_distance:
+                row = self._near(key, prompt_key)
+            if row is None:
+                self.misses += 1
+                return None
+            self.db.execute("UPDATE results SET accessed = ? WHERE rowid = ?", (time.time(), row[1]))
+            if exact:
+                self.hits += 1
+            else:
+                self.near_hits += 1
+        return CachedResult.loads(row[0], exact)
+
+    def _near(self, key: "ImageKey", prompt_key: str) -> Optional[tuple]:
+        h, w = key.shape
+        b = _bands(key.phash)
+        rows = self.db.execute(
+            "SELECT value, rowid, phash FROM results WHERE prompt = ? AND height = ? AND width = ? AND "
+            "(band0 = ? OR band1 = ? OR band2 = ? OR band3 = ?)",
+            (prompt_key, h, w, *b),
+        ).fetchall()
+        # stored hashes are signed; the mask restores the unsigned bits
+        best = min(rows, key=lambda r: bin((r[2] & PHASH_MASK) ^ key.phash).count("1"), default=None)
+        if best is not None and bin((best[2] & PHASH_MASK) ^ key.phash).count("1") <= self.max_distance:
+            return best[:2]
+        return None
+
+    def put(self, image: Union[str, Path, np.ndarray, "ImageKey"], result: Union[CachedResult, Any], **prompts) -> None:
+        """Store ``result`` (a ``CachedResult`` or ultralytics ``Results``) for ``prompts`` on ``image``."""
+        self.store(image if isinstance(image, ImageKey) else ImageKey(image), self._prompt_key(prompts), result)
+
+    def store(self, key: "ImageKey", prompt_key: str, result: Union[CachedResult, Any]) -> None:
+        """``put`` with a precomputed ``ImageKey`` and prompt key."""
+        if not isinstance(result, CachedResult):
+            result = CachedResult.from_results(result)
+        blob = result.dumps()
+        h, w = key.shape
+        with self.lock:
+            old = self.db.execute(
+                "SELECT size FROM results WHERE exact = ? AND prompt = ?", (key.exact, prompt_key)
+            ).fetchone()
+            self.db.execute(
+                "INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (key.exact, prompt_key, h, w, *_bands(key.phash), _signed(key.phash), len(blob), time.time(), blob),
+            )
+            self.total_bytes += len(blob) - (old[0] if old else 0)
+            if self.total_bytes > self.max_bytes:
+                self._evict()
+
+    def _evict(self) -> None:
+        """Drop least recently used entries until the store is at 90% of ``max_bytes``."""
+        target = self.max_bytes * 0.9
+        for rowid, size in self.db.execute("SELECT rowid, size FROM results ORDER BY accessed").fetchall():
+            if self.total_bytes <= target:
+                break
+            self.db.execute("DELETE FROM results WHERE rowid = ?", (rowid,))
+            self.total_bytes -= size
+
+    def __len__(self) -> int:
+        return self.db.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+
+    def stats(self) -> dict:
+        """Hit/miss counters, entry count and stored bytes."""
+        lookups = self.hits + self.near_hits + self.misses
+        return dict(
+            entries=len(self),
+            bytes=self.total_bytes,
+            hits=self.hits,
+            near_hits=self.near_hits,
+            misses=self.misses,
+            hit_rate=(self.hits + self.near_hits) / lookups if lookups else 0.0,
+        )
+
+    def clear(self) -> None:
+        with self.lock:
+            self.db.execute("DELETE FROM results")
+            self.total_bytes = 0
+
+    def close(self) -> None:
+        self.db.close()
+
+    def __enter__(self) -> "ResultCache":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+class ImageKey:
+    """
+    Exact and perceptual hash of one image.
+
+    For paths the exact hash covers the file bytes; the image is only decoded
+    (for the dHash and shape) when ``image``, ``phash`` or ``shape`` is first
+    used, i.e. never on an exact cache hit.
+    """
+
+    def __init__(self, image: Union[str, Path, np.ndarray]):
+        self.source = image
+        if isinstance(image, np.ndarray):
+            self._image: Optional[np.ndarray] = image
+            self.exact = exact_hash(image)
+        else:
+            self._image = None
+            self.exact = exact_hash(Path(image).read_bytes())
+        self._phash: Optional[int] = None
+
+    @property
+    def image(self) -> np.ndarray:
+        if self._image is None:
+            self._image = cv2.imread(str(self.source))
+            if self._image is None:
+                raise FileNotFoundError(f"Could not read image: {self.source}")
+        return self._image
+
+    @property
+    def phash(self) -> int:
+        if self._phash is None:
+            self._phash = dhash(self.image)
+        return self._phash
+
+    @property
+    def shape(self) -> tuple[int, int]:
+        return tuple(self.image.shape[:2])
+
+
+class CachedPredictor:
+    """
+    SAM3SemanticPredictor front end that answers repeated queries from a ``ResultCache``.
+
+    Args:
+        predictor: SAM3SemanticPredictor
+        cache: Result cache
+        attach_image: Decode image paths on a hit so the returned ``Results``
+            can be plotted (False keeps hits decode-free, with a blank ``orig_img``)
+
+    Entries are scoped to the predictor's weights and confidence threshold,
+    so one cache file can serve several models.
+    """
+
+    def __init__(self, predictor: Any, cache: ResultCache, attach_image: bool = True):
+        from ultralytics_sam3_install import _sam3  # torch is only needed with a model
+
+        self.predictor = predictor
+        self.cache = cache
+        self.attach_image = attach_image
+        self.scope = f"{_sam3.model_fingerprint(predictor)}|conf={predictor.args.conf}"
+
+    def __call__(self, image: Union[str, Path, np.ndarray], text: Optional[Sequence[str]] = None, **prompts) -> Any:
+        """
+        Return a ``Results`` for ``image``, running the model only on a cache miss.
+
+        Class indices follow the order of ``text`` for hits and misses alike.
+        """
+        key = ImageKey(image)
+        prompt_key = self.cache._prompt_key(dict(text=text, **prompts), self.scope)
+        names = None if text is None else ([text] if isinstance(text, str) else list(text))
+        path = "" if isinstance(image, np.ndarray) else str(image)
+        hit = self.cache.lookup(key, prompt_key)
+        if hit is not None:
+            return hit.to_results(key.image if self.attach_image else key._image, names, path)
+        self.predictor.set_image(key.image)
+        results = self.predictor(text=text, save=False, **prompts) if text is not None else self.predictor(save=False, **prompts)
+        result = results[0] if isinstance(results, list) else results
+        self.cache.store(key, prompt_key, result)
+        return result
@@ -0,0 +1,283 @@
+"""
+Exported Graph Runtime
+Serves text-prompted SAM3 segmentation from graphs written by the ``export``
+command, without importing ultralytics or sam3.
+
+Workers only load torch (or onnxruntime for ONNX artifacts), the three traced
+graphs and the BPE vocabulary, so startup time and resident memory are a
+fraction of the full predictor's. ``ExportedPredictor`` mirrors the
+``SAM3SemanticPredictor`` calls used in this repo: ``set_image``,
+``reset_image`` and ``predictor(source=..., text=[...])`` returning results
+with ``boxes``, ``masks`` and ``plot()``.
+
+Example:
+    predictor = ExportedPredictor("exported/")
+    predictor.set_image("image.jpg")
+    results = predictor(text=["person", "bus"])
+"""
+
+import json
+from dataclasses import dataclass, field
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any, Iterator, Optional, Union
+
+import cv2
+import numpy as np
+import torch
+import torch.nn.functional as F
+
+from ultralytics_sam3_install import _sam3
+from ultralytics_sam3_install.tokenizer import BPETokenizer
+
+MANIFEST = "manifest.json"
+
+
+def resize_image(image: np.ndarray, shape: tuple[int, int], mode: str = "letterbox", pad: int = 114) -> np.ndarray:
+    """
+    Resize a BGR image to the model input shape.
+
+    Args:
+        image: BGR uint8 image
+        shape: (height, width) of the model input
+        mode: "letterbox" keeps the aspect ratio and pads bottom/right (ultralytics
+            SAM predictors do not center), "stretch" resizes to ``shape`` directly
+        pad: Fill value of the letterbox padding
+
+    Returns:
+        Resized BGR uint8 image
+    """
+    h, w = image.shape[:2]
+    if mode == "stretch":
+        return cv2.resize(image, (shape[1], shape[0]), interpolation=cv2.INTER_LINEAR)
+    r = min(shape[0] / h, shape[1] / w)
+    new_h, new_w = round(h * r), round(w * r)
+    out = np.full((*shape, 3), pad, dtype=np.uint8)
+    out[:new_h, :new_w] = cv2.resize(image, (new_w, new_h), interpolation=cv2.INTER_LINEAR)
+    return out
+
+
+class Graph:
+    """
+    One exported stage: a TorchScript module or an ONNX Runtime session.
+
+    Both take and return flat tuples of tensors.
+    """
+
+    def __init__(self, path: Union[str, Path], device: torch.device):
+        self.path = Path(path)
+        self.device = device
+        if self.path.suffix == ".onnx":
+            import onnxruntime
+
+            providers = ["CPUExecutionProvider"]
+            if device.type == "cuda":
+                providers.insert(0, "CUDAExecutionProvider")
+            self.session = onnxruntime.InferenceSession(str(self.path), providers=providers)
+            self.input_names = [i.name for i in self.session.get_inputs()]
+            self.module = None
+        else:
+            self.module = torch.jit.load(str(self.path), map_location=device).eval()
+
+    @torch.inference_mode()
+    def __call__(self, *inputs: torch.Tensor) -> tuple[torch.Tensor, ...]:
+        if self.module is not None:
+            out = self.module(*(x.to(self.device) for x in inputs))
+            return out if isinstance(out, tuple) else (out,)
+        feeds = {name: x.cpu().numpy() for name, x in zip(self.input_names, inputs)}
+        return tuple(torch.from_numpy(y).to(self.device) for y in self.session.run(None, feeds))
+
+
+@dataclass
+class ExportedResults:
+    """
+    Detections for one image, laid out like ultralytics ``Results``.
+
+    ``boxes.xyxy``, ``boxes.conf``, ``boxes.cls``, ``boxes.data`` (N, 6) and
+    ``masks.data`` (N, H, W) are tensors on the runtime device.
+    """
+
+    orig_img: np.ndarray
+    names: dict[int, str]
+    boxes: Any = None
+    masks: Any = None
+    speed: dict = field(default_factory=dict)
+
+    @property
+    def orig_shape(self) -> tuple[int, int]:
+        return self.orig_img.shape[:2]
+
+    def __len__(self) -> int:
+        return 0 if self.boxes is None else len(self.boxes.data)
+
+    def plot(self, alpha: float = 0.5) -> np.ndarray:
+        """Return a BGR image with masks, boxes and labels drawn."""
+        im = self.orig_img.copy()
+        if not len(self):
+            return im
+        rng = np.random.default_rng(0)
+        colors = rng.integers(64, 255, (max(self.names) + 1, 3), dtype=np.uint8)
+        masks = self.masks.data.cpu().numpy()
+        for mask, (x1, y1, x2, y2, conf, cls) in zip(masks, self.boxes.data.cpu().numpy()):
+            color = colors[int(cls)]
+            im[mask] = (im[mask] * (1 - alpha) + color * alpha).astype(np.uint8)
+            c = tuple(int(v) for v in color)
+            cv2.rectangle(im, (int(x1), int(y1)), (int(x2), int(y2)), c, 2)
+            cv2.putText(im, f"{self.names[int(cls)]} {conf:.2f}", (int(x1), max(int(y1) - 4, 10)),
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.5, c, 1, cv2.LINE_AA)
+        return im
+
+
+def masks_to_boxes(masks: torch.Tensor) -> torch.Tensor:
+    """Return (N, 4) xyxy boxes enclosing (N, H, W) boolean masks (zeros for empty masks)."""
+    if not len(masks):
+        return torch.zeros(0, 4, device=masks.device)
+    h, w = masks.shape[-2:]
+    cols, rows = masks.any(1), masks.any(2)
+    x1 = cols.float().argmax(1)
+    x2 = w - 1 - cols.flip(1).float().argmax(1)
+    y1 = rows.float().argmax(1)
+    y2 = h - 1 - rows.flip(1).float().argmax(1)
+    boxes = torch.stack([x1, y1, x2 + 1, y2 + 1], 1).float()
+    return boxes * masks.flatten(1).any(1, keepdim=True)
+
+
+class ExportedPredictor:
+    """
+    Text-prompted SAM3 segmentation from exported graphs.
+
+    Args:
+        path: Directory written by ``python -m ultralytics_sam3_install export``
+        conf: Confidence threshold
+        device: torch device for TorchScript graphs ("cpu", "cuda:0", ...)
+        text_cache_size: Number of encoded prompts kept in memory
+        manifest: Manifest to use instead of ``path / manifest.json`` (used by
+            export to check a manifest before writing it)
+    """
+
+    def __init__(
+        self,
+        path: Union[str, Path],
+        conf: float = 0.25,
+        device: str = "cpu",
+        text_cache_size: int = 256,
+        manifest: Optional[dict] = None,
+    ):
+        self.path = Path(path)
+        self.manifest = manifest if manifest is not None else json.loads((self.path / MANIFEST).read_text())
+        self.conf = conf
+        self.device = torch.device(device)
+        graphs = self.manifest["graphs"]
+        self.image_encoder = Graph(self.path / graphs["image_encoder"], self.device)
+        self.text_encoder = Graph(self.path / graphs["text_encoder"], self.device)
+        self.mask_decoder = Graph(self.path / graphs["mask_decoder"], self.device)
+        self.tokenizer = BPETokenizer(self.path / self.manifest["bpe"], self.manifest["context_length"])
+        pre = self.manifest["preprocess"]
+        self.mean = torch.tensor(pre["mean"], dtype=torch.float32).view(1, 3, 1, 1)
+        self.std = torch.tensor(pre["std"], dtype=torch.float32).view(1, 3, 1, 1)
+        self.text_cache_size = text_cache_size
+        self._text_cache: dict[str, tuple] = {}
+        self.features = None
+        self.orig_img = None
+
+    def preprocess(self, image: np.ndarray) -> torch.Tensor:
+        """Resize and normalize a BGR image into the (1, 3, H, W) image encoder input."""
+        pre = self.manifest["preprocess"]
+        im = resize_image(image, tuple(pre["shape"]), pre["resize"], pre["pad"])
+        if pre["order"] == "rgb":
+            im = im[..., ::-1]
+        x = torch.from_numpy(np.ascontiguousarray(im.transpose(2, 0, 1)))[None].float()
+        return (x - self.mean) / self.std
+
+    def set_image(self, image: Union[str, Path, np.ndarray]) -> None:
+        """Run the image encoder once; following calls reuse the features."""
+        self.orig_img = _sam3.load_image(image)
+        self.features = self.image_encoder(self.preprocess(self.orig_img))
+
+    def reset_image(self) -> None:
+        """Drop the cached image and features."""
+        self.features = None
+        self.orig_img = None
+
+    def encode_text(self, prompt: str) -> tuple[torch.Tensor, ...]:
+        """Return text encoder outputs for one prompt, cached per prompt string."""
+        if prompt not in self._text_cache:
+            if len(self._text_cache) >= self.text_cache_size:
+                self._text_cache.pop(next(iter(self._text_cache)))
+            self._text_cache[prompt] = self.text_encoder(torch.from_numpy(self.tokenizer([prompt])))
+        return self._text_cache[prompt]
+
+    def decode(self, prompt: str) -> tuple[torch.Tensor, torch.Tensor]:
+        """
+        Run the mask decoder for one prompt on the cached image features.
+
+        Returns:
+            Tuple of (Q, h, w) mask logits (shifted so 0 is the threshold) and
+            (Q,) scores for every decoder query
+        """
+        out = self.mask_decoder(*self.features, *self.encode_text(prompt))
+        spec = self.manifest["outputs"]
+        logits = out[spec["masks"]].float()
+        logits = logits.reshape(-1, *logits.shape[-2:]) - spec["mask_threshold"]
+        scores = out[spec["scores"]].float().reshape(len(logits), -1)[:, spec["score_column"]]
+        if spec["score_logits"]:
+            scores = scores.sigmoid()
+        return logits, scores
+
+    def predict_image(self, text: list[str]) -> ExportedResults:
+        """Segment every prompt in ``text`` on the image set by ``set_image``."""
+        if self.features is None:
+            raise RuntimeError("Call set_image() or pass source= before predicting")
+        h, w = self.orig_img.shape[:2]
+        all_masks, all_scores, all_cls = [], [], []
+        for cls, prompt in enumerate(text):
+            logits, scores = self.decode(prompt)
+            keep = scores > self.conf
+            logits, scores = logits[keep], scores[keep]
+            if self.manifest["preprocess"]["resize"] == "letterbox":
+                shape = self.manifest["preprocess"]["shape"]
+                masks = _sam3.masks_to_source(logits[:, None], (h, w), shape[0])[:, 0]
+            else:
+                masks = F.interpolate(logits[:, None], (h, w), mode="bilinear", align_corners=False)[:, 0] > 0
+            all_masks.append(masks)
+            all_scores.append(scores)
+            all_cls.append(torch.full_like(scores, cls))
+        masks = torch.cat(all_masks) if all_masks else torch.zeros(0, h, w, dtype=torch.bool)
+        scores = torch.cat(all_scores) if all_scores else torch.zeros(0)
+        cls = torch.cat(all_cls) if all_cls else torch.zeros(0)
+        xyxy = masks_to_boxes(masks)
+        data = torch.cat([xyxy, scores[:, None], cls[:, None]], 1)
+        return ExportedResults(
+            orig_img=self.orig_img,
+            names=dict(enumerate(text)),
+            boxes=SimpleNamespace(data=data, xyxy=xyxy, conf=scores, cls=cls),
+            masks=SimpleNamespace(data=masks),
+        )
+
+    def stream_inference(self, sources: list, text: list[str]) -> Iterator[ExportedResults]:
+        for source in sources:
+            if source is not None:
+                self.set_image(source)
+            yield self.predict_image(text)
+
+    def __call__(
+        self,
+        source: Optional[Any] = None,
+        text: Optional[list[str]] = None,
+        stream: bool = False,
+        **kwargs,
+    ) -> Union[list[ExportedResults], Iterator[ExportedResults]]:
+        """
+        Segment text prompts on ``source`` (an image, a list of images, or the image set by ``set_image``).
+
+        Only text prompts are exported; ``save`` and other display arguments are ignored.
+        """
+        unsupported = [k for k in ("bboxes", "points", "labels", "masks") if kwargs.get(k) is not None]
+        if unsupported:
+            raise NotImplementedError(f"Exported graphs serve text prompts only, got {unsupported}")
+        if not text:
+            raise ValueError("ExportedPredictor needs text prompts")
+        text = [text] if isinstance(text, str) else list(text)
+        sources = source if isinstance(source, (list, tuple)) else [source]
+        results = self.stream_inference(sources, text)
+        return results if stream else list(results)
@@ -0,0 +1,279 @@
+"""
+Shared-Memory Ring Buffer
+Moves frames (and returned masks) between processes without pickling pixel
+data.
+
+A ``SharedRing`` is a fixed number of equally sized slots in one
+``multiprocessing.shared_memory`` block. Producers take a free slot (blocking
+when every slot is in use, which is the backpressure), write or decode into it
+in place, and publish it with a small metadata dict. Consumers receive
+zero-copy numpy views and hand slots back for reuse. Only slot indices and
+metadata go through the queues.
+
+Example:
+    ring = SharedRing.create(slots=8, slot_bytes=1080 * 1920 * 3)
+    # decoder process
+    ring.put(frame, frame=i)
+    ring.close_writer(consumers=2)
+    # worker process (ring passed as a Process argument)
+    for item in ring.items():
+        with item:
+            predictor(source=item.array, ...)
+    ring.unlink()  # owner, after all processes are done
+"""
+
+import multiprocessing as mp
+import sys
+import time
+from dataclasses import dataclass, field
+from multiprocessing import shared_memory
+from queue import Empty
+from typing import Any, Iterator, Optional
+
+import numpy as np
+
+ALIGN = 64
+
+
+def _attach(name: str) -> shared_memory.SharedMemory:
+    """
+    Attach to an existing block.
+
+    Processes started from the owner share its resource tracker, so attaching
+    does not schedule a second unlink; Python 3.13+ skips tracking entirely.
+    """
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=name, track=False)
+    return shared_memory.SharedMemory(name=name)
+
+
+@dataclass
+class RingItem:
+    """
+    One published slot as seen by a consumer.
+
+    ``array`` is a view into shared memory and is valid until ``release``
+    (or leaving the ``with`` block). Copy it to keep the data longer.
+    """
+
+    ring: "SharedRing"
+    slot: int
+    array: np.ndarray
+    meta: dict = field(default_factory=dict)
+    released: bool = False
+
+    def release(self) -> None:
+        """Return the slot to the producer."""
+        if not self.released:
+            self.released = True
+            self.array = None
+            self.ring.release(self.slot)
+
+    def __enter__(self) -> "RingItem":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.release()
+
+
+class SharedRing:
+    """
+    Fixed-slot shared-memory ring with free/ready queues.
+
+    Create it in the parent with ``SharedRing.create`` and pass it to child
+    processes as a ``Process`` argument. Children attach to the same memory.
+
+    Attributes:
+        slots: Number of slots
+        slot_bytes: Capacity of each slot
+        waits: Producer time spent blocked on a full ring (seconds)
+    """
+
+    def __init__(self, name: str, slots: int, slot_bytes: int, free: Any, ready: Any):
+        self.name = name
+        self.slots = slots
+        self.slot_bytes = slot_bytes
+        self.free = free
+        self.ready = ready
+        self.owner = False
+        self.waits = 0.0
+        self.shm = _attach(name)
+
+    @classmethod
+    def create(cls, slots: int, slot_bytes: int, ctx: Optional[Any] = None) -> "SharedRing":
+        """
+        Allocate a ring owned by the calling process.
+
+        Args:
+            slots: Number of slots (frames in flight)
+            slot_bytes: Largest payload per slot, e.g. ``h * w * 3`` for BGR frames
+            ctx: multiprocessing context the worker processes are started with
+        """
+        ctx = ctx or mp.get_context()
+        slot_bytes = -(-slot_bytes // ALIGN) * ALIGN
+        shm = shared_memory.SharedMemory(create=True, size=slots * slot_bytes)
+        free, ready = ctx.Queue(), ctx.Queue()
+        for i in range(slots):
+            free.put(i)
+        ring = cls.__new__(cls)
+        ring.name, ring.slots, ring.slot_bytes = shm.name, slots, slot_bytes
+        ring.free, ring.ready, ring.owner, ring.waits, ring.shm = free, ready, True, 0.0, shm
+        return ring
+
+    @classmethod
+    def for_frames(cls, slots: int, height: int, width: int, channels: int = 3, ctx: Optional[Any] = None):
+        """Allocate a ring sized for uint8 frames of the given resolution."""
+        return cls.create(slots, height * width * channels, ctx)
+
+    def __getstate__(self) -> dict:
+        return dict(name=self.name, slots=self.slots, slot_bytes=self.slot_bytes, free=self.free, ready=self.ready)
+
+    def __setstate__(self, state: dict) -> None:
+        self.__init__(**state)
+
+    def view(self, slot: int, shape: tuple, dtype: Any = np.uint8) -> np.ndarray:
+        """Return a numpy view of ``slot`` with the given layout."""
+        dtype = np.dtype(dtype)
+        nbytes = int(np.prod(shape)) * dtype.itemsize
+        if nbytes > self.slot_bytes:
+            raise ValueError(f"Payload of {nbytes} bytes does not fit a {self.slot_bytes}-byte slot")
+        return np.ndarray(shape, dtype=dtype, buffer=self.shm.buf, offset=slot * self.slot_bytes)
+
+    def acquire(self, timeout: Optional[float] = None) -> int:
+        """
+        Take a free slot, blocking while all slots are in flight.
+
+        Raises:
+            TimeoutError: No slot became free within ``timeout`` seconds
+        """
+        start = time.perf_counter()
+        try:
+            slot = self.free.get(timeout=timeout)
+        except Empty:
+            raise TimeoutError(f"No free slot within {timeout}s (ring of {self.slots} is full)") from None
+        self.waits += time.perf_counter() - start
+        return slot
+
+    def publish(self, slot: int, shape: tuple, dtype: Any = np.uint8, **meta) -> None:
+        """Hand a filled slot to the consumers."""
+        self.ready.put((slot, tuple(shape), np.dtype(dtype).str, meta))
+
+    def put(self, array: np.ndarray, timeout: Optional[float] = None, **meta) -> int:
+        """Copy ``array`` into a free slot and publish it. Returns the slot index."""
+        slot = self.acquire(timeout)
+        self.view(slot, array.shape, array.dtype)[...] = array
+        self.publish(slot, array.shape, array.dtype, **meta)
+        return slot
+
+    def get(self, timeout: Optional[float] = None) -> Optional[RingItem]:
+        """
+        Receive the next published slot, or None once the producer has closed.
+
+        Raises:
+            TimeoutError: Nothing was published within ``timeout`` seconds
+        """
+        try:
+            msg = self.ready.get(timeout=timeout)
+        except Empty:
+            raise TimeoutError(f"Nothing published within {timeout}s") from None
+        if msg is None:
+            return None
+        slot, shape, dtype, meta = msg
+        return RingItem(self, slot, self.view(slot, shape, dtype), meta)
+
+    def items(self, timeout: Optional[float] = None) -> Iterator[RingItem]:
+        """
+        Iterate published slots until the producer closes.
+
+        Slots not released by the loop body are released before the next item
+        is fetched.
+        """
+        while True:
+            item = self.get(timeout)
+            if item is None:
+                return
+            try:
+                yield item
+            finally:
+                item.release()
+
+    def release(self, slot: int) -> None:
+        """Return ``slot`` to the free queue."""
+        self.free.put(slot)
+
+    def close_writer(self, consumers: int = 1) -> None:
+        """Signal end of stream to ``consumers`` readers."""
+        for _ in range(consumers):
+            self.ready.put(None)
+
+    def close(self) -> None:
+        """Detach this process from the shared memory (views must be released first)."""
+        self.shm.close()
+
+    def unlink(self) -> None:
+        """Free the shared memory; call once, from the owner, after every process has closed."""
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+
+def pack_masks(masks: np.ndarray) -> tuple[np.ndarray, tuple]:
+    """
+    Bit-pack (N, H, W) boolean masks for a mask ring (8x smaller than bool).
+
+    Returns:
+        Packed uint8 array and the original shape for ``unpack_masks``
+    """
+    masks = np.asarray(masks, dtype=bool)
+    n, h, w = masks.shape
+    return np.packbits(masks.reshape(n, h * w), axis=1), masks.shape
+
+
+def unpack_masks(packed: np.ndarray, shape: tuple) -> np.ndarray:
+    """Inverse of ``pack_masks``."""
+    n, h, w = shape
+    return np.unpackbits(packed, axis=1, count=h * w).reshape(n, h, w).astype(bool)
+
+
+def decode_video(ring: SharedRing, source: str, consumers: int = 1, stride: int = 1) -> int:
+    """
+    Decoder process target: decode ``source`` straight into ring slots.
+
+    OpenCV decodes into the slot view, so frames are never copied. Each slot
+    carries ``frame`` (index) and ``pts`` (ms) metadata.
+
+    Args:
+        ring: Frame ring sized for the video resolution
+        source: Video path or stream URL
+        consumers: Number of readers to signal at end of stream
+        stride: Publish every Nth frame
+
+    Returns:
+        Number of frames published
+    """
+    import cv2
+
+    cap = cv2.VideoCapture(source)
+    h, w = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)), int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+    index = published = 0
+    try:
+        while True:
+            if index % stride:
+                if not cap.grab():
+                    break
+                index += 1
+                continue
+            slot = ring.acquire()
+            ok, frame = cap.read(ring.view(slot, (h, w, 3)))
+            if not ok:
+                ring.release(slot)
+                break
+            if frame.shape != (h, w, 3):  # stream changed resolution; OpenCV allocated a new array
+                ring.view(slot, frame.shape)[...] = frame
+            ring.publish(slot, frame.shape, np.uint8, frame=index, pts=cap.get(cv2.CAP_PROP_POS_MSEC))
+            index += 1
+            published += 1
+    finally:
+        cap.release()
+        ring.close_writer(consumers)
+    return published
@@ -0,0 +1,176 @@
+"""
+Tracker Snapshots
+Saves a video predictor's tracking state (memory bank, object pointers,
+prompts and per-object outputs in ``inference_state``) to a compact file and
+restores it into another predictor, so a stream can move to another worker
+or survive a restart without re-prompting its objects.
+
+The state tree is walked and written with ``torch.save``; tensors move to the
+CPU and float32 tensors are stored as float16 by default (``half=False``
+keeps them exact). Tensors shared between entries are written once. Cached
+image features are dropped, since the next frame recomputes them. The file
+loads with ``weights_only=True``, so no code is unpickled.
+
+Example:
+    for result in source.stream(predictor, bboxes=bboxes):
+        ...
+        if shutting_down:
+            meta = save_snapshot(predictor, "tracks/cam1.pt")
+            break
+
+    # on the new worker
+    meta = load_snapshot(predictor, "tracks/cam1.pt")
+    source = VideoSource("rtsp://cam1", imgsz=1008)
+    for result in source.stream(predictor, frame_offset=meta["frame"]):
+        ...
+"""
+
+import os
+import time
+from pathlib import Path
+from typing import Any, Union
+
+import torch
+
+from ultralytics_sam3_install import _sam3
+
+FORMAT_VERSION = 1
+# Predictor attributes holding tracking state
+STATE_ATTRS = ("inference_state",)
+# State entries that are recomputed from incoming frames
+SKIP_KEYS = frozenset({"cached_features", "images"})
+
+
+def _encode(obj: Any, half: bool, skip: frozenset, memo: dict, path: str) -> Any:
+    if isinstance(obj, torch.Tensor):
+        if id(obj) not in memo:
+            t = obj.detach()
+            stored = t.to("cpu", torch.float16) if half and t.dtype == torch.float32 else t.cpu()
+            memo[id(obj)] = {"__tensor__": stored.contiguous(), "dtype": str(t.dtype), "cuda": t.is_cuda}
+        return memo[id(obj)]
+    if type(obj).__module__ == "numpy":
+        if hasattr(obj, "shape") and obj.shape:
+            return {"__tensor__": torch.from_numpy(obj.copy()), "dtype": None, "cuda": False}
+        return obj.item()
+    if obj is None or isinstance(obj, (bool, int, float, str)):
+        return obj
+    if isinstance(obj, dict):
+        return {k: _encode(v, half, skip, memo, f"{path}.{k}") for k, v in obj.items() if k not in skip}
+    if isinstance(obj, (list, tuple)):
+        items = [_encode(v, half, skip, memo, f"{path}[{i}]") for i, v in enumerate(obj)]
+        return items if isinstance(obj, list) else tuple(items)
+    if isinstance(obj, (set, frozenset)):
+        return {"__set__": [_encode(v, half, skip, memo, path) for v in obj]}
+    if isinstance(obj, torch.device):
+        return {"__device__": str(obj)}
+    if isinstance(obj, torch.dtype):
+        return {"__dtype__": str(obj)}
+    raise TypeError(f"Cannot snapshot {path}: unsupported type {type(obj).__name__}")
+
+
+def _dtype(name: str) -> torch.dtype:
+    return getattr(torch, name.split(".")[-1])
+
+
+def _decode(obj: Any, device: torch.device, memo: dict) -> Any:
+    if isinstance(obj, dict):
+        if "__tensor__" in obj:
+            if id(obj) not in memo:
+                t = obj["__tensor__"]
+                if obj["dtype"] is None:  # numpy array
+                    memo[id(obj)] = t.numpy()
+                else:
+                    memo[id(obj)] = t.to(device if obj["cuda"] else "cpu", _dtype(obj["dtype"]))
+            return memo[id(obj)]
+        if "__set__" in obj:
+            return {_decode(v, device, memo) for v in obj["__set__"]}
+        if "__device__" in obj:
+            return device if obj["__device__"].startswith("cuda") else torch.device(obj["__device__"])
+        if "__dtype__" in obj:
+            return _dtype(obj["__dtype__"])
+        return {k: _decode(v, device, memo) for k, v in obj.items()}
+    if isinstance(obj, list):
+        return [_decode(v, device, memo) for v in obj]
+    if isinstance(obj, tuple):
+        return tuple(_decode(v, device, memo) for v in obj)
+    return obj
+
+
+def snapshot(predictor: Any, half: bool = True, attrs: tuple = STATE_ATTRS, skip: frozenset = SKIP_KEYS) -> dict:
+    """
+    Capture a video predictor's tracking state.
+
+    Args:
+        predictor: SAM3VideoPredictor or SAM3VideoSemanticPredictor mid-stream
+        half: Store float32 tensors as float16
+        attrs: Predictor attributes to capture
+        skip: State keys left out (recomputed from new frames)
+
+    Returns:
+        Snapshot dict with ``meta`` (format version, predictor class, model
+        fingerprint, frame, object ids, time) and the encoded ``state``
+    """
+    memo: dict = {}
+    state = {attr: _encode(getattr(predictor, attr), half, skip, memo, attr) for attr in attrs if hasattr(predictor, attr)}
+    dataset = getattr(predictor, "dataset", None)
+    inference_state = getattr(predictor, "inference_state", None) or {}
+    meta = dict(
+        version=FORMAT_VERSION,
+        predictor=type(predictor).__name__,
+        model=_sam3.model_fingerprint(predictor),
+        frame=int(getattr(dataset, "frame", 0) or 0),
+        obj_ids=[int(i) for i in inference_state.get("obj_ids", [])] if isinstance(inference_state, dict) else [],
+        half=half,
+        created=time.time(),
+    )
+    return dict(meta=meta, state=state)
+
+
+def restore(predictor: Any, snap: dict, strict: bool = True) -> dict:
+    """
+    Load a snapshot's tracking state into ``predictor``.
+
+    The predictor must be the same class with the same weights (checked
+    unless ``strict=False``); tensors that lived on a GPU go to the
+    predictor's device. Start the next stream with ``frame_offset`` set to
+    the returned ``frame`` so frame indices continue.
+
+    Returns:
+        The snapshot's ``meta``
+    """
+    meta = snap["meta"]
+    if meta["version"] != FORMAT_VERSION:
+        raise ValueError(f"Unsupported snapshot version {meta['version']} (expected {FORMAT_VERSION})")
+    if strict:
+        if meta["predictor"] != type(predictor).__name__:
+            raise ValueError(f"Snapshot is from {meta['predictor']}, not {type(predictor).__name__}")
+        fingerprint = _sam3.model_fingerprint(predictor)
+        if meta["model"] != fingerprint:
+            raise ValueError(f"Snapshot model {meta['model']} does not match {fingerprint}")
+    _sam3.get_model(predictor)  # sets up the device
+    device = torch.device(predictor.device)
+    memo: dict = {}
+    for attr, value in snap["state"].items():
+        setattr(predictor, attr, _decode(value, device, memo))
+    return meta
+
+
+def save_snapshot(predictor: Any, path: Union[str, Path], **kwargs) -> dict:
+    """
+    Write ``snapshot(predictor, **kwargs)`` to ``path`` atomically.
+
+    Returns:
+        The snapshot's ``meta`` with the file size in ``bytes``
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    snap = snapshot(predictor, **kwargs)
+    tmp = path.with_name(path.name + ".tmp")
+    torch.save(snap, tmp)
+    os.replace(tmp, path)
+    return dict(snap["meta"], bytes=path.stat().st_size)
+
+
+def load_snapshot(predictor: Any, path: Union[str, Path], strict: bool = True) -> dict:
+    """Restore the snapshot at ``path`` into ``predictor`` and return its ``meta``."""
+    return restore(predictor, torch.load(path, map_location="cpu", weights_only=True), strict)
@@ -0,0 +1,146 @@
+"""
+Prompt Sweep
+Decode thousands of point/box prompt sets against one encoded image.
+
+The image backbone runs once in ``set_image``; every prompt set afterwards
+only costs the prompt encoder and mask decoder, batched so that a whole chunk
+of prompt sets is decoded in a single forward pass.
+"""
+
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Iterator, Optional, Sequence, Union
+
+import numpy as np
+import torch
+
+from ultralytics_sam3_install import _sam3
+
+
+@dataclass
+class SweepBatch:
+    """
+    Results for one decoded chunk of prompt sets.
+
+    Attributes:
+        indices: Positions of the prompt sets in the input list
+        scores: (B, M) predicted mask quality scores
+        masks: (B, M, H, W) boolean masks in source pixels, or None when
+            ``return_masks=False``
+        logits: (B, M, h, w) low-resolution mask logits, or None unless
+            ``return_logits=True``
+    """
+
+    indices: np.ndarray
+    scores: np.ndarray
+    masks: Optional[np.ndarray] = None
+    logits: Optional[torch.Tensor] = None
+
+
+class PromptSweep:
+    """
+    Encode an image once and decode many prompt sets in vectorized batches.
+
+    Each prompt set is a dict with optional ``points`` (K x 2), ``point_labels``
+    (K,) and ``bbox`` (4,) in source-image pixels, the same prompts
+    ``SAM3Predictor.__call__`` accepts for a single object.
+
+    Example:
+        sweep = PromptSweep(predictor, batch_size=128)
+        sweep.set_image("image.jpg")
+        for batch in sweep.run([{"points": [[x, y]], "point_labels": [1]} for x, y in clicks]):
+            ...
+    """
+
+    def __init__(self, predictor: Any, batch_size: int = 64, multimask_output: bool = False):
+        """
+        Args:
+            predictor: SAM3Predictor used for encoding and decoding
+            batch_size: Prompt sets decoded per forward pass
+            multimask_output: Return three candidate masks per prompt set
+        """
+        self.predictor = predictor
+        self.batch_size = batch_size
+        self.multimask_output = multimask_output
+        self.src_shape: Optional[tuple[int, int]] = None
+
+    def set_image(self, image: Union[str, Path, np.ndarray]) -> None:
+        """Run the image backbone once and keep the features for all sweeps."""
+        im = _sam3.load_image(image)
+        self.predictor.set_image(im)
+        self.src_shape = im.shape[:2]
+
+    def run(
+        self,
+        prompts: Sequence[dict],
+        return_masks: bool = True,
+        return_logits: bool = False,
+    ) -> Iterator[SweepBatch]:
+        """
+        Decode all prompt sets.
+
+        Prompt sets are grouped by whether they carry a box, padded to the
+        largest point count in their chunk (padding points use label -1) and
+        decoded ``batch_size`` at a time.
+
+        Args:
+            prompts: Prompt sets, see class docstring
+            return_masks: Upsample masks to source resolution (costly for
+                large sweeps; disable when only scores are needed)
+            return_logits: Also return low-resolution logits, e.g. to seed
+                an interactive refinement
+
+        Yields:
+            SweepBatch for each decoded chunk, in input order within each group
+        """
+        if self.src_shape is None:
+            raise RuntimeError("Call set_image() before run()")
+        with_box = [i for i, p in enumerate(prompts) if p.get("bbox") is not None]
+        without_box = [i for i, p in enumerate(prompts) if p.get("bbox") is None]
+        for group in (with_box, without_box):
+            for start in range(0, len(group), self.batch_size):
+                indices = np.asarray(group[start : start + self.batch_size])
+                yield self._decode(prompts, indices, return_masks, return_logits)
+
+    def run_points(self, points: np.ndarray, labels: Optional[np.ndarray] = None, **kwargs) -> Iterator[SweepBatch]:
+        """
+        Sweep single clicks, one prompt set per point.
+
+        Args:
+            points: (N, 2) click coordinates in source pixels
+            labels: (N,) point labels, positive by default
+            **kwargs: Options forwarded to ``run``
+        """
+        points = np.asarray(points, dtype=np.float32).reshape(-1, 2)
+        labels = np.ones(len(points), dtype=np.int32) if labels is None else np.asarray(labels)
+        return self.run([{"points": p[None], "point_labels": l[None]} for p, l in zip(points, labels)], **kwargs)
+
+    def _decode(self, prompts: Sequence[dict], indices: np.ndarray, return_masks: bool, return_logits: bool) -> SweepBatch:
+        chunk = [prompts[i] for i in indices]
+        n = len(chunk)
+        k = max(0 if p.get("points") is None else len(p["points"]) for p in chunk)
+        points = labels = bboxes = None
+        if k:
+            points = np.zeros((n, k, 2), dtype=np.float32)
+            labels = np.full((n, k), -1, dtype=np.int32)
+            for j, p in enumerate(chunk):
+                if p.get("points") is None:
+                    continue
+                pts = np.asarray(p["points"], dtype=np.float32).reshape(-1, 2)
+                points[j, : len(pts)] = pts
+                pt_labels = p.get("point_labels")
+                labels[j, : len(pts)] = 1 if pt_labels is None else pt_labels
+        if chunk[0].get("bbox") is not None:
+            bboxes = np.asarray([p["bbox"] for p in chunk], dtype=np.float32).reshape(n, 4)
+        logits, scores = _sam3.decode_prompts(
+            self.predictor, self.src_shape, bboxes, points, labels, multimask_output=self.multimask_output
+        )
+        masks = None
+        if return_masks:
+            masks = _sam3.masks_to_source(logits, self.src_shape, _sam3.input_size(self.predictor)).cpu().numpy()
+        return SweepBatch(
+            indices=indices,
+            scores=scores.float().cpu().numpy(),
+            masks=masks,
+            logits=logits.cpu() if return_logits else None,
+        )
@@ -0,0 +1,244 @@
+"""
+Tiled Inference
+Runs SAM3 semantic predictors on regions of interest or overlapping tiles of
+high-resolution frames, instead of letting the predictor downscale the whole
+frame, so small objects in 4K wide-angle views keep their pixels.
+
+Tiles default to the model input size (no downscaling inside a tile) and are
+laid out evenly over each ROI with at least the requested overlap, so the cost
+per frame is fixed by the tile count. Image tiles are sent to the predictor in
+batches. For video, every tile is its own tracking stream on a predictor that
+shares the loaded model (``_sam3.clone_predictor``).
+
+Detections cut off by an interior tile edge are dropped when they are small
+enough to appear whole in the neighbouring tile. The remaining detections are
+treated as bbox-cropped masks in frame coordinates, duplicates across seams
+are removed with ``mask_ops.mask_nms``, and one ultralytics ``Results`` per
+frame is built from the survivors.
+
+Example:
+    tiled = TiledPredictor(predictor, tile=1008, overlap=0.2)
+    result = tiled("4k.jpg", text=["person"])
+
+    video = TiledPredictor(video_predictor, rois=[(0, 800, 3840, 2160)])
+    for result in video.stream("4k.mp4", text=["person"]):
+        ...
+"""
+
+import contextlib
+import math
+from typing import Any, Iterator, Optional, Sequence, Union
+
+import numpy as np
+import torch
+
+from ultralytics_sam3_install import _sam3
+from ultralytics_sam3_install.mask_ops import MaskRuns, mask_nms
+from ultralytics_sam3_install.video_source import FrameFeed, VideoFrame, VideoSource
+
+ID_STRIDE = 100_000  # track ID offset per tile, so tile-local IDs never collide
+
+
+def tile_grid(
+    shape: tuple[int, int],
+    tile: int = 1008,
+    overlap: float = 0.2,
+    rois: Optional[Sequence[Sequence[float]]] = None,
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Lay out square tiles over each region of interest.
+
+    Tiles along an axis are spaced evenly, so neighbours overlap by at least
+    ``overlap * tile`` pixels and the last tile ends on the ROI border.
+
+    Args:
+        shape: (height, width) of the frame
+        tile: Tile side in pixels (clipped to the ROI size)
+        overlap: Minimum overlap between neighbouring tiles as a fraction of ``tile``
+        rois: xyxy regions to cover (default: the whole frame)
+
+    Returns:
+        Tuple of (T, 4) int xyxy tiles and (T, 4) bools marking which of the
+        left/top/right/bottom edges lie inside an ROI (shared with a neighbour)
+    """
+    h, w = shape
+    rois = [(0, 0, w, h)] if rois is None else rois
+    step = max(1, round(tile * (1 - overlap)))
+    tiles, interior = [], []
+    for roi in rois:
+        x0, y0 = max(0, int(roi[0])), max(0, int(roi[1]))
+        x1, y1 = min(w, int(math.ceil(roi[2]))), min(h, int(math.ceil(roi[3])))
+        tw, th = min(tile, x1 - x0), min(tile, y1 - y0)
+        if tw <= 0 or th <= 0:
+            continue
+        nx = 1 + max(0, math.ceil((x1 - x0 - tw) / step))
+        ny = 1 + max(0, math.ceil((y1 - y0 - th) / step))
+        xs = np.linspace(x0, x1 - tw, nx).round().astype(int)
+        ys = np.linspace(y0, y1 - th, ny).round().astype(int)
+        for y in ys:
+            for x in xs:
+                tiles.append((x, y, x + tw, y + th))
+                interior.append((x > x0, y > y0, x + tw < x1, y + th < y1))
+    return np.array(tiles, dtype=int).reshape(-1, 4), np.array(interior, dtype=bool).reshape(-1, 4)
+
+
+class TiledPredictor:
+    """
+    Tiled/ROI inference wrapper for SAM3SemanticPredictor and SAM3VideoSemanticPredictor.
+
+    Args:
+        predictor: Semantic image or video predictor
+        tile: Tile side in source pixels (default: the model input size)
+        overlap: Minimum overlap between neighbouring tiles as a fraction of ``tile``
+        rois: xyxy regions to run on (default: the whole frame)
+        batch: Image tiles per predictor call
+        full_frame: Also run on the whole (downscaled) frame to catch objects
+            larger than a tile
+        iou_threshold: Intersection-over-smaller-mask above which duplicates
+            across seams are suppressed
+        edge_margin: Pixels from an interior tile edge within which a
+            detection counts as cut off
+    """
+
+    def __init__(
+        self,
+        predictor: Any,
+        tile: Optional[int] = None,
+        overlap: float = 0.2,
+        rois: Optional[Sequence[Sequence[float]]] = None,
+        batch: int = 4,
+        full_frame: bool = False,
+        iou_threshold: float = 0.5,
+        edge_margin: int = 4,
+    ):
+        self.predictor = predictor
+        self.tile = tile or _sam3.input_size(predictor)
+        self.overlap = overlap
+        self.rois = rois
+        self.batch = max(1, batch)
+        self.full_frame = full_frame
+        self.iou_threshold = iou_threshold
+        self.edge_margin = edge_margin
+        self._grids: dict[tuple[int, int], tuple[np.ndarray, np.ndarray]] = {}
+
+    def tiles(self, shape: tuple[int, int]) -> tuple[np.ndarray, np.ndarray]:
+        """Return the (cached) tiles and interior-edge flags for a frame shape, plus the full frame if enabled."""
+        if shape not in self._grids:
+            tiles, interior = tile_grid(shape, self.tile, self.overlap, self.rois)
+            if self.full_frame:
+                tiles = np.concatenate([tiles, [[0, 0, shape[1], shape[0]]]])
+                interior = np.concatenate([interior, np.zeros((1, 4), bool)])
+            self._grids[shape] = tiles, interior
+        return self._grids[shape]
+
+    def _cut_off(self, xyxy: torch.Tensor, tile: np.ndarray, interior: np.ndarray) -> torch.Tensor:
+        """True for tile-local boxes touching an interior edge that would fit whole in the neighbour."""
+        m, fits = self.edge_margin, self.overlap * self.tile
+        w, h = tile[2] - tile[0], tile[3] - tile[1]
+        bw, bh = xyxy[:, 2] - xyxy[:, 0], xyxy[:, 3] - xyxy[:, 1]
+        cut = torch.zeros(len(xyxy), dtype=torch.bool, device=xyxy.device)
+        for flag, touch, size in (
+            (interior[0], xyxy[:, 0] <= m, bw),
+            (interior[1], xyxy[:, 1] <= m, bh),
+            (interior[2], xyxy[:, 2] >= w - m, bw),
+            (interior[3], xyxy[:, 3] >= h - m, bh),
+        ):
+            if flag:
+                cut |= touch & (size <= fits)
+        return cut
+
+    def merge(self, image: np.ndarray, results: list, path: str = "") -> Any:
+        """
+        Combine per-tile results into one ``Results`` in frame coordinates.
+
+        Args:
+            image: Full BGR frame
+            results: One ``Results`` per tile, in ``tiles`` order
+            path: Source path recorded on the output
+        """
+        from ultralytics.engine.results import Results
+
+        tiles, interior = self.tiles(image.shape[:2])
+        h, w = image.shape[:2]
+        rows, crops, places, names = [], [], [], results[0].names if results else {}
+        for t, (r, tile, inner) in enumerate(zip(results, tiles, interior)):
+            if r.boxes is None or not len(r.boxes) or r.masks is None:
+                continue
+            data = r.boxes.data.clone()
+            keep = ~self._cut_off(data[:, :4], tile, inner)
+            if not keep.any():
+                continue
+            data, m = data[keep], r.masks.data[keep].bool()
+            data[:, :4] += data.new_tensor([tile[0], tile[1], tile[0], tile[1]])
+            if data.shape[1] == 7:  # tracked: x1, y1, x2, y2, id, conf, cls
+                data[:, 4] += t * ID_STRIDE
+            if m.shape[-2:] != (tile[3] - tile[1], tile[2] - tile[0]):  # masks at model resolution
+                m = torch.nn.functional.interpolate(m[:, None].float(), (tile[3] - tile[1], tile[2] - tile[0]))[:, 0] > 0.5
+            rows.append(data)
+            crops += list(m.cpu().numpy())
+            places += [tile] * len(m)
+        if not rows:
+            return Results(image, path=path, names=names, boxes=torch.zeros(0, 6), masks=torch.zeros(0, h, w))
+        data = torch.cat(rows)
+        # Tile masks are bbox-cropped masks in frame coordinates; only survivors are pasted full size
+        runs = MaskRuns.from_crops(crops, np.array(places), (h, w))
+        keep = mask_nms(runs, data[:, -2].cpu().numpy(), self.iou_threshold, metric="ios")
+        masks = torch.zeros(len(keep), h, w, dtype=torch.bool, device=data.device)
+        for i, k in enumerate(keep.tolist()):
+            x0, y0, x1, y1 = places[k].tolist()
+            masks[i, y0:y1, x0:x1] = torch.from_numpy(crops[k])
+        return Results(image, path=path, names=names, boxes=data[torch.as_tensor(keep, device=data.device)], masks=masks)
+
+    def predict(self, image: Union[str, np.ndarray], **kwargs) -> Any:
+        """
+        Run on one image and return a merged ``Results``.
+
+        Args:
+            image: Image path or BGR array
+            **kwargs: Prompt arguments for the predictor (``text=...``)
+        """
+        im = _sam3.load_image(image)
+        tiles, _ = self.tiles(im.shape[:2])
+        crops = [im[y0:y1, x0:x1] for x0, y0, x1, y1 in tiles.tolist()]
+        results = []
+        for i in range(0, len(crops), self.batch):
+            _sam3.reset_features(self.predictor)  # tiles are new images, never the cached one
+            results += self.predictor(source=crops[i : i + self.batch], save=False, **kwargs)
+        return self.merge(im, results, image if isinstance(image, str) else "")
+
+    def __call__(self, source: Union[str, np.ndarray, list], **kwargs) -> Union[Any, list]:
+        """Run on one image or a list of images (one merged ``Results`` each)."""
+        if isinstance(source, list):
+            return [self.predict(s, **kwargs) for s in source]
+        return self.predict(source, **kwargs)
+
+    def stream(self, source: Union[str, VideoSource], **kwargs) -> Iterator[Any]:
+        """
+        Track through a video tile by tile and yield one merged ``Results`` per frame.
+
+        Track IDs are offset by ``ID_STRIDE`` per tile; an object crossing a
+        seam keeps the ID of whichever tile wins the merge, so pair this with
+        ``tracks.TrackMerger`` for stable identities.
+
+        Args:
+            source: Video path or ``VideoSource`` (decoded at source resolution)
+            **kwargs: Prompt arguments for the predictor (``text=...``)
+        """
+        video = source if isinstance(source, VideoSource) else VideoSource(source, imgsz=None, render=False)
+        tiles, _ = self.tiles((video.height, video.width))
+        feeds = [FrameFeed(int(x1 - x0), int(y1 - y0)) for x0, y0, x1, y1 in tiles]
+        predictors = [self.predictor] + [_sam3.clone_predictor(self.predictor) for _ in feeds[1:]]
+        with contextlib.ExitStack() as stack:
+            streams = []
+            for predictor, feed in zip(predictors, feeds):
+                stack.enter_context(_sam3.frame_source(predictor, feed, video.path, video.fps, video.frames))
+                streams.append(predictor(source=video.path, stream=True, **kwargs))
+            try:
+                for frame in video:
+                    image = frame.full if frame.full is not None else frame.model
+                    for feed, (x0, y0, x1, y1) in zip(feeds, tiles.tolist()):
+                        feed.put(VideoFrame(frame.index, frame.time, image[y0:y1, x0:x1], None, 1.0))
+                    yield self.merge(image, [next(s) for s in streams], video.path)
+            finally:
+                for s in streams:
+                    s.close()
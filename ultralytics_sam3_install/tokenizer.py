@@ -0,0 +1,148 @@
+"""
+BPE Tokenizer
+Standalone tokenizer for the SAM3 text encoder, reading the same
+``bpe_simple_vocab_16e6.txt.gz`` vocabulary as ultralytics.
+
+Lets exported text encoder graphs run without importing ultralytics or sam3.
+The export command checks that token ids match the ultralytics tokenizer.
+"""
+
+import gzip
+import html
+import re
+from functools import lru_cache
+from pathlib import Path
+from typing import Union
+
+import numpy as np
+
+try:
+    import regex
+except ImportError:  # ASCII-equivalent pattern without unicode property classes
+    regex = None
+
+try:
+    import ftfy
+except ImportError:
+    ftfy = None
+
+START, END = "<start_of_text>", "<end_of_text>"
+
+
+@lru_cache()
+def bytes_to_unicode() -> dict[int, str]:
+    """Map utf-8 bytes to printable unicode characters (reversible, avoids whitespace/control chars)."""
+    bs = list(range(ord("!"), ord("~") + 1)) + list(range(ord("¡"), ord("¬") + 1)) + list(range(ord("®"), ord("ÿ") + 1))
+    cs = bs[:]
+    n = 0
+    for b in range(2**8):
+        if b not in bs:
+            bs.append(b)
+            cs.append(2**8 + n)
+            n += 1
+    return dict(zip(bs, map(chr, cs)))
+
+
+def get_pairs(word: tuple) -> set:
+    """Return adjacent symbol pairs of a word."""
+    return set(zip(word[:-1], word[1:]))
+
+
+def clean(text: str) -> str:
+    """Fix encoding, unescape HTML, collapse whitespace and lowercase."""
+    if ftfy is not None:
+        text = ftfy.fix_text(text)
+    text = html.unescape(html.unescape(text))
+    return re.sub(r"\s+", " ", text).strip().lower()
+
+
+class BPETokenizer:
+    """
+    CLIP-style byte-pair tokenizer.
+
+    Args:
+        bpe_path: Path to the gzipped BPE merges file
+        context_length: Length of the padded token sequences
+    """
+
+    def __init__(self, bpe_path: Union[str, Path], context_length: int = 32):
+        self.context_length = context_length
+        self.byte_encoder = bytes_to_unicode()
+        merges = gzip.open(bpe_path).read().decode("utf-8").split("\n")
+        merges = [tuple(m.split()) for m in merges[1 : 49152 - 256 - 2 + 1]]
+        vocab = list(self.byte_encoder.values())
+        vocab += [v + "</w>" for v in vocab]
+        vocab += ["".join(m) for m in merges]
+        vocab += [START, END]
+        self.encoder = dict(zip(vocab, range(len(vocab))))
+        self.bpe_ranks = dict(zip(merges, range(len(merges))))
+        self.cache = {START: START, END: END}
+        if regex is not None:
+            self.pattern = regex.compile(
+                r"""<start_of_text>|<end_of_text>|'s|'t|'re|'ve|'m|'ll|'d|[\p{L}]+|[\p{N}]|[^\s\p{L}\p{N}]+""",
+                regex.IGNORECASE,
+            )
+        else:
+            self.pattern = re.compile(
+                r"""<start_of_text>|<end_of_text>|'s|'t|'re|'ve|'m|'ll|'d|[^\W\d_]+|\d|[^\s\w]+|_+""", re.IGNORECASE
+            )
+
+    def bpe(self, token: str) -> str:
+        """Apply BPE merges to one pre-tokenized word."""
+        if token in self.cache:
+            return self.cache[token]
+        word = tuple(token[:-1]) + (token[-1] + "</w>",)
+        pairs = get_pairs(word)
+        if not pairs:
+            return token + "</w>"
+        while True:
+            bigram = min(pairs, key=lambda pair: self.bpe_ranks.get(pair, float("inf")))
+            if bigram not in self.bpe_ranks:
+                break
+            first, second = bigram
+            new_word, i = [], 0
+            while i < len(word):
+                try:
+                    j = word.index(first, i)
+                except ValueError:
+                    new_word.extend(word[i:])
+                    break
+                new_word.extend(word[i:j])
+                i = j
+                if word[i] == first and i < len(word) - 1 and word[i + 1] == second:
+                    new_word.append(first + second)
+                    i += 2
+                else:
+                    new_word.append(word[i])
+                    i += 1
+            word = tuple(new_word)
+            if len(word) == 1:
+                break
+            pairs = get_pairs(word)
+        self.cache[token] = " ".join(word)
+        return self.cache[token]
+
+    def encode(self, text: str) -> list[int]:
+        """Return BPE token ids of ``text`` (without start/end tokens)."""
+        ids = []
+        for token in self.pattern.findall(clean(text)):
+            token = "".join(self.byte_encoder[b] for b in token.encode("utf-8"))
+            ids.extend(self.encoder[t] for t in self.bpe(token).split(" "))
+        return ids
+
+    def __call__(self, texts: Union[str, list[str]]) -> np.ndarray:
+        """
+        Tokenize prompts into a zero-padded (N, context_length) int64 array.
+
+        Sequences longer than the context are truncated, keeping the end token.
+        """
+        texts = [texts] if isinstance(texts, str) else texts
+        out = np.zeros((len(texts), self.context_length), dtype=np.int64)
+        sot, eot = self.encoder[START], self.encoder[END]
+        for i, text in enumerate(texts):
+            ids = [sot] + self.encode(text) + [eot]
+            if len(ids) > self.context_length:
+                ids = ids[: self.context_length]
+                ids[-1] = eot
+            out[i, : len(ids)] = ids
+        return out
@@ -0,0 +1,172 @@
+"""
+Trail Rendering
+Draws movement trails for hundreds of tracks from a preallocated ring of
+track positions, replacing ``sv.TraceAnnotator``.
+
+Positions live in a (max_tracks, trace_length, 2) int32 array with one write
+head per track slot. Track IDs map to slots through a sorted ID table (one
+``searchsorted`` per frame; only new IDs touch Python). Each frame writes
+every active track's anchor point with one fancy-indexed assignment and gathers all trails in chronological order
+with one ``take``. Tracks sharing a palette color are drawn with a single
+``cv2.polylines`` call. Slots of tracks unseen for ``max_age`` frames are
+recycled.
+
+Example:
+    trails = TrailRenderer(trace_length=30, palette=colors)
+    for detections in stream:
+        trails.update(detections.tracker_id, detections.xyxy)
+        frame = trails.draw(frame)
+"""
+
+from typing import Any, Optional, Sequence
+
+import cv2
+import numpy as np
+
+ID_PAD = np.iinfo(np.int64).max  # fills unused entries of the sorted ID table
+
+
+class TrailRenderer:
+    """
+    Fixed-memory per-track trail history and batched drawing.
+
+    Args:
+        max_tracks: Track slots (tracks beyond this are not drawn until a slot frees)
+        trace_length: Points kept per track
+        max_age: Frames a track may go unseen before its slot is recycled
+        palette: BGR colors; a track uses ``palette[id % len(palette)]``
+        thickness: Line thickness in pixels
+        anchor: "center" or "bottom_center" of the box
+    """
+
+    def __init__(
+        self,
+        max_tracks: int = 512,
+        trace_length: int = 30,
+        max_age: int = 30,
+        palette: Optional[Sequence[tuple[int, int, int]]] = None,
+        thickness: int = 2,
+        anchor: str = "center",
+    ):
+        self.trace_length = trace_length
+        self.max_age = max_age
+        self.palette = list(palette) if palette else [(255, 255, 255)]
+        self.thickness = thickness
+        self.anchor = anchor
+        self.points = np.zeros((max_tracks, trace_length, 2), dtype=np.int32)
+        self.head = np.zeros(max_tracks, dtype=np.int64)  # next write position
+        self.length = np.zeros(max_tracks, dtype=np.int64)
+        self.last_seen = np.zeros(max_tracks, dtype=np.int64)
+        self.track_id = np.full(max_tracks, -1, dtype=np.int64)
+        # Sorted IDs of occupied slots (padded with ID_PAD) and their slots, for vectorized lookup
+        self.sorted_ids = np.full(max_tracks, ID_PAD, dtype=np.int64)
+        self.sorted_slots = np.zeros(max_tracks, dtype=np.int64)
+        self.count = 0
+        self._slot_buffer = np.empty(max_tracks, dtype=np.int64)
+        self.free = list(range(max_tracks - 1, -1, -1))
+        self.frame = 0
+        self._steps = np.arange(trace_length)
+
+    def anchors(self, boxes: np.ndarray) -> np.ndarray:
+        """Return (N, 2) anchor points of xyxy boxes."""
+        x = (boxes[:, 0] + boxes[:, 2]) / 2
+        y = boxes[:, 3] if self.anchor == "bottom_center" else (boxes[:, 1] + boxes[:, 3]) / 2
+        return np.stack([x, y], 1)
+
+    def _allocate(self, tid: int) -> int:
+        """Slot of a track ID not found by the vectorized lookup (new, or repeated within a frame); -1 when full."""
+        count = self.count
+        pos = int(np.searchsorted(self.sorted_ids[:count], tid))
+        if pos < count and self.sorted_ids[pos] == tid:
+            return int(self.sorted_slots[pos])
+        if not self.free:
+            return -1
+        slot = self.free.pop()
+        self.sorted_ids[pos + 1 : count + 1] = self.sorted_ids[pos:count]
+        self.sorted_slots[pos + 1 : count + 1] = self.sorted_slots[pos:count]
+        self.sorted_ids[pos], self.sorted_slots[pos] = tid, slot
+        self.count += 1
+        self.track_id[slot] = tid
+        self.length[slot] = 0
+        return slot
+
+    def _slots(self, ids: np.ndarray) -> np.ndarray:
+        """
+        Look up (or allocate) the slot of each track ID; -1 when the ring is full.
+
+        Known IDs are found with one ``searchsorted`` into the sorted ID table
+        and written to a reused buffer; only unseen IDs take the Python path.
+        """
+        if len(ids) > len(self._slot_buffer):
+            self._slot_buffer = np.empty(2 * len(ids), dtype=np.int64)
+        slots = self._slot_buffer[: len(ids)]
+        pos = np.searchsorted(self.sorted_ids[: self.count], ids)
+        np.minimum(pos, len(self.sorted_ids) - 1, out=pos)
+        np.take(self.sorted_slots, pos, out=slots)
+        missing = self.sorted_ids[pos] != ids
+        if missing.any():
+            for i in np.flatnonzero(missing).tolist():
+                slots[i] = self._allocate(int(ids[i]))
+        return slots
+
+    def evict(self) -> None:
+        """Recycle slots of tracks unseen for more than ``max_age`` frames."""
+        stale = np.flatnonzero((self.track_id >= 0) & (self.frame - self.last_seen > self.max_age))
+        if not len(stale):
+            return
+        count = self.count
+        keep = ~np.isin(self.sorted_slots[:count], stale)
+        kept = int(keep.sum())
+        self.sorted_ids[:kept] = self.sorted_ids[:count][keep]
+        self.sorted_slots[:kept] = self.sorted_slots[:count][keep]
+        self.sorted_ids[kept:count] = ID_PAD
+        self.count = kept
+        self.track_id[stale] = -1
+        self.length[stale] = 0
+        self.free.extend(stale.tolist())
+
+    def update(self, tracker_ids: Optional[Any], boxes: Any) -> None:
+        """
+        Append this frame's anchor point to each track's trail.
+
+        Args:
+            tracker_ids: (N,) track IDs (None when the frame has no tracks)
+            boxes: (N, 4) xyxy boxes in the coordinates trails are drawn in
+        """
+        self.frame += 1
+        if tracker_ids is not None and len(tracker_ids):
+            ids = np.asarray(tracker_ids, dtype=np.int64)
+            slots = self._slots(ids)
+            keep = slots >= 0
+            slots = slots[keep]
+            self.points[slots, self.head[slots]] = self.anchors(np.asarray(boxes, dtype=np.float32)[keep]).round()
+            self.head[slots] = (self.head[slots] + 1) % self.trace_length
+            self.length[slots] = np.minimum(self.length[slots] + 1, self.trace_length)
+            self.last_seen[slots] = self.frame
+        self.evict()
+
+    def trails(self, min_points: int = 2) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Return trails of tracks seen this frame, oldest point first.
+
+        Shorter trails are front-padded with their oldest point so all trails
+        share one (n, trace_length, 2) array.
+
+        Returns:
+            Tuple of track IDs (n,) and points (n, trace_length, 2)
+        """
+        slots = np.flatnonzero((self.last_seen == self.frame) & (self.length >= min_points) & (self.track_id >= 0))
+        n, head = self.length[slots][:, None], self.head[slots][:, None]
+        L = self.trace_length
+        order = (head - n + np.maximum(self._steps[None] - (L - n), 0)) % L
+        return self.track_id[slots], np.take_along_axis(self.points[slots], order[..., None], axis=1)
+
+    def draw(self, frame: np.ndarray) -> np.ndarray:
+        """Draw current trails onto ``frame`` in place (one polylines call per color) and return it."""
+        ids, points = self.trails()
+        if not len(ids):
+            return frame
+        color_index = ids % len(self.palette)
+        for c in np.unique(color_index).tolist():
+            cv2.polylines(frame, points[color_index == c], False, self.palette[c], self.thickness, cv2.LINE_AA)
+        return frame
@@ -0,0 +1,257 @@
+"""
+Video Source
+Opens a video once and serves each frame at the model's input resolution,
+plus the full-resolution frame only when something renders it.
+
+Replaces the separate ``sv.VideoInfo.from_video_path`` probe and the
+predictor's own reader. With PyAV installed, frames are scaled and
+color-converted in a single swscale pass straight from the decoder; with
+OpenCV they are decoded and area-resized. Skipped frames (``stride``) are
+grabbed without color conversion. Seeking and ``start``/``end`` time ranges
+are supported by both backends.
+
+Example:
+    source = VideoSource("video.mp4", imgsz=1008, render=True, start=26, end=42)
+    predictor = SAM3VideoSemanticPredictor(overrides=overrides, bpe_path=bpe)
+    for result in source.stream(predictor, text=["person"]):
+        frame = source.history[-1]  # VideoFrame matching this result
+"""
+
+import collections
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Iterator, Optional, Union
+
+import cv2
+import numpy as np
+
+try:
+    import av
+except ImportError:  # OpenCV backend only
+    av = None
+
+
+@dataclass
+class VideoFrame:
+    """
+    One decoded frame.
+
+    Attributes:
+        index: Frame number in the source video
+        time: Presentation time in seconds
+        model: BGR frame at the inference resolution
+        full: BGR frame at source resolution, or None when rendering is off
+        scale: ``model`` size divided by source size
+    """
+
+    index: int
+    time: float
+    model: np.ndarray
+    full: Optional[np.ndarray]
+    scale: float
+
+
+def model_shape(height: int, width: int, imgsz: Optional[int]) -> tuple[int, int]:
+    """Return the (height, width) that fits the long side into ``imgsz`` (never upscales)."""
+    if not imgsz or max(height, width) <= imgsz:
+        return height, width
+    r = imgsz / max(height, width)
+    return max(2, round(height * r)), max(2, round(width * r))
+
+
+class VideoSource:
+    """
+    Single reader for a video file or stream.
+
+    Args:
+        path: Video path or stream URL
+        imgsz: Long side of the model-branch frames (None keeps source size)
+        render: Also keep full-resolution frames in ``VideoFrame.full``
+        start: Start time in seconds
+        end: End time in seconds (exclusive)
+        stride: Yield every Nth frame
+        backend: "pyav", "opencv" or None (PyAV when installed)
+        history: Number of yielded frames kept in ``history`` (for pairing with
+            predictor results that run ahead of the consumer)
+    """
+
+    def __init__(
+        self,
+        path: Union[str, Path],
+        imgsz: Optional[int] = None,
+        render: bool = True,
+        start: float = 0.0,
+        end: Optional[float] = None,
+        stride: int = 1,
+        backend: Optional[str] = None,
+        history: int = 4,
+    ):
+        self.path = str(path)
+        self.render = render
+        self.start, self.end, self.stride = start, end, max(1, stride)
+        self.backend = backend or ("pyav" if av is not None else "opencv")
+        if self.backend == "pyav":
+            if av is None:
+                raise ImportError("backend='pyav' needs the 'av' package")
+            self.container = av.open(self.path)
+            self.stream_ = self.container.streams.video[0]
+            self.stream_.thread_type = "AUTO"
+            self.width, self.height = self.stream_.codec_context.width, self.stream_.codec_context.height
+            self.fps = float(self.stream_.average_rate or 30)
+            self.total_frames = int(self.stream_.frames or 0)
+            if not self.total_frames and self.stream_.duration:
+                self.total_frames = int(self.stream_.duration * self.stream_.time_base * self.fps)
+        else:
+            self.cap = cv2.VideoCapture(self.path)
+            if not self.cap.isOpened():
+                raise FileNotFoundError(f"Could not open video: {self.path}")
+            self.width = int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+            self.height = int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+            self.fps = self.cap.get(cv2.CAP_PROP_FPS) or 30.0
+            self.total_frames = int(self.cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        self.model_height, self.model_width = model_shape(self.height, self.width, imgsz)
+        self.scale = self.model_width / self.width
+        self.history = collections.deque(maxlen=history)
+        self.position = start
+
+    @property
+    def frames(self) -> int:
+        """Number of frames this source will yield for its time range and stride."""
+        last = self.total_frames if self.end is None else min(self.total_frames, round(self.end * self.fps))
+        return max(0, -(-(last - round(self.start * self.fps)) // self.stride))
+
+    def video_info(self, render_size: bool = True) -> Any:
+        """Return an ``sv.VideoInfo`` for writing output (source or model resolution)."""
+        import supervision as sv
+
+        w, h = (self.width, self.height) if render_size else (self.model_width, self.model_height)
+        return sv.VideoInfo(width=w, height=h, fps=round(self.fps), total_frames=self.frames)
+
+    def seek(self, seconds: float) -> None:
+        """Restart iteration at ``seconds`` (the next ``__iter__`` starts there)."""
+        self.position = seconds
+
+    def _to_model(self, frame: np.ndarray) -> np.ndarray:
+        if (self.model_height, self.model_width) == frame.shape[:2]:
+            return frame
+        return cv2.resize(frame, (self.model_width, self.model_height), interpolation=cv2.INTER_AREA)
+
+    def _iter_opencv(self) -> Iterator[VideoFrame]:
+        cap = self.cap
+        cap.set(cv2.CAP_PROP_POS_MSEC, self.position * 1000)
+        index = round(self.position * self.fps)
+        while True:
+            t = index / self.fps
+            if self.end is not None and t >= self.end:
+                return
+            if (index - round(self.start * self.fps)) % self.stride:
+                if not cap.grab():  # decode without color conversion
+                    return
+                index += 1
+                continue
+            ok, frame = cap.read()
+            if not ok:
+                return
+            yield VideoFrame(index, t, self._to_model(frame), frame if self.render else None, self.scale)
+            index += 1
+
+    def _iter_pyav(self) -> Iterator[VideoFrame]:
+        stream = self.stream_
+        self.container.seek(int(self.position / stream.time_base), stream=stream)
+        first = round(self.start * self.fps)
+        for frame in self.container.decode(stream):
+            t = float(frame.pts * stream.time_base) if frame.pts is not None else frame.time
+            if t < self.position - 0.5 / self.fps:  # seek lands on the keyframe before the target
+                continue
+            if self.end is not None and t >= self.end:
+                return
+            index = round(t * self.fps)
+            if (index - first) % self.stride:
+                continue
+            model = frame.reformat(width=self.model_width, height=self.model_height, format="bgr24").to_ndarray()
+            full = frame.to_ndarray(format="bgr24") if self.render else None
+            yield VideoFrame(index, t, model, full, self.scale)
+
+    def __iter__(self) -> Iterator[VideoFrame]:
+        frames = self._iter_pyav() if self.backend == "pyav" else self._iter_opencv()
+        for frame in frames:
+            self.history.append(frame)
+            yield frame
+
+    def stream(self, predictor: Any, frame_offset: int = 0, **kwargs) -> Iterator[Any]:
+        """
+        Run a video predictor on this source's model-resolution frames.
+
+        ``result.orig_img`` is the model-resolution frame; the matching
+        ``VideoFrame`` (with ``full`` when rendering) is ``history[-1]`` when
+        each result is yielded.
+
+        Args:
+            predictor: SAM3VideoPredictor or SAM3VideoSemanticPredictor
+            frame_offset: Frames the predictor has already tracked (e.g. the
+                ``frame`` of a restored ``snapshot``)
+            **kwargs: Prompt arguments (``text=...``, ``bboxes=...``)
+        """
+        from ultralytics_sam3_install import _sam3  # torch is only needed on the model branch
+
+        with _sam3.frame_source(predictor, self, self.path, self.fps, self.frames, frame_offset):
+            yield from predictor(source=self.path, stream=True, **kwargs)
+
+    def release(self) -> None:
+        """Close the underlying reader."""
+        if self.backend == "pyav":
+            self.container.close()
+        else:
+            self.cap.release()
+
+    def __enter__(self) -> "VideoSource":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.release()
+
+
+class FrameFeed:
+    """
+    One-slot frame source for a video predictor driven frame by frame.
+
+    ``put`` a frame, then advance the predictor's result stream once: the
+    predictor pulls exactly one frame per result, so it stays in lockstep with
+    the caller, which decides which frames the model sees.
+
+    Args:
+        width: Width of the frames that will be put
+        height: Height of the frames that will be put
+    """
+
+    def __init__(self, width: int, height: int):
+        self.model_width, self.model_height = width, height
+        self.pending: Optional[VideoFrame] = None
+
+    def put(self, frame: VideoFrame) -> None:
+        self.pending = frame
+
+    def __iter__(self) -> Iterator[VideoFrame]:
+        while self.pending is not None:
+            frame, self.pending = self.pending, None
+            yield frame
+
+
+def scale_boxes(xyxy: np.ndarray, scale: float) -> np.ndarray:
+    """Map model-resolution xyxy boxes back to source pixels."""
+    return np.asarray(xyxy, dtype=np.float32) / scale
+
+
+def scale_masks(masks: np.ndarray, shape: tuple[int, int]) -> np.ndarray:
+    """
+    Resize (N, h, w) boolean masks to the source (height, width) with nearest-neighbour sampling.
+
+    One gather per axis for all masks; no per-mask loop.
+    """
+    masks = np.asarray(masks, dtype=bool)
+    if not len(masks) or masks.shape[1:] == tuple(shape):
+        return masks
+    (h, w), (mh, mw) = shape, masks.shape[1:]
+    rows = np.minimum(((np.arange(h) + 0.5) * mh / h).astype(np.intp), mh - 1)
+    cols = np.minimum(((np.arange(w) + 0.5) * mw / w).astype(np.intp), mw - 1)
+    return masks[:, rows[:, None], cols[None, :]]
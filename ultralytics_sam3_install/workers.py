@@ -0,0 +1,312 @@
+"""
+Worker Launcher
+Runs N copies of a predictor script (the demo, a test, any ``main()``) in
+separate processes with disjoint CPU cores.
+
+Each worker is pinned to its own core block, and torch intra-op threads,
+torch inter-op threads, OpenMP/MKL threads and OpenCV threads are all sized
+to that block. Several trackers on one host then stop oversubscribing the
+CPU. Scripts run unmodified through ``runpy``. Frames are counted by wrapping
+the predictors' ``stream_inference``, and the launcher reports per-worker and
+total throughput.
+
+Usage:
+    # One tracker per video, cores split evenly
+    python -m ultralytics_sam3_install workers --items a.mp4 b.mp4 c.mp4 -- \\
+        demo/01-person-tracker-with-sam3.py --source {item} --output tracked-{worker}.mp4
+
+    # Four copies of a test script, 2 cores each
+    python -m ultralytics_sam3_install workers --workers 4 --cores-per-worker 2 -- \\
+        tests/v8.3.237/00-basic/01-text-prompts.py
+"""
+
+import argparse
+import json
+import multiprocessing as mp
+import os
+import runpy
+import sys
+import threading
+import time
+from pathlib import Path
+from queue import Empty
+from typing import Any, Optional
+
+from ultralytics_sam3_install.predictors import project_root
+
+# Thread pools read these at import time, so they are set before torch/cv2 load
+THREAD_ENV_VARS = ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS", "NUMEXPR_NUM_THREADS")
+
+
+def available_cores() -> list[int]:
+    """Return the cores this process may run on."""
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+def partition_cores(
+    workers: int,
+    cores: Optional[list[int]] = None,
+    cores_per_worker: Optional[int] = None,
+    reserve: int = 0,
+) -> list[list[int]]:
+    """
+    Split cores into contiguous, disjoint blocks, one per worker; with an
+    even split the first ``len(cores) % workers`` blocks get one extra core.
+
+    Args:
+        workers: Number of workers
+        cores: Cores to distribute (defaults to this process's affinity)
+        cores_per_worker: Block size (defaults to an even split)
+        reserve: Leading cores left free for the launcher, decoding or I/O
+
+    Returns:
+        One list of core ids per worker
+    """
+    cores = (cores if cores is not None else available_cores())[reserve:]
+    if workers < 1:
+        raise ValueError("Need at least one worker")
+    per = cores_per_worker or len(cores) // workers
+    if per < 1 or per * workers > len(cores):
+        raise ValueError(f"Cannot give {workers} workers {per or '<1'} cores each from {len(cores)} available cores")
+    extra = 0 if cores_per_worker else len(cores) - per * workers  # leftover cores: one more for the first blocks
+    bounds = [i * per + min(i, extra) for i in range(workers + 1)]
+    return [cores[bounds[i] : bounds[i + 1]] for i in range(workers)]
+
+
+def pin_process(cores: list[int]) -> bool:
+    """Set CPU affinity of the current process. Returns False where the OS does not support it."""
+    if hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, cores)
+        return True
+    try:
+        import psutil
+
+        psutil.Process().cpu_affinity(cores)
+        return True
+    except (ImportError, AttributeError):  # macOS has no affinity API
+        return False
+
+
+def configure_threads(threads: int, interop_threads: int = 1, opencv_threads: Optional[int] = None) -> dict:
+    """
+    Size torch and OpenCV thread pools. Call before the first inference of the process.
+
+    Returns:
+        The applied settings
+    """
+    import cv2
+    import torch
+
+    torch.set_num_threads(threads)
+    try:
+        torch.set_num_interop_threads(interop_threads)
+    except RuntimeError:  # only allowed before the first inter-op parallel work
+        interop_threads = torch.get_num_interop_threads()
+    opencv_threads = threads if opencv_threads is None else opencv_threads
+    cv2.setNumThreads(opencv_threads)
+    return dict(threads=threads, interop_threads=interop_threads, opencv_threads=opencv_threads)
+
+
+def count_frames(stats: dict) -> None:
+    """
+    Count results yielded by every ultralytics predictor in this process.
+
+    Wraps ``stream_inference`` on ``BasePredictor`` and on the SAM predictor
+    classes that override it; ``stats`` gets ``frames``, ``first`` and ``last``
+    (perf_counter times of the first and last result).
+    """
+    from ultralytics.engine.predictor import BasePredictor
+    from ultralytics.models.sam import predict
+
+    classes = [BasePredictor] + [c for c in vars(predict).values() if isinstance(c, type) and issubclass(c, BasePredictor)]
+    stats.update(frames=0, first=None, last=None)
+    local = threading.local()  # wrapped calls in progress, so overrides delegating to super() count once
+    for cls in classes:
+        if "stream_inference" not in vars(cls):
+            continue
+        original = vars(cls)["stream_inference"]
+
+        def stream_inference(self, *args, _original=original, **kwargs):
+            results = _original(self, *args, **kwargs)
+            try:
+                while True:
+                    depth = getattr(local, "depth", 0)
+                    local.depth = depth + 1
+                    try:
+                        result = next(results)
+                    except StopIteration:
+                        return
+                    finally:
+                        local.depth = depth
+                    if depth == 0:
+                        now = time.perf_counter()
+                        stats["frames"] += 1
+                        stats["first"] = stats["first"] or now
+                        stats["last"] = now
+                    yield result
+            finally:
+                results.close()
+
+        cls.stream_inference = stream_inference
+
+
+def format_args(argv: list[str], worker: int, item: Optional[str]) -> list[str]:
+    """Substitute ``{worker}`` and ``{item}`` placeholders in a worker's arguments."""
+    return [arg.replace("{worker}", str(worker)).replace("{item}", item or "") for arg in argv]
+
+
+def run_worker(worker: int, cores: list[int], script: str, argv: list[str], settings: dict, reports: Any) -> None:
+    """Child process: pin, size thread pools, run ``script`` as ``__main__`` and report throughput."""
+    threads = settings["threads"] or len(cores)
+    for var in THREAD_ENV_VARS:
+        os.environ[var] = str(threads)
+    pinned = pin_process(cores)
+    applied = configure_threads(threads, settings["interop_threads"], settings["opencv_threads"])
+    stats = {}
+    count_frames(stats)
+
+    sys.argv = [script] + argv
+    start = time.perf_counter()
+    exit_code = 0
+    try:
+        runpy.run_path(script, run_name="__main__")
+    except SystemExit as e:
+        exit_code = e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+    except Exception as e:  # report and keep other workers running
+        print(f"[worker {worker}] {type(e).__name__}: {e}", file=sys.stderr)
+        exit_code = 1
+    wall = time.perf_counter() - start
+    active = (stats["last"] - stats["first"]) if stats["frames"] > 1 else None
+    reports.put(
+        dict(
+            worker=worker,
+            cores=cores,
+            pinned=pinned,
+            **applied,
+            exit_code=exit_code,
+            frames=stats["frames"],
+            wall_s=wall,
+            fps=(stats["frames"] - 1) / active if active else None,
+        )
+    )
+
+
+def launch(
+    script: str,
+    argv: list[str],
+    workers: Optional[int] = None,
+    items: Optional[list[str]] = None,
+    cores_per_worker: Optional[int] = None,
+    reserve: int = 0,
+    threads: Optional[int] = None,
+    interop_threads: int = 1,
+    opencv_threads: Optional[int] = None,
+) -> list[dict]:
+    """
+    Run ``script`` in parallel workers with partitioned cores.
+
+    Args:
+        script: Path of a Python script with a ``__main__`` block
+        argv: Script arguments; ``{worker}`` and ``{item}`` are substituted per worker
+        workers: Number of workers (defaults to ``len(items)``)
+        items: One value per worker substituted for ``{item}`` (e.g. video paths)
+        cores_per_worker: Cores pinned to each worker (defaults to an even split)
+        reserve: Leading cores left unpinned
+        threads: torch/OpenMP threads per worker (defaults to its core count)
+        interop_threads: torch inter-op threads per worker
+        opencv_threads: OpenCV threads per worker (defaults to ``threads``)
+
+    Returns:
+        One report per worker, ordered by worker index
+    """
+    workers = workers or (len(items) if items else 1)
+    if items and len(items) != workers:
+        raise ValueError(f"Got {len(items)} items for {workers} workers")
+    blocks = partition_cores(workers, cores_per_worker=cores_per_worker, reserve=reserve)
+    settings = dict(threads=threads, interop_threads=interop_threads, opencv_threads=opencv_threads)
+    ctx = mp.get_context("spawn")  # children must not inherit already-sized thread pools
+    queue = ctx.Queue()
+    procs = []
+    for i, cores in enumerate(blocks):
+        args = format_args(argv, i, items[i] if items else None)
+        proc = ctx.Process(target=run_worker, args=(i, cores, script, args, settings, queue), name=f"sam3-worker-{i}")
+        proc.start()
+        procs.append(proc)
+    reports = {}
+    while len(reports) < len(procs):
+        try:
+            report = queue.get(timeout=1.0)
+            reports[report["worker"]] = report
+        except Empty:  # detect workers that died without reporting
+            for i, proc in enumerate(procs):
+                if i not in reports and not proc.is_alive() and queue.empty():
+                    reports[i] = dict(worker=i, cores=blocks[i], exit_code=proc.exitcode, frames=0, wall_s=None, fps=None)
+    for proc in procs:
+        proc.join()
+    return [reports[i] for i in sorted(reports)]
+
+
+def format_report(reports: list[dict]) -> str:
+    """Render per-worker throughput and the host total as a table."""
+    lines = [f"{'worker':>6}  {'cores':<16}  {'threads':>7}  {'frames':>6}  {'wall s':>8}  {'fps':>7}  exit"]
+    for r in reports:
+        cores = f"{r['cores'][0]}-{r['cores'][-1]}" if len(r["cores"]) > 1 else str(r["cores"][0])
+        wall = f"{r['wall_s']:.1f}" if r.get("wall_s") is not None else "-"
+        fps = f"{r['fps']:.2f}" if r.get("fps") is not None else "-"
+        lines.append(
+            f"{r['worker']:>6}  {cores:<16}  {r.get('threads', '-'):>7}  {r['frames']:>6}  {wall:>8}  {fps:>7}  {r['exit_code']}"
+        )
+    total = sum(r["fps"] for r in reports if r.get("fps"))
+    lines.append(f"total fps: {total:.2f}")
+    return "\n".join(lines)
+
+
+def parse_args(argv: Optional[list[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Run a predictor script in N workers with partitioned CPU cores",
+        usage="%(prog)s [options] -- script.py [script args]",
+    )
+    parser.add_argument("--workers", type=int, default=None, help="Number of workers (default: number of items, else 1)")
+    parser.add_argument("--items", nargs="+", default=None, help="Per-worker values substituted for {item}")
+    parser.add_argument("--cores-per-worker", type=int, default=None, help="Cores pinned to each worker")
+    parser.add_argument("--reserve", type=int, default=0, help="Leading cores left free (decode, I/O)")
+    parser.add_argument("--threads", type=int, default=None, help="torch/OpenMP threads per worker (default: its cores)")
+    parser.add_argument("--interop-threads", type=int, default=1, help="torch inter-op threads per worker")
+    parser.add_argument("--opencv-threads", type=int, default=None, help="OpenCV threads per worker")
+    parser.add_argument("--output", type=str, default=None, help="Write the per-worker report as JSON")
+    parser.add_argument("command", nargs=argparse.REMAINDER, help="Script and its arguments")
+    args = parser.parse_args(argv)
+    if args.command[:1] == ["--"]:
+        args.command = args.command[1:]
+    if not args.command:
+        parser.error("missing script to run")
+    return args
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    """Launch workers, print the throughput table and return non-zero if any worker failed."""
+    args = parse_args(argv)
+    script = Path(args.command[0])
+    if not script.exists():
+        script = project_root / script
+    reports = launch(
+        str(script),
+        args.command[1:],
+        workers=args.workers,
+        items=args.items,
+        cores_per_worker=args.cores_per_worker,
+        reserve=args.reserve,
+        threads=args.threads,
+        interop_threads=args.interop_threads,
+        opencv_threads=args.opencv_threads,
+    )
+    print(format_report(reports))
+    if args.output:
+        Path(args.output).write_text(json.dumps(reports, indent=2))
+    return int(any(r["exit_code"] for r in reports))
+
+
+if __name__ == "__main__":
+    sys.exit(main())